@@ -0,0 +1,436 @@
+"""
+Afinidade de sessão — roteador com hash consistente na frente de N workers.
+
+Com vários workers, o estado da sessão fica no SQLite (compartilhado entre
+processos), mas parte do que deixa o turno barato e correto é local ao
+processo: o lock do turno (SessionLocks), os caches em memória de
+classificação, resultados de agentes e idempotência, e os assinantes de
+/sessions/{id}/events. Com SESSION_AFFINITY, serve.py sobe os workers em
+unix sockets (WorkerPool) e este roteador, no processo principal, manda
+cada sessão sempre para o mesmo worker:
+
+  - HashRing: hash consistente com nós virtuais — um worker que cai leva
+    só as sessões dele para os outros; as demais continuam onde estavam.
+  - session_id vem do path (/sessions/{id}/..., /agents/callback/{id}), da
+    query (?session_id= no /ws/chat) ou do corpo JSON (/chat, /chat/stream).
+  - Sessão nova em /chat: o roteador gera o session_id e o injeta no corpo,
+    para o primeiro turno já cair no worker dono. Com Idempotency-Key, o id
+    é derivado da chave (uuid5): o retry recebe o mesmo session_id, cai no
+    mesmo worker e encontra a resposta guardada.
+  - /ws/chat sem ?session_id=: o roteador gera um e o injeta na query — a
+    conexão e os POST /chat seguintes da sessão ficam no mesmo worker.
+  - Sem sessão (/health, /metrics, /sessions) → round-robin.
+  - GET /router/stats é respondido pelo próprio roteador (anel, reinícios).
+  - Worker que recusa conexão sai do anel até voltar a responder /health;
+    processo que morre é reiniciado pelo WorkerPool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import parse_qs
+
+import httpx
+
+from app.config import AFFINITY_VIRTUAL_NODES
+
+logger = logging.getLogger(__name__)
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict]]
+Send = Callable[[dict], Awaitable[None]]
+
+# /sessions/{id}, /sessions/{id}/events, /agents/callback/{id}
+_SESSION_PATH = re.compile(r"^/(?:sessions|agents/callback)/([^/]+)")
+_NOT_SESSIONS = {"stats"}   # /sessions/stats não é uma sessão
+_CHAT_PATHS = ("/chat", "/chat/stream")
+_WS_CHAT_PATH = "/ws/chat"
+# session_id de sessão nova com Idempotency-Key: uuid5(chave), igual em todo retry
+_IDEMPOTENCY_NAMESPACE = uuid.UUID("5d2c2f5e-8f0b-4c61-9a55-0f3b1f6f2a47")
+_HOP_BY_HOP = {"connection", "keep-alive", "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade"}
+# Corpo pode ser reescrito (session_id injetado): o httpx recalcula o tamanho
+_REQUEST_DROP = _HOP_BY_HOP | {"host", "content-length"}
+WORKER_KEEPALIVE_SECONDS = 30
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Hash consistente: cada nó ocupa `replicas` pontos do anel; a chave vai ao próximo ponto."""
+
+    def __init__(self, nodes: tuple[str, ...] = (), replicas: int = AFFINITY_VIRTUAL_NODES):
+        self.replicas = replicas
+        self._points: list[int] = []
+        self._owners: dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node: str) -> None:
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: self._owners[point] for point in self._points}
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def nodes(self) -> list[str]:
+        return sorted(set(self._owners.values()))
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._owners.values()
+
+
+class WorkerPool:
+    """Processos uvicorn do app, um por unix socket; reinicia os que morrem."""
+
+    def __init__(self, app: str, count: int, socket_dir: Optional[str] = None, log_level: str = "warning"):
+        self.app = app
+        self.log_level = log_level
+        # Sem diretório: um temporário, removido no stop (o uvicorn re-levanta o
+        # sinal de parada ao sair, então um `with TemporaryDirectory` não limparia)
+        self._own_dir = socket_dir is None
+        self.socket_dir = socket_dir or tempfile.mkdtemp(prefix="orchestrator-")
+        self.sockets = [os.path.join(self.socket_dir, f"worker-{i}.sock") for i in range(count)]
+        self._procs: dict[str, subprocess.Popen] = {}
+        self.restarts = 0
+
+    def start(self) -> None:
+        for socket in self.sockets:
+            self._spawn(socket)
+
+    def _spawn(self, socket: str) -> None:
+        if os.path.exists(socket):
+            os.unlink(socket)
+        self._procs[socket] = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", self.app,
+            "--uds", socket, "--log-level", self.log_level, "--no-access-log",
+            # Keep-alive do worker maior que o do roteador: o roteador é quem fecha
+            # conexões ociosas, sem corrida com o worker fechando por baixo
+            "--timeout-keep-alive", str(WORKER_KEEPALIVE_SECONDS * 2),
+        ])
+
+    def respawn_dead(self) -> list[str]:
+        """Reinicia workers cujo processo saiu. Retorna os sockets reiniciados."""
+        dead = [socket for socket, proc in self._procs.items() if proc.poll() is not None]
+        for socket in dead:
+            logger.warning(f"Worker {socket} saiu com código {self._procs[socket].returncode}; reiniciando")
+            self._spawn(socket)
+            self.restarts += 1
+        return dead
+
+    def stop(self, timeout: float = 10.0) -> None:
+        for proc in self._procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        deadline = time.monotonic() + timeout
+        for proc in self._procs.values():
+            try:
+                proc.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        for socket in self.sockets:
+            if os.path.exists(socket):
+                os.unlink(socket)
+        if self._own_dir:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+
+class AffinityRouter:
+    """App ASGI do processo principal: encaminha cada requisição ao worker dono da sessão."""
+
+    def __init__(
+        self,
+        pool: WorkerPool,
+        replicas: int = AFFINITY_VIRTUAL_NODES,
+        health_interval: float = 1.0,
+        startup_timeout: float = 60.0,
+    ):
+        self.pool = pool
+        self.ring = HashRing(replicas=replicas)
+        self.health_interval = health_interval
+        self.startup_timeout = startup_timeout
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._round_robin = itertools.count()
+        self._supervisor: Optional[asyncio.Task] = None
+        self.counters: Counter = Counter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+
+    # ── Ciclo de vida dos workers ───────────────────────────────────────
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.start()
+                except Exception as e:
+                    await self.stop()
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def start(self) -> None:
+        self.pool.start()
+        for socket in self.pool.sockets:
+            self._clients[socket] = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(uds=socket),
+                base_url="http://worker",
+                limits=httpx.Limits(max_keepalive_connections=100, keepalive_expiry=WORKER_KEEPALIVE_SECONDS),
+                # /chat/stream e /sessions/{id}/events ficam abertos: só o connect tem prazo
+                timeout=httpx.Timeout(None, connect=5.0),
+            )
+        deadline = time.monotonic() + self.startup_timeout
+        while len(self.ring.nodes()) < len(self.pool.sockets) and time.monotonic() < deadline:
+            await self._check_down_workers()
+            await asyncio.sleep(0.2)
+        if not self.ring.nodes():
+            raise RuntimeError(f"Nenhum worker respondeu /health em {self.startup_timeout:.0f}s")
+        logger.info(f"Roteador com afinidade: {len(self.ring.nodes())}/{len(self.pool.sockets)} workers no anel")
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        for client in self._clients.values():
+            await client.aclose()
+        await asyncio.to_thread(self.pool.stop)
+
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for socket in self.pool.respawn_dead():
+                self._mark_down(socket)
+            await self._check_down_workers()
+
+    async def _check_down_workers(self) -> None:
+        for socket, client in self._clients.items():
+            if socket in self.ring:
+                continue
+            try:
+                response = await client.get("/health", timeout=1.0)
+            except httpx.TransportError:
+                continue
+            if response.status_code == 200:
+                self.ring.add(socket)
+                logger.info(f"Worker {socket} no anel")
+
+    def _mark_down(self, socket: str) -> None:
+        if socket in self.ring:
+            self.ring.remove(socket)
+            self.counters["worker_down"] += 1
+            logger.warning(f"Worker {socket} fora do anel")
+
+    # ── Roteamento ──────────────────────────────────────────────────────
+
+    def _pick(self, key: Optional[str]) -> Optional[str]:
+        if key:
+            self.counters["affinity"] += 1
+            return self.ring.node_for(key)
+        self.counters["round_robin"] += 1
+        nodes = self.ring.nodes()
+        return nodes[next(self._round_robin) % len(nodes)] if nodes else None
+
+    @staticmethod
+    def _session_key(scope: Scope, headers: list[tuple[str, str]], body: bytes) -> tuple[Optional[str], bytes]:
+        """Chave de roteamento e corpo a encaminhar (com session_id injetado em sessão nova)."""
+        match = _SESSION_PATH.match(scope["path"])
+        if match and match.group(1) not in _NOT_SESSIONS:
+            return match.group(1), body
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("session_id"):
+            return query["session_id"][0], body
+        if scope["path"] not in _CHAT_PATHS or scope.get("method") != "POST":
+            return None, body
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None, body   # o worker responde 422
+        if not isinstance(payload, dict):
+            return None, body
+        if payload.get("session_id"):
+            return str(payload["session_id"]), body
+        idempotency_key = next((value for name, value in headers if name.lower() == "idempotency-key"), None)
+        if idempotency_key:
+            session_id = str(uuid.uuid5(_IDEMPOTENCY_NAMESPACE, idempotency_key))
+        else:
+            session_id = str(uuid.uuid4())
+        return session_id, json.dumps({**payload, "session_id": session_id}, ensure_ascii=False).encode()
+
+    async def _http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["path"] == "/router/stats":
+            await self._respond(send, 200, self.stats())
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in scope["headers"]
+            if name.decode("latin-1").lower() not in _REQUEST_DROP
+        ]
+        key, body = self._session_key(scope, headers, body)
+        url = (scope.get("raw_path") or scope["path"].encode()).decode("latin-1")
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode("latin-1")
+
+        # Worker fora do ar: sai do anel e a chave vai para o próximo (uma tentativa por worker)
+        for _ in range(len(self.pool.sockets)):
+            socket = self._pick(key)
+            if socket is None:
+                break
+            client = self._clients[socket]
+            try:
+                response = await client.send(
+                    client.build_request(scope["method"], url, headers=headers, content=body), stream=True,
+                )
+            except httpx.ConnectError:
+                self._mark_down(socket)
+                continue
+            except httpx.TransportError as e:
+                # A requisição pode ter chegado ao worker: um turno não é repetido em outro
+                logger.warning(f"Worker {socket} falhou no meio da requisição: {e!r}")
+                await self._respond(send, 502, {"detail": "Worker falhou no meio da requisição"})
+                return
+            try:
+                await self._relay(response, receive, send)
+            finally:
+                await response.aclose()
+            return
+
+        await self._respond(send, 503, {"detail": "Nenhum worker disponível"})
+
+    @staticmethod
+    async def _respond(send: Send, status: int, payload: dict) -> None:
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(payload, ensure_ascii=False).encode()})
+
+    @staticmethod
+    async def _relay(response: httpx.Response, receive: Receive, send: Send) -> None:
+        """Repassa a resposta em streaming; para se o cliente desconectar (SSE longo)."""
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in response.headers.multi_items()
+                if name.lower() not in _HOP_BY_HOP
+            ],
+        })
+
+        async def forward() -> None:
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        async def disconnected() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        tasks = [asyncio.create_task(forward()), asyncio.create_task(disconnected())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _websocket(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # websockets já é dependência do uvicorn para servir /ws/chat
+        from websockets.asyncio.client import unix_connect
+        from websockets.exceptions import ConnectionClosed
+
+        await receive()   # websocket.connect
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        query = parse_qs(query_string)
+        session_id = query["session_id"][0] if query.get("session_id") else None
+        if session_id is None and scope["path"] == _WS_CHAT_PATH:
+            # Sessão nova: o id nasce aqui, para os turnos por HTTP caírem no mesmo worker
+            session_id = str(uuid.uuid4())
+            query_string = f"{query_string}&session_id={session_id}" if query_string else f"session_id={session_id}"
+        socket = self._pick(session_id)
+        path = scope["path"] + ("?" + query_string if query_string else "")
+        try:
+            if socket is None:
+                raise OSError("nenhum worker no anel")
+            upstream = await unix_connect(socket, uri=f"ws://worker{path}")
+        except OSError:
+            if socket is not None:
+                self._mark_down(socket)
+            await send({"type": "websocket.close", "code": 1013})   # try again later
+            return
+        await send({"type": "websocket.accept"})
+
+        async def client_to_worker() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                await upstream.send(message["text"] if message.get("text") is not None else message["bytes"])
+
+        async def worker_to_client() -> None:
+            try:
+                async for data in upstream:
+                    await send({"type": "websocket.send", "text" if isinstance(data, str) else "bytes": data})
+            except ConnectionClosed:
+                pass
+            await send({"type": "websocket.close", "code": 1000})
+
+        tasks = [asyncio.create_task(client_to_worker()), asyncio.create_task(worker_to_client())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await upstream.close()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self.pool.sockets),
+            "in_ring": len(self.ring.nodes()),
+            "restarts": self.pool.restarts,
+            **self.counters,
+        }
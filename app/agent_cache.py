@@ -0,0 +1,135 @@
+"""
+Cache de resultados de agentes.
+
+Intents como `clima` (mesma cidade) e `traduzir` (mesmo texto e idioma)
+dão o mesmo resultado por minutos. Agentes com `AgentCard.cache_ttl`
+têm a resposta guardada por (agent_id, intent, slots normalizados) durante
+esse TTL; o dispatch consulta o cache antes de ir à rede.
+
+Chamadas idênticas simultâneas compartilham a mesma requisição HTTP: a
+primeira executa e as demais esperam por ela (coalescência). Só respostas
+síncronas de sucesso são guardadas — erro e job aceito (202) não.
+
+Com AGENT_CACHE_SQLITE_PATH o cache é compartilhado entre workers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from collections import Counter, defaultdict
+from typing import Awaitable, Callable
+
+from app.cache import LRUCache, SQLiteCache
+from app.config import AGENT_CACHE_ENABLED, AGENT_CACHE_MAX_ENTRIES, AGENT_CACHE_SQLITE_PATH
+from app.metrics import record_agent_cache
+from app.schemas import AgentCard
+
+# Status de resposta que não é resultado final e estável
+UNCACHEABLE_STATUSES = {"accepted", "error", "failed"}
+
+
+def _normalize_slots(slots: dict) -> dict[str, str]:
+    """Valores sem diferença de caixa/espaços; slots vazios não entram na chave."""
+    return {
+        name: " ".join(str(value).split()).casefold()
+        for name, value in sorted(slots.items())
+        if value not in (None, "")
+    }
+
+
+def _key(card: AgentCard, intent: str, slots: dict) -> str:
+    raw = json.dumps([card.id, intent, _normalize_slots(slots)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class AgentResultCache:
+    """Respostas de agentes cacheáveis, com coalescência de chamadas idênticas em andamento."""
+
+    def __init__(
+        self,
+        enabled: bool = AGENT_CACHE_ENABLED,
+        max_entries: int = AGENT_CACHE_MAX_ENTRIES,
+        sqlite_path: str = AGENT_CACHE_SQLITE_PATH,
+    ):
+        self.enabled = enabled
+        persistent = SQLiteCache(sqlite_path, namespace="agent_results") if sqlite_path else None
+        # TTL vem do AgentCard em cada put
+        self._cache = LRUCache(max_entries, ttl_seconds=0.0, persistent=persistent)
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self.by_agent: dict[str, Counter] = defaultdict(Counter)
+
+    async def execute(
+        self,
+        card: AgentCard,
+        intent: str,
+        slots: dict,
+        call: Callable[[], Awaitable[dict]],
+    ) -> dict:
+        """Resposta do cache, da chamada em andamento ou de `call()` — nessa ordem."""
+        if not self.enabled or not card.cache_ttl:
+            return await call()
+
+        key = _key(card, intent, slots)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._record(card.id, "hit")
+            return cached
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self._record(card.id, "coalesced")
+            try:
+                shared = await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # Quem executava foi cancelado (ex.: dispatch especulativo descartado): chama por conta própria
+                if not in_flight.cancelled():
+                    raise
+                shared = None
+            # Resposta não cacheável (ex.: job aceito) pertence a quem chamou: executa a própria
+            return shared if shared is not None else await call()
+
+        self._record(card.id, "miss")
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # marca como consumida se ninguém estiver esperando
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        cacheable = response.get("status") not in UNCACHEABLE_STATUSES
+        if cacheable:
+            self._cache.put(key, response, ttl_seconds=card.cache_ttl)
+        future.set_result(response if cacheable else None)
+        return response
+
+    def _record(self, agent_id: str, result: str) -> None:
+        self.by_agent[agent_id][result] += 1
+        record_agent_cache(agent_id, result)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        agents = {}
+        for agent_id, counters in self.by_agent.items():
+            lookups = sum(counters.values())
+            served = counters["hit"] + counters["coalesced"]
+            agents[agent_id] = {**counters, "hit_rate": served / lookups if lookups else 0.0}
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._in_flight),
+            **self._cache.stats(),
+            "agents": agents,
+        }
+
+
+agent_result_cache = AgentResultCache()
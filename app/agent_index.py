@@ -0,0 +1,134 @@
+"""
+Índice léxico de agentes — shortlist para o prompt de classificação.
+
+Com centenas de agentes, listar o AGENT_REGISTRY inteiro no prompt faz o
+tamanho (e a latência) da classificação crescer linearmente. O índice
+representa cada agente (intent, name, description e nomes dos slots) como
+um vetor TF-IDF de palavras + n-gramas de caracteres e devolve os top-k
+mais parecidos com a mensagem por similaridade de cosseno.
+
+N-gramas de 4 caracteres aproximam variações da mesma palavra
+("lembra"/"lembrete", "traduz"/"tradutor") sem stemmer. Tudo em Python
+puro com índice invertido: a busca só toca agentes que compartilham algum
+termo com a mensagem.
+
+O índice é montado uma vez por versão do registry (`registry_version`).
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+from collections import Counter, defaultdict
+from typing import Optional
+
+from app.config import (
+    AGENT_REGISTRY,
+    AGENT_SHORTLIST_ENABLED,
+    AGENT_SHORTLIST_K,
+    AGENT_SHORTLIST_MIN_AGENTS,
+    registry_version,
+)
+from app.schemas import AgentCard
+from app.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 4
+
+# Palavras sem conteúdo (já normalizadas) — não viram termos
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "da", "do", "das", "dos",
+    "em", "na", "no", "nas", "nos", "para", "pra", "pro", "por", "pelo", "pela", "com",
+    "sem", "e", "ou", "que", "se", "me", "te", "eu", "voce", "meu", "minha", "seu", "sua",
+    "ao", "aos", "mais", "muito", "como", "qual", "quais", "isso", "esse", "essa", "este",
+    "esta", "ai", "la", "aqui", "ja", "so", "tambem", "quero", "queria", "pode", "poderia",
+    "favor", "agente",
+}
+
+
+def _terms(text: str) -> Counter[str]:
+    """Palavras (w:) e n-gramas de caracteres com bordas (g:) do texto normalizado."""
+    terms: Counter[str] = Counter()
+    for word in normalize_text(text).split():
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        terms[f"w:{word}"] += 1
+        padded = f"#{word}#"
+        for i in range(len(padded) - NGRAM_SIZE + 1):
+            terms[f"g:{padded[i:i + NGRAM_SIZE]}"] += 1
+    return terms
+
+
+def _document(intent: str, card: AgentCard) -> str:
+    slots = " ".join(slot.replace("_", " ") for slot in card.required_slots)
+    return f"{intent.replace('_', ' ')} {card.name} {card.description} {slots}"
+
+
+class AgentIndex:
+    """TF-IDF (tf sublinear, vetores normalizados) com índice invertido termo → agentes."""
+
+    def __init__(self, registry: dict[str, AgentCard]):
+        documents = {intent: _terms(_document(intent, card)) for intent, card in registry.items()}
+        df = Counter(term for terms in documents.values() for term in terms)
+        total = len(documents)
+        self._idf = {term: math.log((1 + total) / (1 + count)) + 1.0 for term, count in df.items()}
+
+        self._postings: dict[str, list[tuple[str, float]]] = defaultdict(list)
+        for intent, terms in documents.items():
+            for term, weight in self._vector(terms).items():
+                self._postings[term].append((intent, weight))
+        self.size = total
+
+    def _vector(self, terms: Counter[str]) -> dict[str, float]:
+        weights = {
+            term: (1.0 + math.log(count)) * self._idf[term]
+            for term, count in terms.items()
+            if term in self._idf
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {term: w / norm for term, w in weights.items()} if norm else {}
+
+    def search(self, text: str, k: int) -> list[tuple[str, float]]:
+        """Top-k (intent, score) por cosseno; agentes sem termo em comum não aparecem."""
+        scores: dict[str, float] = defaultdict(float)
+        for term, weight in self._vector(_terms(text)).items():
+            for intent, doc_weight in self._postings[term]:
+                scores[intent] += weight * doc_weight
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+_index: Optional[AgentIndex] = None
+_index_version = ""
+
+
+def agent_index() -> AgentIndex:
+    """Índice do registry atual, remontado quando o registry muda."""
+    global _index, _index_version
+    version = registry_version()
+    if _index is None or version != _index_version:
+        _index = AgentIndex(AGENT_REGISTRY)
+        _index_version = version
+        logger.info(f"Índice de agentes montado: {_index.size} agentes (registry {version})")
+    return _index
+
+
+def shortlist_agents(
+    text: str,
+    current_intent: Optional[str] = None,
+    k: int = AGENT_SHORTLIST_K,
+    enabled: bool = AGENT_SHORTLIST_ENABLED,
+    min_agents: int = AGENT_SHORTLIST_MIN_AGENTS,
+) -> Optional[list[str]]:
+    """
+    Intents candidatas para o prompt de classificação, ou None para usar o
+    registry inteiro (shortlist desligada ou registry pequeno).
+    """
+    if not enabled or len(AGENT_REGISTRY) <= min_agents:
+        return None
+    intents = [intent for intent, _ in agent_index().search(text, k)]
+    # Clarify em andamento: a intent acumulada continua candidata ("Curitiba" não lembra clima)
+    if current_intent in AGENT_REGISTRY and current_intent not in intents:
+        intents.append(current_intent)
+    return intents
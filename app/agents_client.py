@@ -0,0 +1,256 @@
+"""
+Cliente HTTP da API externa de agentes.
+
+Um único httpx.AsyncClient por processo (aberto no lifespan do FastAPI),
+com keep-alive e HTTP/2 opcional. Cada AgentCard define seu orçamento:
+timeout por tentativa, retries e hedging (segunda tentativa disparada
+quando a primeira passa do p95 observado) para intents idempotentes.
+
+Cada tentativa passa antes pelo circuit breaker e pelo bulkhead do agente
+(app/resilience.py): agente fora do ar falha rápido com CircuitOpenError,
+agente lento não ocupa mais que `max_concurrency` conexões do pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+import httpx
+
+from app.config import (
+    AGENTS_API_BASE_URL,
+    AGENTS_API_HTTP2,
+    AGENTS_API_KEY,
+    AGENTS_API_MAX_CONNECTIONS,
+    AGENTS_API_MAX_KEEPALIVE,
+    AGENT_MAX_CONCURRENCY,
+)
+from app.metrics import record_agent_rejection, record_agent_request
+from app.resilience import Bulkhead, BulkheadFullError, CircuitBreaker, CircuitOpenError
+from app.schemas import AgentCard
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF = 0.1                 # s, dobra a cada tentativa
+RETRYABLE_STATUS = {502, 503, 504}
+LATENCY_WINDOW = 200                # amostras por agente para o p95
+MIN_SAMPLES_FOR_P95 = 20
+
+
+class AgentsClient:
+    """Cliente pooled da API de agentes com retries e hedging por AgentCard."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None, breakers_enabled: bool = True):
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.stats: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.breakers_enabled = breakers_enabled
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._bulkheads: dict[str, Bulkhead] = {}
+
+    # ── Ciclo de vida ──────────────────────────────────────────────────
+
+    async def start(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    def set_transport(self, transport: Optional[httpx.AsyncBaseTransport]) -> None:
+        """Troca o transport (ex.: ASGI do mock em benchmarks). Vale a partir do próximo start()."""
+        self._transport = transport
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        headers = {"Content-Type": "application/json"}
+        if AGENTS_API_KEY:
+            headers["Authorization"] = f"Bearer {AGENTS_API_KEY}"
+
+        http2 = AGENTS_API_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("AGENTS_API_HTTP2 ativo mas 'h2' não instalado (pip install httpx[http2]); usando HTTP/1.1")
+                http2 = False
+
+        return httpx.AsyncClient(
+            base_url=AGENTS_API_BASE_URL,
+            headers=headers,
+            http2=http2,
+            transport=self._transport,
+            limits=httpx.Limits(
+                max_connections=AGENTS_API_MAX_CONNECTIONS,
+                max_keepalive_connections=AGENTS_API_MAX_KEEPALIVE,
+            ),
+        )
+
+    # ── Execução ───────────────────────────────────────────────────────
+
+    async def execute(self, card: AgentCard, intent: str, slots: dict, callback_url: Optional[str] = None) -> dict:
+        """Executa o agente. Propaga httpx.HTTPError após esgotar os retries.
+
+        Agente assíncrono responde 202: o retorno é {"status": "accepted", "job_id": ...}
+        e o resultado chega pelo `callback_url` ou por `job_status`.
+        """
+        client = await self.start()
+        payload = {"intent": intent, "slots": slots}
+        if callback_url:
+            payload["callback_url"] = callback_url
+
+        for attempt in range(card.max_retries + 1):
+            try:
+                if card.idempotent and card.hedge_after is not None:
+                    return await self._hedged(client, card, payload)
+                return await self._send(client, card, payload)
+            except httpx.HTTPError as e:
+                if attempt == card.max_retries or not self._is_retryable(card, e):
+                    raise
+                self.stats[card.id]["retries"] += 1
+                logger.info(f"Retry {attempt + 1}/{card.max_retries} para {card.id}: {e!r}")
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    async def _send(self, client: httpx.AsyncClient, card: AgentCard, payload: dict) -> dict:
+        breaker = self.breaker(card)
+        ticket = 0
+        if self.breakers_enabled:
+            try:
+                ticket = breaker.before_call()
+            except CircuitOpenError:
+                record_agent_rejection(card.id, "circuit_open")
+                raise
+
+        success: Optional[bool] = None     # None = cancelada/rejeitada: não conta para o breaker
+        try:
+            async with self.bulkhead(card):
+                start = time.perf_counter()
+                status = "cancelled"
+                try:
+                    resp = await client.post(f"/agents/{card.id}/execute", json=payload, timeout=card.timeout)
+                    status = str(resp.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                    success = False
+                    raise
+                finally:
+                    duration = time.perf_counter() - start
+                    record_agent_request(card.id, status, duration)
+            success = resp.status_code < 500
+        except BulkheadFullError:
+            record_agent_rejection(card.id, "bulkhead_full")
+            raise
+        finally:
+            if self.breakers_enabled:
+                breaker.record(success, ticket)
+
+        resp.raise_for_status()
+        self._latencies[card.id].append(duration)
+        if resp.status_code == 202:
+            return {**resp.json(), "status": "accepted"}
+        return resp.json()
+
+    async def job_status(self, card: AgentCard, job_id: str) -> dict:
+        """Consulta um job assíncrono (poller). Sem retries: o poller tenta de novo no próximo ciclo."""
+        client = await self.start()
+        start = time.perf_counter()
+        status = "cancelled"
+        try:
+            resp = await client.get(f"/agents/{card.id}/jobs/{job_id}", timeout=card.timeout)
+            status = str(resp.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+            raise
+        finally:
+            record_agent_request(card.id, f"poll_{status}", time.perf_counter() - start)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _hedged(self, client: httpx.AsyncClient, card: AgentCard, payload: dict) -> dict:
+        """Dispara uma segunda tentativa se a primeira passar do limiar; vence a primeira a responder."""
+        first = asyncio.create_task(self._send(client, card, payload))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_threshold(card))
+        if done:
+            return first.result()
+
+        self.stats[card.id]["hedges"] += 1
+        second = asyncio.create_task(self._send(client, card, payload))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.stats[card.id]["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # ── Circuit breaker e bulkhead ─────────────────────────────────────
+
+    def breaker(self, card: AgentCard) -> CircuitBreaker:
+        breaker = self._breakers.get(card.id)
+        if breaker is None:
+            breaker = self._breakers[card.id] = CircuitBreaker(card.id)
+        return breaker
+
+    def bulkhead(self, card: AgentCard) -> Bulkhead:
+        bulkhead = self._bulkheads.get(card.id)
+        if bulkhead is None:
+            limit = card.max_concurrency or AGENT_MAX_CONCURRENCY
+            bulkhead = self._bulkheads[card.id] = Bulkhead(card.id, limit)
+        return bulkhead
+
+    def reset_breaker(self, agent_id: str) -> bool:
+        breaker = self._breakers.get(agent_id)
+        if breaker is None:
+            return False
+        breaker.reset()
+        return True
+
+    def resilience_stats(self) -> dict:
+        """Estado por agente (GET /admin/agents)."""
+        agent_ids = sorted(set(self._breakers) | set(self._bulkheads))
+        return {
+            agent_id: {
+                "circuit": self._breakers[agent_id].snapshot() if agent_id in self._breakers else None,
+                "in_flight": self._bulkheads[agent_id].in_flight if agent_id in self._bulkheads else 0,
+                "max_concurrency": self._bulkheads[agent_id].limit if agent_id in self._bulkheads else None,
+                **self.stats.get(agent_id, {}),
+            }
+            for agent_id in agent_ids
+        }
+
+    def hedge_threshold(self, card: AgentCard) -> float:
+        """p95 observado do agente; usa `hedge_after` até haver amostras suficientes."""
+        samples = self._latencies[card.id]
+        if len(samples) < MIN_SAMPLES_FOR_P95:
+            return card.hedge_after
+        ordered = sorted(samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    @staticmethod
+    def _is_retryable(card: AgentCard, error: httpx.HTTPError) -> bool:
+        # Falha de conexão: a requisição nunca chegou ao agente
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            return True
+        if not card.idempotent:
+            return False
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS
+        return isinstance(error, httpx.TransportError)
+
+
+agents_client = AgentsClient()
@@ -0,0 +1,139 @@
+"""
+Caches LRU + TTL reutilizáveis (classificação, resultados de agentes).
+
+LRUCache guarda valores JSON-serializáveis em memória. Opcionalmente
+recebe um SQLiteCache como segunda camada: leituras em miss consultam o
+SQLite (read-through) e escritas vão para os dois (write-through), então
+o conteúdo sobrevive a restarts e é compartilhado entre workers.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class SQLiteCache:
+    """Camada persistente key → JSON com expiração absoluta."""
+
+    def __init__(self, path: str, namespace: str):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), time.time() + ttl_seconds),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time())
+            ).rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class LRUCache:
+    """Cache in-memory LRU com TTL por entrada e contadores de hit/miss."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, persistent: Optional[SQLiteCache] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str, record_miss: bool = True) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self._store(key, value)
+                self.hits += 1
+                self.persistent_hits += 1
+                return value
+
+        if record_miss:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._store(key, value, ttl)
+        if self.persistent is not None:
+            self.persistent.put(key, value, ttl)
+
+    def clear(self) -> None:
+        """Invalida tudo (memória e camada persistente)."""
+        self._entries.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+        self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "persistent_hits": self.persistent_hits,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _store(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
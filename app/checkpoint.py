@@ -0,0 +1,279 @@
+"""
+Checkpointer do LangGraph sobre o SessionStore — thread_id = session_id.
+
+O grafo é compilado com `SessionCheckpointer` (app/graph.py): cada turno
+passa só a entrada nova (`turn_input`) com `thread_config(session_id)`, e o
+LangGraph carrega e persiste o estado da sessão pelo checkpointer:
+
+  aget_tuple  snapshot do SessionStore (janela recente, slots, intent,
+              resumo, jobs) vira o checkpoint atual do thread; sessão
+              desconhecida → None (o grafo começa do zero). Leitura pura:
+              a sessão só é criada na escrita
+  aput        checkpoint do fim do turno → SessionManager.commit_turn, que
+              grava o delta (mensagens após a janela, slots/intent) e o
+              registro do checkpoint na mesma escrita
+
+Só os canais da sessão (SESSION_CHANNELS) entram no checkpoint: os do turno
+(classification, node_result, response, node_path...) começam vazios a cada
+turno. Os turnos rodam com durability="exit" (TURN_DURABILITY): um único
+aput no fim, em vez de um checkpoint por superstep. Todo caminho do grafo
+termina no Synthesis, então checkpoint sem ele em `node_path` é de um turno
+que falhou no meio — não é persistido, como antes.
+
+Histórico: o store guarda os SESSION_CHECKPOINT_HISTORY últimos checkpoints
+da sessão (id estável, pai, passo, posição no histórico, slots/intent e o
+caminho do turno), não o estado inteiro. `aget_state` com `checkpoint_id`
+e `aget_state_history` reconstroem os anteriores para inspeção: a janela de
+mensagens até aquele turno (se ainda não arquivadas), slots e intent da
+época; resumo e jobs são os atuais. O próximo turno sempre continua do
+checkpoint mais recente — não há fork a partir de um checkpoint antigo.
+Writes pendentes (put_writes) não são guardados: turno interrompido
+recomeça do último checkpoint.
+
+Vale para os dois backends de sessão (memory e sqlite; o sqlite continua
+compartilhável entre workers). Com o sqlite, os métodos async (aget_tuple,
+alist, aput) fazem o I/O numa thread: o event loop não espera pelo disco.
+"""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    empty_checkpoint,
+)
+
+from app.schemas import GraphState
+from app.session import SessionManager
+
+# Campos do GraphState que persistem entre turnos (o resto é do turno)
+SESSION_CHANNELS = (
+    "session_id",
+    "messages",
+    "history_offset",
+    "history_loaded",
+    "history_summary",
+    "jobs",
+    "slots",
+    "current_intent",
+)
+TURN_DURABILITY = "exit"
+
+# Id do checkpoint de sessão sem turno registrado (criada por save/job): estável por sessão
+_INITIAL_NAMESPACE = uuid.UUID("0b6f1c7e-3d4a-4e8b-9c2f-6a1d5e7f8b90")
+
+
+def thread_config(session_id: str, checkpoint_id: Optional[str] = None) -> RunnableConfig:
+    configurable = {"thread_id": session_id}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def turn_input(session_id: str, message: str) -> dict:
+    """Entrada do turno — o resto do estado vem do checkpoint da sessão."""
+    return {"session_id": session_id, "user_input": message}
+
+
+class SessionCheckpointer(BaseCheckpointSaver):
+    """Checkpoints do LangGraph lidos e gravados no SessionStore do SessionManager."""
+
+    def __init__(self, manager: SessionManager):
+        super().__init__()
+        self.manager = manager
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        session_id = config["configurable"]["thread_id"]
+        checkpoint_id = config["configurable"].get("checkpoint_id")
+        state = self.manager.store.get(session_id)
+        if state is None:
+            return None
+        records = self.manager.store.checkpoints(session_id)
+        if checkpoint_id is None or self._checkpoint_id(session_id, records[:1]) == checkpoint_id:
+            return self._current(session_id, state, records[:1], config)
+        for record in records[1:]:
+            if record["checkpoint_id"] == checkpoint_id:
+                return self._past(session_id, state, record, config)
+        return None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Checkpoints guardados do thread, do mais recente ao mais antigo."""
+        if config is None:
+            return  # listar todos os threads não é suportado
+        session_id = config["configurable"]["thread_id"]
+        state = self.manager.store.get(session_id)
+        if state is None:
+            return
+        records = self.manager.store.checkpoints(session_id)
+        tuples = [self._current(session_id, state, records[:1], config)]
+        tuples += [self._past(session_id, state, record, config) for record in records[1:]]
+
+        before_id = before["configurable"].get("checkpoint_id") if before else None
+        if before_id is not None:
+            ids = [t.checkpoint["id"] for t in tuples]
+            tuples = tuples[ids.index(before_id) + 1:] if before_id in ids else []
+        if filter:
+            tuples = [t for t in tuples if all(t.metadata.get(k) == v for k, v in filter.items())]
+        yield from tuples[:limit]
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        turn = self._turn(config, checkpoint, metadata)
+        if turn is not None:
+            self.manager.commit_turn(*turn)
+        return self._config(config["configurable"]["thread_id"], config, checkpoint["id"])
+
+    def put_writes(
+        self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "",
+    ) -> None:
+        """Writes pendentes não são guardados: turno interrompido recomeça do último checkpoint."""
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.manager.delete(thread_id)
+
+    # Async: com store bloqueante (sqlite), leitura e escrita rodam numa thread (SessionManager.run_io)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self.manager.run_io(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await self.manager.run_io(
+            lambda: [*self.list(config, filter=filter, before=before, limit=limit)]
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        turn = self._turn(config, checkpoint, metadata)
+        if turn is not None:
+            await self.manager.acommit_turn(*turn)
+        return self._config(config["configurable"]["thread_id"], config, checkpoint["id"])
+
+    async def aput_writes(
+        self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.manager.run_io(self.delete_thread, thread_id)
+
+    # ── Montagem dos checkpoints ───────────────────────────────────────
+
+    @staticmethod
+    def _turn(
+        config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+    ) -> Optional[tuple[GraphState, dict]]:
+        """Estado e registro a gravar do checkpoint do fim do turno; None se o turno não chegou ao Synthesis."""
+        values = checkpoint["channel_values"]
+        if "synthesis" not in values.get("node_path", ()):
+            return None
+        record = {
+            "checkpoint_id": checkpoint["id"],
+            "parent_id": config["configurable"].get("checkpoint_id"),
+            "ts": checkpoint["ts"],
+            "source": metadata.get("source", "loop"),
+            "step": metadata.get("step", -1),
+            "message_count": values.get("history_offset", 0) + len(values.get("messages", [])),
+            "slots": values.get("slots", {}),
+            "current_intent": values.get("current_intent"),
+            "node_path": values.get("node_path", []),
+        }
+        # Todos os canais, não só os da sessão: campo ausente cai no default_factory,
+        # que no model_construct custa mais que o commit inteiro
+        return GraphState.model_construct(**values), record
+
+    @staticmethod
+    def _checkpoint_id(session_id: str, latest: list[dict]) -> str:
+        return latest[0]["checkpoint_id"] if latest else str(uuid.uuid5(_INITIAL_NAMESPACE, session_id))
+
+    def _current(
+        self, session_id: str, state: GraphState, latest: list[dict], config: RunnableConfig,
+    ) -> CheckpointTuple:
+        """Checkpoint atual: o snapshot do store, com o id do último turno registrado."""
+        values = {name: getattr(state, name) for name in SESSION_CHANNELS}
+        record = latest[0] if latest else None
+        return self._tuple(session_id, self._checkpoint_id(session_id, latest), record, values, config)
+
+    def _past(self, session_id: str, state: GraphState, record: dict, config: RunnableConfig) -> CheckpointTuple:
+        """Checkpoint anterior reconstruído do registro: janela até aquele turno, slots/intent da época."""
+        end = record["message_count"]
+        window = self.manager.store.messages_range(session_id, max(end - self.manager.store.history_window, 0), end)
+        values = {
+            "session_id": session_id,
+            "messages": window,
+            "history_offset": end - len(window),
+            "history_loaded": len(window),
+            "history_summary": state.history_summary,
+            "jobs": [],
+            "slots": record["slots"],
+            "current_intent": record["current_intent"],
+        }
+        return self._tuple(session_id, record["checkpoint_id"], record, values, config)
+
+    def _tuple(
+        self, session_id: str, checkpoint_id: str, record: Optional[dict], values: dict, config: RunnableConfig,
+    ) -> CheckpointTuple:
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = checkpoint_id
+        if record is not None:
+            checkpoint["ts"] = record["ts"]
+        checkpoint["channel_values"] = values
+        checkpoint["channel_versions"] = {name: 1 for name in values}
+        metadata = {
+            "source": record["source"] if record else "input",
+            "step": record["step"] if record else -1,
+            "parents": {},
+        }
+        if record is not None:
+            metadata["node_path"] = record["node_path"]
+            metadata["message_count"] = record["message_count"]
+        parent_id = record.get("parent_id") if record else None
+        return CheckpointTuple(
+            config=self._config(session_id, config, checkpoint_id),
+            checkpoint=checkpoint,
+            metadata=metadata,
+            parent_config=self._config(session_id, config, parent_id) if parent_id else None,
+            pending_writes=[],
+        )
+
+    @staticmethod
+    def _config(session_id: str, config: RunnableConfig, checkpoint_id: str) -> RunnableConfig:
+        return {
+            "configurable": {
+                "thread_id": session_id,
+                "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+                "checkpoint_id": checkpoint_id,
+            }
+        }
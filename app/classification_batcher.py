@@ -0,0 +1,269 @@
+"""
+Chamada LLM do classificador, com micro-batching opcional entre sessões.
+
+A chamada individual usa saída estruturada nativa e streaming
+(app/structured_output.py): os campos já fechados no stream (`mode` e
+`intent` primeiro) são repassados a `on_fields` antes do fim do JSON, e
+JSON inválido é consertado localmente ou, em último caso, pedido de novo
+numa segunda chamada.
+
+No pico, centenas de sessões classificam ao mesmo tempo, cada uma com o
+mesmo system prompt estático. Com CLASSIFICATION_BATCH_ENABLED, o
+ClassificationBatcher junta os pedidos que chegam dentro de
+CLASSIFICATION_BATCH_WINDOW_MS (até CLASSIFICATION_BATCH_MAX_SIZE) e faz
+uma única chamada: o system prompt de sempre e uma mensagem com os
+pedidos em JSON, cada um com seu `id`. A resposta é
+{"results": [{"id": ..., <classificação>}, ...]} e cada resultado volta
+para o turno que o aguardava.
+
+- Lote de um só pedido (ninguém chegou na janela) usa a chamada normal.
+- Pedido sem resultado válido no lote é reclassificado sozinho.
+- Erro na chamada do lote (timeout, API fora) propaga para todos os turnos
+  do lote, como aconteceria com chamadas individuais.
+
+O custo é latência: o primeiro pedido do lote espera a janela inteira.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from app.config import (
+    CLASSIFICATION_BATCH_ENABLED,
+    CLASSIFICATION_BATCH_MAX_SIZE,
+    CLASSIFICATION_BATCH_WINDOW_MS,
+    CLASSIFICATION_REPAIR_RETRY,
+    LLM_ROLES,
+    get_llm,
+)
+from app.metrics import (
+    CLASSIFICATION_BATCH_FALLBACKS,
+    CLASSIFICATION_BATCH_SIZE,
+    CLASSIFICATION_ROUTE_LEAD,
+    record_classification_parse,
+    record_llm_call,
+)
+from app.structured_output import (
+    JSONFieldStream,
+    classifier_response_format,
+    coerce_classification,
+    parse_json_reply,
+)
+
+logger = logging.getLogger(__name__)
+
+# Marcadores da mensagem de lote (a LLM fake dos benchmarks também os usa)
+BATCH_MARKER = "## Modo lote"
+BATCH_ITEMS_MARKER = "Pedidos (JSON):"
+
+BATCH_INSTRUCTIONS = f"""\
+{BATCH_MARKER}
+Esta chamada traz VÁRIOS pedidos independentes, de conversas diferentes.
+Classifique CADA pedido isoladamente, com as mesmas regras, usando apenas o
+resumo, o histórico, os slots e a intent acumulada do próprio pedido.
+
+Retorne APENAS um JSON no formato:
+{{"results": [{{"id": "<id do pedido>", "mode": ..., "intent": ..., ...}}]}}
+com exatamente um item por pedido, cada um com todos os campos do formato acima.
+
+{BATCH_ITEMS_MARKER}
+"""
+
+
+REPAIR_PROMPT = """\
+A resposta anterior não é um JSON válido no formato pedido. Responda de novo
+APENAS com o JSON da classificação, completo, sem markdown e sem explicações."""
+
+OnFields = Callable[[dict[str, Any]], None]
+
+
+def _classifier_llm(fused: bool, batch: bool = False, max_tokens: Optional[int] = None):
+    llm = get_llm("classifier")
+    kwargs: dict[str, Any] = {}
+    response_format = classifier_response_format(fused, batch)
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    return llm.bind(**kwargs) if kwargs else llm
+
+
+async def invoke_classifier(
+    messages: list[BaseMessage],
+    fused: bool = False,
+    on_fields: Optional[OnFields] = None,
+) -> Optional[dict]:
+    """
+    Uma chamada de classificação em streaming; devolve o dict validado, ou
+    None se nem o reparo local nem a nova chamada deram um JSON utilizável.
+    `on_fields` recebe os campos de primeiro nível já fechados no stream,
+    a cada campo novo — o dict final só vale depois da validação.
+    """
+    llm = _classifier_llm(fused)
+    fields = JSONFieldStream()
+    routed_at: Optional[float] = None
+    full = None
+    start = time.perf_counter()
+    async for chunk in llm.astream(messages):
+        full = chunk if full is None else full + chunk
+        if chunk.content and fields.feed(chunk.content):
+            if routed_at is None and fields.route() is not None:
+                routed_at = time.perf_counter()
+            if on_fields is not None:
+                on_fields(fields.fields)
+    end = time.perf_counter()
+    record_llm_call("classifier", full, end - start)
+    if routed_at is not None:
+        CLASSIFICATION_ROUTE_LEAD.observe(end - routed_at)
+
+    content = str(full.content) if full is not None else ""
+    raw, outcome = parse_json_reply(content)
+    data = coerce_classification(raw, truncated=outcome == "truncated")
+    if data is not None:
+        record_classification_parse(outcome)
+        return data
+
+    if CLASSIFICATION_REPAIR_RETRY:
+        logger.warning(f"Classificação com JSON inválido ({content[:80]!r}); pedindo de novo")
+        retry = messages + [AIMessage(content=content), HumanMessage(content=REPAIR_PROMPT)]
+        start = time.perf_counter()
+        response = await llm.ainvoke(retry)
+        record_llm_call("classifier", response, time.perf_counter() - start)
+        raw, outcome = parse_json_reply(str(response.content))
+        data = coerce_classification(raw, truncated=outcome == "truncated")
+        if data is not None:
+            record_classification_parse("retried")
+            return data
+
+    logger.warning(f"Classificação com JSON inválido ({content[:80]!r}); usando fallback")
+    record_classification_parse("failed")
+    return None
+
+
+@dataclass
+class _Pending:
+    messages: list[BaseMessage]       # chamada individual (lote de 1 e fallback)
+    payload: dict[str, Any]           # item do lote (sem o id)
+    fused: bool = False
+    on_fields: Optional[OnFields] = None
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class ClassificationBatcher:
+    """Junta classificações concorrentes numa chamada LLM por janela."""
+
+    def __init__(
+        self,
+        enabled: bool = CLASSIFICATION_BATCH_ENABLED,
+        window_ms: float = CLASSIFICATION_BATCH_WINDOW_MS,
+        max_size: int = CLASSIFICATION_BATCH_MAX_SIZE,
+    ):
+        self.enabled = enabled
+        self.window_ms = window_ms
+        self.max_size = max_size
+        self._pending: list[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: set[asyncio.Task] = set()
+
+    async def classify(
+        self,
+        messages: list[BaseMessage],
+        payload: dict[str, Any],
+        fused: bool = False,
+        on_fields: Optional[OnFields] = None,
+    ) -> Optional[dict]:
+        """
+        `messages` é a chamada individual (system + histórico + turno) e
+        `payload` o mesmo pedido como item de lote. Sem batching, só chama.
+        Em lote, `on_fields` só é chamado se o pedido acabar sozinho.
+        """
+        if not self.enabled:
+            return await invoke_classifier(messages, fused, on_fields)
+
+        item = _Pending(messages, payload, fused, on_fields)
+        self._pending.append(item)
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window_ms / 1000, self._flush)
+        return await asyncio.shield(item.future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if not items:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(items))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _run(self, items: list[_Pending]) -> None:
+        CLASSIFICATION_BATCH_SIZE.observe(len(items))
+        try:
+            if len(items) == 1:
+                item = items[0]
+                results: list[Optional[dict]] = [await invoke_classifier(item.messages, item.fused, item.on_fields)]
+            else:
+                results = await self._run_batch(items)
+        except Exception as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+                    item.future.exception()  # turno cancelado não deixa exceção sem dono
+            return
+
+        for item, result in zip(items, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    async def _run_batch(self, items: list[_Pending]) -> list[Optional[dict]]:
+        system = items[0].messages[0]
+        requests = [{"id": str(i), **item.payload} for i, item in enumerate(items)]
+        human = HumanMessage(content=BATCH_INSTRUCTIONS + json.dumps(requests, ensure_ascii=False, indent=1))
+
+        # Saída cresce com o lote: orçamento do classificador por item
+        max_tokens = LLM_ROLES["classifier"]["max_tokens"] * len(items)
+        llm = _classifier_llm(items[0].fused, batch=True, max_tokens=max_tokens)
+        start = time.perf_counter()
+        response = await llm.ainvoke([system, human])
+        record_llm_call("classifier", response, time.perf_counter() - start)
+
+        data, outcome = parse_json_reply(str(response.content))
+        by_id: dict[str, dict] = {}
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            for result in data["results"]:
+                coerced = (
+                    coerce_classification(result, truncated=outcome == "truncated")
+                    if isinstance(result, dict) and "id" in result else None
+                )
+                if coerced is not None:
+                    by_id[str(coerced.pop("id"))] = coerced
+        missing = [i for i in range(len(items)) if str(i) not in by_id]
+        if len(missing) < len(items):
+            record_classification_parse(outcome, len(items) - len(missing))
+        if missing:
+            CLASSIFICATION_BATCH_FALLBACKS.inc(len(missing))
+            logger.warning(f"Lote de {len(items)} classificações sem {len(missing)} resultado(s); reclassificando")
+            retried = await asyncio.gather(*(
+                invoke_classifier(items[i].messages, items[i].fused, items[i].on_fields) for i in missing
+            ))
+            by_id.update({str(i): result for i, result in zip(missing, retried)})
+        return [by_id.get(str(i)) for i in range(len(items))]
+
+    async def drain(self) -> None:
+        """Dispara o lote pendente e espera os lotes em andamento (shutdown/benchmarks)."""
+        self._flush()
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+
+classification_batcher = ClassificationBatcher()
@@ -0,0 +1,115 @@
+"""
+Cache de classificação.
+
+Com temperature=0, a mesma tupla (mensagem, intent, slots, resumo e
+histórico recente) produz a mesma classificação. A chave usa o texto só com
+caixa e espaços normalizados, o modelo do classificador e a versão do
+AGENT_REGISTRY — mudar o registry invalida tudo. Acentos e pontuação ficam
+na chave: o resultado guardado traz `extracted_slots` tirados do texto
+original, e textos que só diferem nisso não podem trocar slots entre si.
+
+Escopo da chave (CLASSIFICATION_CACHE_SCOPE):
+  - context: mensagem + intent + slots + histórico recente (sempre exato)
+  - auto:    small talk sem intent/slots pendentes é cacheado só pela
+             mensagem ("qual a capital da Austrália?" serve qualquer
+             sessão); o resto usa o contexto completo
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Optional
+
+from app.cache import LRUCache, SQLiteCache
+from app.config import (
+    CLASSIFICATION_CACHE_ENABLED,
+    CLASSIFICATION_CACHE_MAX_ENTRIES,
+    CLASSIFICATION_CACHE_SCOPE,
+    CLASSIFICATION_CACHE_SQLITE_PATH,
+    CLASSIFICATION_CACHE_TTL_SECONDS,
+    CLASSIFICATION_HISTORY_TOKENS,
+    LLM_ROLES,
+    registry_version,
+)
+from app.history import budget_history, history_before_turn
+from app.schemas import GraphState
+from app.text import fold_text
+
+
+class ClassificationCache:
+    """Cache de classificações da LLM, invalidado quando o registry muda."""
+
+    def __init__(
+        self,
+        enabled: bool = CLASSIFICATION_CACHE_ENABLED,
+        scope: str = CLASSIFICATION_CACHE_SCOPE,
+        max_entries: int = CLASSIFICATION_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = CLASSIFICATION_CACHE_TTL_SECONDS,
+        sqlite_path: str = CLASSIFICATION_CACHE_SQLITE_PATH,
+    ):
+        if scope not in ("auto", "context"):
+            raise ValueError(f"CLASSIFICATION_CACHE_SCOPE desconhecido: '{scope}'")
+        self.enabled = enabled
+        self.scope = scope
+        persistent = SQLiteCache(sqlite_path, namespace="classification") if sqlite_path else None
+        self._cache = LRUCache(max_entries, ttl_seconds, persistent=persistent)
+        self._version = registry_version()
+
+    def get(self, state: GraphState) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        self._check_registry()
+
+        if self._message_scoped(state):
+            data = self._cache.get(self._key(state, context=False), record_miss=False)
+            if data is not None:
+                return data
+        return self._cache.get(self._key(state, context=True))
+
+    def put(self, state: GraphState, data: dict) -> None:
+        if not self.enabled:
+            return
+        context_free = (
+            self._message_scoped(state)
+            and data.get("mode") == "small_talk"
+            and not data.get("intent")
+        )
+        self._cache.put(self._key(state, context=not context_free), data)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "scope": self.scope, "registry_version": self._version}
+
+    def _message_scoped(self, state: GraphState) -> bool:
+        return self.scope == "auto" and not state.current_intent and not state.slots
+
+    def _check_registry(self) -> None:
+        version = registry_version()
+        if version != self._version:
+            self._cache.clear()
+            self._version = version
+
+    def _key(self, state: GraphState, context: bool) -> str:
+        material: list = [
+            self._version,
+            LLM_ROLES["classifier"]["model"],
+            fold_text(state.user_input),
+        ]
+        if context:
+            material += [
+                state.current_intent,
+                sorted((k, fold_text(v)) for k, v in state.slots.items()),
+                fold_text(state.history_summary),
+                [
+                    (m.get("role"), fold_text(m.get("content", "")))
+                    for m in budget_history(history_before_turn(state), CLASSIFICATION_HISTORY_TOKENS)
+                ],
+            ]
+        payload = json.dumps(material, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+
+classification_cache = ClassificationCache()
@@ -4,7 +4,11 @@ Configuração central: OpenAI, registry de agentes, tom de voz.
 
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
+
+import httpx
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
@@ -12,27 +16,168 @@ from app.schemas import AgentCard
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+# ── LLM: clientes pooled por papel ────────────────────────────────────
+#
+# Cada papel (classifier, synthesizer, summarizer) tem sua própria instância ChatOpenAI,
+# criada sob demanda e reutilizada pelo processo inteiro. Todas compartilham
+# o mesmo pool HTTP keep-alive, então o handshake TCP/TLS é pago uma vez.
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+
+LLM_ROLES: dict[str, dict] = {
+    "classifier": {
+        "model": os.getenv("OPENAI_CLASSIFIER_MODEL") or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        "temperature": 0,
+        "max_tokens": int(os.getenv("OPENAI_CLASSIFIER_MAX_TOKENS", "400")),
+        "timeout": float(os.getenv("OPENAI_CLASSIFIER_TIMEOUT", "20")),
+        "max_retries": 1,
+    },
+    "synthesizer": {
+        "model": os.getenv("OPENAI_SYNTHESIZER_MODEL") or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        "temperature": 0,
+        "max_tokens": int(os.getenv("OPENAI_SYNTHESIZER_MAX_TOKENS", "600")),
+        "timeout": float(os.getenv("OPENAI_SYNTHESIZER_TIMEOUT", "30")),
+        "max_retries": 2,
+    },
+    "summarizer": {
+        "model": os.getenv("OPENAI_SUMMARIZER_MODEL") or os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        "temperature": 0,
+        "max_tokens": int(os.getenv("OPENAI_SUMMARIZER_MAX_TOKENS", "300")),
+        "timeout": float(os.getenv("OPENAI_SUMMARIZER_TIMEOUT", "30")),
+        "max_retries": 2,
+    },
+}
+
+# Preço em USD por 1M tokens, usado na estimativa de custo de /metrics.
+# Modelos fora da tabela têm custo estimado 0.
+LLM_PRICING: dict[str, dict[str, float]] = {
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+}
+
+_llm_clients: dict[str, ChatOpenAI] = {}
+_http_clients: dict[str, httpx.Client | httpx.AsyncClient] = {}
+
 
-def get_llm() -> ChatOpenAI:
-    """Retorna a LLM OpenAI configurada."""
-    return ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-        api_key=os.getenv("OPENAI_API_KEY"),
-        temperature=0,
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
     )
 
 
+def _get_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    """Pool HTTP compartilhado por todas as instâncias de LLM."""
+    if not _http_clients:
+        _http_clients["sync"] = httpx.Client(limits=_http_limits())
+        _http_clients["async"] = httpx.AsyncClient(limits=_http_limits())
+    return _http_clients["sync"], _http_clients["async"]
+
+
+def get_llm(role: str = "synthesizer") -> ChatOpenAI:
+    """Retorna a LLM OpenAI do papel informado (criada uma vez por processo)."""
+    llm = _llm_clients.get(role)
+    if llm is None:
+        params = LLM_ROLES[role]
+        http_client, http_async_client = _get_http_clients()
+        llm = ChatOpenAI(
+            model=params["model"],
+            api_key=os.getenv("OPENAI_API_KEY"),
+            temperature=params["temperature"],
+            max_tokens=params["max_tokens"],
+            timeout=params["timeout"],
+            max_retries=params["max_retries"],
+            stream_usage=True,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+        _llm_clients[role] = llm
+    return llm
+
+
+def set_llm(role: str, llm) -> None:
+    """Substitui a LLM de um papel (usado por benchmarks com LLM fake)."""
+    _llm_clients[role] = llm
+
+
+async def warmup_llms() -> None:
+    """Cria as LLMs de todos os papéis e abre as conexões do pool."""
+    for role in LLM_ROLES:
+        try:
+            llm = get_llm(role)
+        except Exception as e:
+            logger.warning(f"LLM '{role}' não pôde ser criada no warmup: {e}")
+            continue
+        client = getattr(llm, "root_async_client", None)
+        if client is None:
+            continue
+        try:
+            await client.models.retrieve(llm.model_name)
+            logger.info(f"LLM '{role}' aquecida ({llm.model_name})")
+        except Exception as e:
+            logger.warning(f"Warmup da LLM '{role}' falhou: {e}")
+
+
+async def close_llms() -> None:
+    """Fecha o pool HTTP compartilhado das LLMs."""
+    for client in _http_clients.values():
+        if isinstance(client, httpx.AsyncClient):
+            await client.aclose()
+        else:
+            client.close()
+    _http_clients.clear()
+    _llm_clients.clear()
+
+
+# ── Fast path de classificação (sem LLM) ──────────────────────────────
+
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+
+
+# ── Shortlist de agentes (registries grandes) ─────────────────────────
+#
+# Com mais de AGENT_SHORTLIST_MIN_AGENTS agentes, o prompt de classificação
+# leva só os AGENT_SHORTLIST_K mais parecidos com a mensagem (índice léxico
+# local em app/agent_index.py) mais o agente da intent acumulada.
+
+AGENT_SHORTLIST_ENABLED = os.getenv("AGENT_SHORTLIST_ENABLED", "true").lower() in ("1", "true", "yes")
+AGENT_SHORTLIST_K = int(os.getenv("AGENT_SHORTLIST_K", "8"))
+AGENT_SHORTLIST_MIN_AGENTS = int(os.getenv("AGENT_SHORTLIST_MIN_AGENTS", "20"))
+
+
+# ── Modo fundido (opt-in) ─────────────────────────────────────────────
+#
+# Uma única chamada LLM devolve a classificação e, para small_talk/clarify,
+# já a resposta ao usuário — o Synthesis só a repassa. dispatch/self_serve
+# continuam com duas chamadas (a resposta depende do resultado do agente).
+
+FUSED_MODE_ENABLED = os.getenv("FUSED_MODE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
 # ── Tom de voz (usado exclusivamente pelo Synthesis) ──────────────────
 
-VOICE_TONE = os.getenv(
-    "VOICE_TONE",
-    (
-        "Você é a Aava, assistente virtual pessoal. "
-        "Fale de forma profissional, acolhedora e direta. "
-        "Use português brasileiro. Seja breve (2-4 frases). "
-        "Nunca invente dados — use apenas o que recebeu nos resultados estruturados."
-    ),
+DEFAULT_VOICE_TONE = (
+    "Você é a Aava, assistente virtual pessoal. "
+    "Fale de forma profissional, acolhedora e direta. "
+    "Use português brasileiro. Seja breve (2-4 frases). "
+    "Nunca invente dados — use apenas o que recebeu nos resultados estruturados."
 )
+VOICE_TONE = os.getenv("VOICE_TONE", DEFAULT_VOICE_TONE)
+
+# Respostas por template para NodeResults formulaicos (app/response_templates.py):
+# auto = estilo "formal" com o VOICE_TONE padrão, desligado com tom customizado;
+# off = sempre LLM; formal | casual = força o estilo
+RESPONSE_TEMPLATES = os.getenv("RESPONSE_TEMPLATES", "auto")
 
 
 # ── Registry de Agentes ────────────────────────────────────────────────
@@ -49,12 +194,20 @@ AGENT_REGISTRY: dict[str, AgentCard] = {
         name="Agente Clima",
         description="Consulta a previsão do tempo para uma cidade",
         required_slots=["cidade"],
+        timeout=10.0,
+        max_retries=2,
+        idempotent=True,
+        hedge_after=0.3,
+        cache_ttl=300.0,
     ),
     "traduzir": AgentCard(
         id="agent-traduzir",
         name="Agente Tradutor",
         description="Traduz um texto para outro idioma",
         required_slots=["texto", "idioma"],
+        max_retries=1,
+        idempotent=True,
+        cache_ttl=3600.0,
     ),
     "lembrete": AgentCard(
         id="agent-lembrete",
@@ -64,5 +217,162 @@ AGENT_REGISTRY: dict[str, AgentCard] = {
     ),
 }
 
+_registry_fingerprint: tuple = ()
+_registry_version = ""
+
+
+def registry_version() -> str:
+    """Hash do conteúdo do AGENT_REGISTRY — muda quando um agente é adicionado/alterado.
+
+    Estável entre restarts (baseado em conteúdo); recalculado só quando o
+    conjunto de cards muda de identidade.
+    """
+    global _registry_fingerprint, _registry_version
+    fingerprint = tuple((intent, id(card)) for intent, card in AGENT_REGISTRY.items())
+    if fingerprint != _registry_fingerprint:
+        digest = hashlib.sha1()
+        for intent, card in sorted(AGENT_REGISTRY.items()):
+            digest.update(intent.encode())
+            digest.update(card.model_dump_json().encode())
+        _registry_fingerprint = fingerprint
+        _registry_version = digest.hexdigest()[:12]
+    return _registry_version
+
+
 AGENTS_API_BASE_URL = os.getenv("AGENTS_API_BASE_URL", "http://localhost:8001")
-AGENTS_API_KEY = os.getenv("AGENTS_API_KEY", "")
\ No newline at end of file
+AGENTS_API_KEY = os.getenv("AGENTS_API_KEY", "")
+AGENTS_API_HTTP2 = os.getenv("AGENTS_API_HTTP2", "false").lower() in ("1", "true", "yes")
+AGENTS_API_MAX_CONNECTIONS = int(os.getenv("AGENTS_API_MAX_CONNECTIONS", "100"))
+AGENTS_API_MAX_KEEPALIVE = int(os.getenv("AGENTS_API_MAX_KEEPALIVE", "20"))
+# Circuit breaker por agent_id: abre quando a taxa de falha (erro de transporte
+# ou HTTP 5xx) nas últimas AGENT_CIRCUIT_WINDOW tentativas passa do limite e
+# falha rápido por AGENT_CIRCUIT_OPEN_SECONDS; depois libera tentativas de teste (half-open)
+AGENT_CIRCUIT_WINDOW = int(os.getenv("AGENT_CIRCUIT_WINDOW", "20"))
+AGENT_CIRCUIT_MIN_CALLS = int(os.getenv("AGENT_CIRCUIT_MIN_CALLS", "5"))
+AGENT_CIRCUIT_FAILURE_RATE = float(os.getenv("AGENT_CIRCUIT_FAILURE_RATE", "0.5"))
+AGENT_CIRCUIT_OPEN_SECONDS = float(os.getenv("AGENT_CIRCUIT_OPEN_SECONDS", "30"))
+AGENT_CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("AGENT_CIRCUIT_HALF_OPEN_PROBES", "1"))
+# Bulkhead: requisições simultâneas por agente (AgentCard.max_concurrency sobrescreve)
+# e espera máxima por uma vaga antes de rejeitar
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "20"))
+AGENT_BULKHEAD_WAIT = float(os.getenv("AGENT_BULKHEAD_WAIT", "0.5"))
+# Jobs assíncronos: agente responde 202 + job_id e o resultado chega depois.
+# Com AGENT_JOBS_CALLBACK_URL (URL pública deste orquestrador) o agente avisa por
+# webhook em POST /agents/callback/{session_id}; vazio = poller em background
+AGENT_JOBS_CALLBACK_URL = os.getenv("AGENT_JOBS_CALLBACK_URL", "")
+AGENT_JOBS_CALLBACK_SECRET = os.getenv("AGENT_JOBS_CALLBACK_SECRET", "")  # assina o token do callback
+AGENT_JOB_POLL_INTERVAL = float(os.getenv("AGENT_JOB_POLL_INTERVAL", "1.0"))
+AGENT_JOB_TIMEOUT = float(os.getenv("AGENT_JOB_TIMEOUT", "600"))
+
+# Fan-out (vários pedidos na mesma mensagem): prazo de cada agente, incluindo
+# retries — um agente lento vira resultado de erro sem segurar os demais
+FAN_OUT_AGENT_TIMEOUT = float(os.getenv("FAN_OUT_AGENT_TIMEOUT", "15"))
+
+
+# ── Sessões ────────────────────────────────────────────────────────────
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")          # memory | sqlite
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+# Intervalo mínimo entre varreduras de sessões expiradas no backend sqlite
+# (feitas nas escritas; sessão abandonada não é lida de novo)
+SESSION_PURGE_INTERVAL_SECONDS = float(os.getenv("SESSION_PURGE_INTERVAL_SECONDS", "300"))
+# Mensagens recentes carregadas no estado do turno; as anteriores entram no resumo
+SESSION_HISTORY_WINDOW = int(os.getenv("SESSION_HISTORY_WINDOW", "20"))
+# Mensagens mantidas no store por sessão; as mais antigas são arquivadas
+SESSION_MAX_STORED_MESSAGES = int(os.getenv("SESSION_MAX_STORED_MESSAGES", "200"))
+# Arquivo JSONL de mensagens arquivadas do backend memory (vazio = descarta).
+# O backend sqlite arquiva na tabela session_messages_archive.
+SESSION_ARCHIVE_PATH = os.getenv("SESSION_ARCHIVE_PATH", "")
+# Checkpoints dos últimos turnos guardados por sessão (app/checkpoint.py)
+SESSION_CHECKPOINT_HISTORY = int(os.getenv("SESSION_CHECKPOINT_HISTORY", "10"))
+
+
+# ── Deploy multi-worker (serve.py) ────────────────────────────────────
+#
+# serve.py sobe WORKERS processos uvicorn, sem reload. Com mais de um worker
+# as sessões precisam de SESSION_BACKEND=sqlite (o backend memory é por processo).
+# SESSION_AFFINITY: roteador com hash consistente na frente dos workers — a
+# mesma sessão sempre no mesmo worker (lock do turno e caches locais quentes).
+
+WORKERS = int(os.getenv("WORKERS", "0"))   # 0 = nº de CPUs
+SESSION_AFFINITY = os.getenv("SESSION_AFFINITY", "false").lower() in ("1", "true", "yes")
+# Pontos de cada worker no anel: mais pontos = sessões mais bem distribuídas
+AFFINITY_VIRTUAL_NODES = int(os.getenv("AFFINITY_VIRTUAL_NODES", "160"))
+WORKER_SOCKET_DIR = os.getenv("WORKER_SOCKET_DIR", "")   # vazio = diretório temporário
+
+
+# ── Histórico: orçamento de tokens e resumo incremental ───────────────
+
+# Orçamento (tokens estimados) do histórico que cada LLM vê — também define
+# o histórico que entra na chave do cache de classificação
+CLASSIFICATION_HISTORY_TOKENS = int(os.getenv("CLASSIFICATION_HISTORY_TOKENS", "800"))
+SYNTHESIS_HISTORY_TOKENS = int(os.getenv("SYNTHESIS_HISTORY_TOKENS", "1200"))
+# Mensagens do histórico maiores que isso são truncadas no prompt (textos colados)
+HISTORY_MAX_MESSAGE_TOKENS = int(os.getenv("HISTORY_MAX_MESSAGE_TOKENS", "250"))
+# Resumo incremental das mensagens que saíram da janela, atualizado em background
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "true").lower() in ("1", "true", "yes")
+# Mensagens novas fora da janela necessárias para disparar uma atualização
+HISTORY_SUMMARY_BATCH = int(os.getenv("HISTORY_SUMMARY_BATCH", "6"))
+
+
+# ── Cache de classificação ─────────────────────────────────────────────
+
+CLASSIFICATION_CACHE_ENABLED = os.getenv("CLASSIFICATION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# auto: small talk sem intent pendente usa só a mensagem; o resto usa contexto completo
+# context: sempre mensagem + intent + slots + histórico recente
+CLASSIFICATION_CACHE_SCOPE = os.getenv("CLASSIFICATION_CACHE_SCOPE", "auto")
+CLASSIFICATION_CACHE_MAX_ENTRIES = int(os.getenv("CLASSIFICATION_CACHE_MAX_ENTRIES", "10000"))
+CLASSIFICATION_CACHE_TTL_SECONDS = float(os.getenv("CLASSIFICATION_CACHE_TTL_SECONDS", "3600"))
+CLASSIFICATION_CACHE_SQLITE_PATH = os.getenv("CLASSIFICATION_CACHE_SQLITE_PATH", "")  # vazio = só memória
+
+
+# ── Saída estruturada do classificador ────────────────────────────────
+#
+# json_schema: structured output nativo com o schema de Classification (não strict)
+# json_object: JSON mode (modelos sem json_schema)
+# off: só as instruções do prompt
+# JSON inválido é consertado localmente; se nem assim, uma nova chamada
+# pede o JSON de novo (CLASSIFICATION_REPAIR_RETRY) antes do fallback small_talk.
+
+CLASSIFIER_RESPONSE_FORMAT = os.getenv("CLASSIFIER_RESPONSE_FORMAT", "json_schema")
+CLASSIFICATION_REPAIR_RETRY = os.getenv("CLASSIFICATION_REPAIR_RETRY", "true").lower() in ("1", "true", "yes")
+
+
+# ── Dispatch especulativo (opt-in) ────────────────────────────────────
+#
+# Com a classificação em streaming, assim que mode=dispatch, intent e slots
+# obrigatórios fecham no JSON, a chamada do agente já começa; a
+# classificação final confirma (o dispatch usa o resultado) ou cancela.
+# Só agentes `idempotent` — uma chamada cancelada não pode ter efeito.
+
+SPECULATIVE_DISPATCH_ENABLED = os.getenv("SPECULATIVE_DISPATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+# ── Micro-batching de classificação (opt-in) ──────────────────────────
+#
+# Classificações de sessões diferentes que chegam dentro da janela vão numa
+# única chamada LLM (mesmo prefixo estático, uma resposta com N resultados).
+# Janela maior = lotes maiores e menos chamadas, mas até WINDOW_MS a mais por turno.
+
+CLASSIFICATION_BATCH_ENABLED = os.getenv("CLASSIFICATION_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+CLASSIFICATION_BATCH_WINDOW_MS = float(os.getenv("CLASSIFICATION_BATCH_WINDOW_MS", "15"))
+CLASSIFICATION_BATCH_MAX_SIZE = int(os.getenv("CLASSIFICATION_BATCH_MAX_SIZE", "16"))
+
+
+# ── Idempotência (header Idempotency-Key em POST /chat) ────────────────
+
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() in ("1", "true", "yes")
+# Janela em que um retry com a mesma chave recebe a resposta guardada
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_SQLITE_PATH = os.getenv("IDEMPOTENCY_SQLITE_PATH", "")  # vazio = só memória (por worker)
+
+
+# ── Cache de resultados de agentes (AgentCard.cache_ttl) ───────────────
+
+AGENT_CACHE_ENABLED = os.getenv("AGENT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+AGENT_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "10000"))
+AGENT_CACHE_SQLITE_PATH = os.getenv("AGENT_CACHE_SQLITE_PATH", "")  # vazio = só memória (por worker)
@@ -0,0 +1,203 @@
+"""
+Fast path de classificação — regras e léxico, sem LLM.
+
+Cobre dois casos óbvios:
+  1. Cumprimentos / agradecimentos / despedidas isolados → small_talk.
+  2. Clarify com exatamente UM slot pendente e resposta curta ("Curitiba")
+     → preenche o slot e segue para dispatch/self_serve. Slots com formato
+     conhecido (data, horário, nomes) só passam se o valor tiver esse formato
+     — "me conta uma piada" não vira `cidade`.
+
+Retorna o mesmo dict que a LLM retornaria, ou None para cair na LLM.
+Só responde quando a confiança atinge FAST_PATH_MIN_CONFIDENCE.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Optional
+
+from app.config import AGENT_REGISTRY, FAST_PATH_ENABLED, FAST_PATH_MIN_CONFIDENCE, registry_version
+from app.schemas import GraphState
+from app.text import normalize_text
+
+
+# Frases já normalizadas (sem acento, minúsculas)
+SMALL_TALK_PHRASES = {
+    # cumprimentos
+    "oi", "oie", "ola", "opa", "eai", "e ai", "hey", "hello", "hi", "salve",
+    "bom dia", "boa tarde", "boa noite", "tudo bem", "tudo bom", "como vai",
+    "beleza", "blz",
+    # agradecimentos
+    "obrigado", "obrigada", "muito obrigado", "muito obrigada", "brigado", "brigada",
+    "valeu", "vlw", "obg", "thanks", "tmj", "show", "perfeito", "otimo", "legal",
+    # despedidas
+    "tchau", "ate logo", "ate mais", "falou", "flw", "bye",
+}
+_MAX_PHRASE_WORDS = max(len(p.split()) for p in SMALL_TALK_PHRASES)
+
+# Palavras que indicam mudança de assunto no meio de um clarify
+CANCEL_WORDS = {"cancela", "cancelar", "esquece", "deixa", "nao", "pare", "desisto", "nada"}
+
+# Respostas que não são valor de slot ("sim", "ok") — deixa a LLM decidir
+NON_ANSWERS = {"sim", "ok", "okay", "certo", "hmm", "hum", "ue", "como assim"}
+
+# Preposições/artigos removidos do início de uma resposta de slot ("em Curitiba", "no dia 15/03")
+SLOT_FILLERS = {
+    "em", "de", "do", "da", "pra", "pro", "para", "no", "na", "e", "eh", "as", "a", "o",
+    "dia", "cidade", "hora", "horario", "lingua", "idioma", "nome",
+}
+
+_WEEKDAYS = r"(?:segunda|terca|quarta|quinta|sexta|sabado|domingo)(?: feira)?"
+_DAYS = rf"(?:hoje|amanha|depois de amanha|(?:proxim[ao] )?{_WEEKDAYS})"
+_MONTHS = r"(?:janeiro|fevereiro|marco|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)"
+
+# Formato esperado por slot (sobre o valor normalizado). "name" = nome próprio
+# curto, sem palavras de frase; slots de texto livre (texto, descricao) não têm.
+SLOT_VALUE_PATTERNS = {
+    "data": re.compile(
+        rf"^(?:\d{{1,2}}[/.-]\d{{1,2}}(?:[/.-]\d{{2,4}})?|\d{{1,2}}(?: de)? {_MONTHS}(?: de \d{{4}})?|{_DAYS})$"
+    ),
+    "horario": re.compile(
+        rf"^(?:{_DAYS}(?: as| a)? )?(?:\d{{1,2}}(?:h\d{{0,2}}|:\d{{2}}| horas)|meio dia|meia noite)"
+        r"(?: (?:da|de) (?:manha|tarde|noite))?$"
+    ),
+    "cidade": "name",
+    "nome": "name",
+    "idioma": "name",
+}
+
+# Palavras de frase (pronomes, artigos, verbos de pedido): valor com elas não é nome
+NON_NAME_WORDS = {
+    "me", "te", "se", "eu", "voce", "ele", "ela", "nos", "um", "uma", "uns", "umas", "o", "a", "os",
+    "que", "qual", "quero", "queria", "conta", "fala", "faz", "faca", "manda", "mostra", "diz", "pode",
+    "poderia", "preciso", "isso", "esse", "essa", "isto", "meu", "minha", "com", "sem", "por", "mais",
+    "muito", "tambem", "agora", "depois", "outra", "outro", "coisa",
+}
+
+# Confiança da resposta de slot que não tem o formato esperado (abaixo do mínimo → LLM)
+MALFORMED_SLOT_CONFIDENCE = 0.5
+
+MAX_SLOT_ANSWER_WORDS = 4
+SMALL_TALK_CONFIDENCE = 0.95
+
+fast_path_stats: Counter[str] = Counter()
+
+
+def _is_small_talk(normalized: str) -> bool:
+    """True se a mensagem é composta apenas por frases do léxico de small talk."""
+    words = normalized.split()
+    if not words:
+        return False
+    i = 0
+    while i < len(words):
+        for size in range(min(_MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+            if " ".join(words[i:i + size]) in SMALL_TALK_PHRASES:
+                i += size
+                break
+        else:
+            return False
+    return True
+
+
+def _other_intent_words(intent: str) -> frozenset[str]:
+    """Palavras (≥5 letras) que descrevem OUTROS agentes — sinal de troca de intent."""
+    return _intent_words_excluding(registry_version(), intent)
+
+
+@lru_cache(maxsize=256)
+def _intent_words_excluding(version: str, intent: str) -> frozenset[str]:
+    """Calculado uma vez por versão do registry — com centenas de agentes não é de graça."""
+    words: set[str] = set()
+    for other, card in AGENT_REGISTRY.items():
+        if other == intent:
+            continue
+        text = normalize_text(f"{other.replace('_', ' ')} {card.name} {card.description}")
+        words.update(w for w in text.split() if len(w) >= 5 and w != "agente")
+    return frozenset(words)
+
+
+def _valid_slot_value(slot: str, value: str) -> bool:
+    """True se o valor tem o formato esperado do slot (ou o slot é de texto livre)."""
+    pattern = SLOT_VALUE_PATTERNS.get(slot)
+    if pattern is None:
+        return True
+    normalized = normalize_text(value, keep_punctuation=True)
+    if pattern == "name":
+        words = normalize_text(value).split()
+        return any(w.isalpha() and len(w) >= 3 for w in words) and not set(words) & NON_NAME_WORDS
+    return pattern.match(normalized) is not None
+
+
+def _slot_answer(state: GraphState) -> Optional[tuple[dict, float]]:
+    """Preenche diretamente o único slot pendente a partir de uma resposta curta."""
+    intent = state.current_intent
+    card = AGENT_REGISTRY.get(intent) if intent else None
+    if card is None:
+        return None
+
+    missing = [slot for slot in card.required_slots if not state.slots.get(slot)]
+    if len(missing) != 1:
+        return None
+
+    raw = state.user_input.strip()
+    normalized = normalize_text(raw)
+    words = normalized.split()
+    if not words or "?" in raw or words[0] in CANCEL_WORDS or normalized in NON_ANSWERS:
+        return None
+    if set(words) & _other_intent_words(intent):
+        return None
+
+    value_words = raw.split()
+    while len(value_words) > 1 and normalize_text(value_words[0]) in SLOT_FILLERS:
+        value_words = value_words[1:]
+    value = " ".join(value_words).strip(" .,!;:\"'")
+    if not value:
+        return None
+
+    if not _valid_slot_value(missing[0], value):
+        confidence = MALFORMED_SLOT_CONFIDENCE
+    elif len(value_words) <= MAX_SLOT_ANSWER_WORDS:
+        confidence = 0.95
+    else:
+        confidence = 0.7
+    data = {
+        "mode": "self_serve" if card.self_serve else "dispatch",
+        "intent": intent,
+        "confidence": confidence,
+        "missing_slots": [],
+        "question_to_ask": None,
+        "candidate_agents": [card.id],
+        "extracted_slots": {missing[0]: value},
+    }
+    return data, confidence
+
+
+def fast_classify(state: GraphState) -> Optional[dict]:
+    """Classificação determinística; None quando a confiança é baixa (usa a LLM)."""
+    if not FAST_PATH_ENABLED:
+        return None
+
+    normalized = normalize_text(state.user_input)
+
+    if _is_small_talk(normalized) and SMALL_TALK_CONFIDENCE >= FAST_PATH_MIN_CONFIDENCE:
+        fast_path_stats["small_talk"] += 1
+        return {
+            "mode": "small_talk",
+            "intent": None,
+            "confidence": SMALL_TALK_CONFIDENCE,
+            "missing_slots": [],
+            "question_to_ask": None,
+            "candidate_agents": [],
+            "extracted_slots": {},
+        }
+
+    answer = _slot_answer(state)
+    if answer is not None and answer[1] >= FAST_PATH_MIN_CONFIDENCE:
+        fast_path_stats["slot_fill"] += 1
+        return answer[0]
+
+    fast_path_stats["llm"] += 1
+    return None
@@ -8,14 +8,24 @@ Fluxo:
   intake → classification → ┬─ small_talk ─┐
                              ├─ clarify    ─┤
                              ├─ self_serve ─┤──→ synthesis → END
-                             └─ dispatch   ─┘
+                             ├─ dispatch   ─┤
+                             └─ fan_out    ─┘   (2+ intents na mesma mensagem)
+
+O estado da sessão entra e sai pelo checkpointer (app/checkpoint.py),
+com thread_id = session_id: cada turno passa só a mensagem nova.
 """
 
 from __future__ import annotations
 
+from typing import Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, END
 
+from app.checkpoint import SessionCheckpointer
+from app.metrics import instrument_node
 from app.schemas import GraphState
+from app.session import session_manager
 from app.nodes import (
     intake_node,
     classification_node,
@@ -23,6 +33,7 @@ from app.nodes import (
     clarify_node,
     self_serve_node,
     dispatch_node,
+    fan_out_node,
     synthesis_node,
 )
 
@@ -31,22 +42,25 @@ def route_after_classification(state: GraphState) -> str:
     """Conditional edge: roteia com base no mode da classificação."""
     if state.classification is None:
         return "clarify"
+    if len(state.classification.intents) > 1:
+        return "fan_out"
     return state.classification.mode.value
 
 
-def build_graph() -> StateGraph:
-    """Constrói e compila o grafo do orquestrador."""
+def build_graph(checkpointer: Optional[BaseCheckpointSaver] = None) -> StateGraph:
+    """Constrói e compila o grafo do orquestrador (sem checkpointer: estado todo na entrada)."""
 
     graph = StateGraph(GraphState)
 
-    # ── Nós ────────────────────────────────────────────────
-    graph.add_node("intake", intake_node)
-    graph.add_node("classification", classification_node)
-    graph.add_node("small_talk", small_talk_node)
-    graph.add_node("clarify", clarify_node)
-    graph.add_node("self_serve", self_serve_node)
-    graph.add_node("dispatch", dispatch_node)
-    graph.add_node("synthesis", synthesis_node)
+    # ── Nós (instrumentados: latência + node_path) ─────────
+    graph.add_node("intake", instrument_node("intake", intake_node))
+    graph.add_node("classification", instrument_node("classification", classification_node))
+    graph.add_node("small_talk", instrument_node("small_talk", small_talk_node))
+    graph.add_node("clarify", instrument_node("clarify", clarify_node))
+    graph.add_node("self_serve", instrument_node("self_serve", self_serve_node))
+    graph.add_node("dispatch", instrument_node("dispatch", dispatch_node))
+    graph.add_node("fan_out", instrument_node("fan_out", fan_out_node))
+    graph.add_node("synthesis", instrument_node("synthesis", synthesis_node))
 
     # ── Arestas ────────────────────────────────────────────
 
@@ -65,6 +79,7 @@ def build_graph() -> StateGraph:
             "clarify": "clarify",
             "self_serve": "self_serve",
             "dispatch": "dispatch",
+            "fan_out": "fan_out",
         },
     )
 
@@ -73,10 +88,11 @@ def build_graph() -> StateGraph:
     graph.add_edge("clarify", "synthesis")
     graph.add_edge("self_serve", "synthesis")
     graph.add_edge("dispatch", "synthesis")
+    graph.add_edge("fan_out", "synthesis")
     graph.add_edge("synthesis", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
 
 
-# Singleton compilado
-orchestrator_graph = build_graph()
+# Singleton compilado — sessões do session_manager como threads do LangGraph
+orchestrator_graph = build_graph(checkpointer=SessionCheckpointer(session_manager))
@@ -0,0 +1,222 @@
+"""
+Histórico da conversa: orçamento de tokens e resumo incremental.
+
+  - `budget_history` escolhe as mensagens mais recentes que cabem num
+    orçamento de tokens (estimado), truncando mensagens longas — o tamanho
+    do prompt fica limitado mesmo com textos colados.
+  - `HistorySummarizer` mantém, por sessão, um resumo das mensagens que
+    não entram mais no prompt: as que saíram da janela recente
+    (SESSION_HISTORY_WINDOW) e as que, mesmo na janela, ficam fora do menor
+    orçamento de tokens (textos colados longos). Roda em background depois
+    do turno, fora do caminho crítico, e é incremental:
+    resumo anterior + mensagens novas → resumo novo.
+
+A contagem de tokens é estimada (~4 caracteres por token) para não
+depender de tokenizer no caminho crítico; serve para orçamento, não para
+cobrança.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from app.config import (
+    CLASSIFICATION_HISTORY_TOKENS,
+    HISTORY_MAX_MESSAGE_TOKENS,
+    HISTORY_SUMMARY_BATCH,
+    HISTORY_SUMMARY_ENABLED,
+    SESSION_HISTORY_WINDOW,
+    SYNTHESIS_HISTORY_TOKENS,
+    get_llm,
+)
+from app.metrics import record_llm_call
+from app.schemas import GraphState
+
+if TYPE_CHECKING:
+    from app.session import SessionStore
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARK = " …[truncado]"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + TRUNCATION_MARK
+
+
+def history_before_turn(state: GraphState) -> list[dict[str, str]]:
+    """Histórico sem a mensagem do turno atual (que já vai no prompt como mensagem atual)."""
+    messages = state.messages
+    if messages and messages[-1].get("role") == "user" and messages[-1].get("content") == state.user_input:
+        return messages[:-1]
+    return messages
+
+
+def budget_history(
+    messages: list[dict[str, str]],
+    max_tokens: int,
+    max_message_tokens: int = HISTORY_MAX_MESSAGE_TOKENS,
+) -> list[dict[str, str]]:
+    """Mensagens mais recentes que cabem em `max_tokens`, em ordem cronológica."""
+    selected = []
+    used = 0
+    for msg in reversed(messages):
+        content = msg.get("content", "")
+        truncated = truncate_to_tokens(content, max_message_tokens)
+        cost = estimate_tokens(truncated) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > max_tokens:
+            break
+        used += cost
+        selected.append(msg if truncated is content else {**msg, "content": truncated})
+    selected.reverse()
+    return selected
+
+
+def format_history(messages: list[dict[str, str]]) -> str:
+    return "\n".join(
+        f"{'Usuário' if m.get('role') == 'user' else 'Assistente'}: {m.get('content', '')}"
+        for m in messages
+    )
+
+
+# ══════════════════════════════════════════════════════════════════════
+# Resumo incremental
+# ══════════════════════════════════════════════════════════════════════
+
+SUMMARY_PROMPT = """\
+Você mantém o resumo de uma conversa entre um usuário e um assistente virtual.
+
+Atualize o resumo atual incorporando as novas mensagens. Preserve o que for útil
+para os próximos turnos: pedidos feitos, dados informados (nomes, datas, cidades,
+horários, textos), resultados entregues e preferências do usuário. Descarte
+cumprimentos e conversa fiada.
+
+Escreva em português, em no máximo 120 palavras. Responda APENAS com o resumo.
+"""
+
+SUMMARY_TURN_TEMPLATE = """\
+## Resumo atual
+{summary}
+
+## Novas mensagens
+{messages}"""
+
+
+class HistorySummarizer:
+    """Atualiza o resumo das sessões em background, no máximo uma tarefa por sessão."""
+
+    def __init__(
+        self,
+        enabled: bool = HISTORY_SUMMARY_ENABLED,
+        window: int = SESSION_HISTORY_WINDOW,
+        batch: int = HISTORY_SUMMARY_BATCH,
+        prompt_tokens: int = min(CLASSIFICATION_HISTORY_TOKENS, SYNTHESIS_HISTORY_TOKENS),
+    ):
+        self.enabled = enabled
+        self.window = window
+        self.batch = batch
+        # Menor orçamento de histórico dos prompts: o que fica fora dele só chega pelo resumo
+        self.prompt_tokens = prompt_tokens
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.counters: Counter = Counter()
+
+    def due(
+        self, store: SessionStore, session_id: str, message_count: int, recent: list[dict[str, str]],
+    ) -> Optional[int]:
+        """Até onde resumir, se já há um lote fora do prompt e ainda não resumido; senão None.
+
+        `recent` são as últimas mensagens da sessão (a janela do turno mais as
+        novas): o próximo prompt leva só as que cabem no orçamento de tokens.
+        Lê o resumo do store — com store bloqueante, roda junto com a escrita
+        do turno, fora do event loop (SessionManager.acommit_turn).
+        """
+        if not self.enabled or session_id in self._tasks:
+            return None
+        target = message_count - self.prompt_kept(recent)
+        if target < self.batch:
+            return None
+        info = store.get_summary(session_id)
+        if info is None:
+            return None
+        _, upto, total = info
+        return target if min(target, total) - upto >= self.batch else None
+
+    def start(self, store: SessionStore, session_id: str, target: int) -> None:
+        """Dispara em background a atualização do resumo até `target` (ver `due`). Não bloqueia."""
+        if session_id in self._tasks:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # chamado fora de um event loop (ex.: benchmarks síncronos)
+        task = loop.create_task(self._run(store, session_id, target))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(session_id, None))
+
+    async def drain(self) -> None:
+        """Aguarda as atualizações em andamento (shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "in_flight": len(self._tasks), **self.counters}
+
+    def prompt_kept(self, recent: list[dict[str, str]]) -> int:
+        """Quantas das mensagens mais recentes o próximo prompt ainda leva (janela ∩ orçamento)."""
+        return len(budget_history(recent[-self.window:] if self.window else [], self.prompt_tokens))
+
+    async def _run(self, store: SessionStore, session_id: str, target: int) -> None:
+        """Resume as mensagens em [upto, target) — `target` é onde o prompt começa."""
+        info = store.get_summary(session_id)
+        if info is None:
+            return
+        summary, upto, total = info
+        target = min(target, total)
+        if target - upto < self.batch:
+            return
+
+        messages = store.messages_range(session_id, upto, target)
+        try:
+            new_summary = await self.summarize(summary, messages)
+        except Exception as e:
+            self.counters["failures"] += 1
+            logger.warning(f"[{session_id}] Falha ao atualizar o resumo do histórico: {e!r}")
+            return
+
+        store.set_summary(session_id, new_summary, target)
+        self.counters["runs"] += 1
+        self.counters["messages_summarized"] += len(messages)
+
+    @staticmethod
+    async def summarize(summary: str, messages: list[dict[str, str]]) -> str:
+        llm = get_llm("summarizer")
+        trimmed = [
+            {**m, "content": truncate_to_tokens(m.get("content", ""), HISTORY_MAX_MESSAGE_TOKENS)}
+            for m in messages
+        ]
+        human = HumanMessage(content=SUMMARY_TURN_TEMPLATE.format(
+            summary=summary or "(vazio)",
+            messages=format_history(trimmed),
+        ))
+        start = time.perf_counter()
+        response = await llm.ainvoke([SystemMessage(content=SUMMARY_PROMPT), human])
+        record_llm_call("summarizer", response, time.perf_counter() - start)
+        return str(response.content).strip()
+
+
+history_summarizer = HistorySummarizer()
@@ -0,0 +1,108 @@
+"""
+Idempotência de POST /chat via header `Idempotency-Key`.
+
+Clientes que reenviam após timeout não devem rodar o turno (e as chamadas
+LLM) duas vezes. A primeira requisição com uma chave executa o turno e
+guarda o ChatResponse por IDEMPOTENCY_TTL_SECONDS; retries com a mesma
+chave recebem a resposta guardada sem passar pelo grafo. Um retry que
+chega enquanto o original ainda roda espera por ele em vez de executar
+de novo.
+
+A chave vale para um único pedido: reutilizá-la com outra sessão ou outra
+mensagem é erro do cliente (IdempotencyConflict → HTTP 422). Turnos que
+falham não são guardados — o retry executa normalmente.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+from app.cache import LRUCache, SQLiteCache
+from app.config import (
+    IDEMPOTENCY_ENABLED,
+    IDEMPOTENCY_MAX_ENTRIES,
+    IDEMPOTENCY_SQLITE_PATH,
+    IDEMPOTENCY_TTL_SECONDS,
+)
+from app.schemas import ChatRequest, ChatResponse
+
+
+class IdempotencyConflict(Exception):
+    """Idempotency-Key reutilizada com um pedido diferente."""
+
+
+def _fingerprint(request: ChatRequest) -> str:
+    return hashlib.sha256(f"{request.session_id or ''}\x00{request.message}".encode()).hexdigest()
+
+
+class IdempotencyCache:
+    """Respostas de /chat por Idempotency-Key, com coalescência de retries em andamento."""
+
+    def __init__(
+        self,
+        enabled: bool = IDEMPOTENCY_ENABLED,
+        max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+        ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+        sqlite_path: str = IDEMPOTENCY_SQLITE_PATH,
+    ):
+        self.enabled = enabled
+        persistent = SQLiteCache(sqlite_path, namespace="idempotency") if sqlite_path else None
+        self._cache = LRUCache(max_entries, ttl_seconds, persistent=persistent)
+        self._in_flight: dict[str, tuple[str, asyncio.Future]] = {}
+        self.counters: Counter = Counter()
+
+    async def run(
+        self,
+        key: Optional[str],
+        request: ChatRequest,
+        execute: Callable[[], Awaitable[ChatResponse]],
+    ) -> ChatResponse:
+        """Executa o turno uma vez por chave; sem chave (ou desligado), só executa."""
+        if not key or not self.enabled:
+            return await execute()
+
+        fingerprint = _fingerprint(request)
+        stored = self._cache.get(key)
+        if stored is not None:
+            self._check(key, stored["fingerprint"], fingerprint)
+            self.counters["replayed"] += 1
+            return ChatResponse.model_validate(stored["response"])
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self._check(key, in_flight[0], fingerprint)
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(in_flight[1])
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        try:
+            response = await execute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # marca como consumida se nenhum retry estiver esperando
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        self._cache.put(key, {"fingerprint": fingerprint, "response": response.model_dump(mode="json")})
+        self.counters["executed"] += 1
+        future.set_result(response)
+        return response
+
+    def _check(self, key: str, stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            self.counters["conflicts"] += 1
+            raise IdempotencyConflict(f"Idempotency-Key '{key}' já usada com outro pedido")
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "in_flight": len(self._in_flight), **self._cache.stats(), **self.counters}
+
+
+idempotency_cache = IdempotencyCache()
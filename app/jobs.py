@@ -0,0 +1,238 @@
+"""
+Jobs assíncronos de agentes.
+
+Agentes demorados respondem `202 {"job_id": ...}` em vez de segurar a
+requisição. O dispatch registra o job na sessão (status pending) e o
+Synthesis responde na hora ("já pedi, te aviso quando ficar pronto").
+O resultado chega por um de dois caminhos:
+
+  - webhook: com AGENT_JOBS_CALLBACK_URL, o payload enviado ao agente leva
+    `callback_url` e o agente faz POST /agents/callback/{session_id}
+    com o `token` HMAC de AGENT_JOBS_CALLBACK_SECRET. O segredo é
+    obrigatório se a URL não for local (localhost/loopback): sem ele,
+    qualquer um injetaria resultados em qualquer sessão. Callback sem
+    assinatura só é aceito em dev, com URL local e segredo vazio;
+  - poller: sem callback, uma task em background consulta
+    GET /agents/{agent_id}/jobs/{job_id} a cada AGENT_JOB_POLL_INTERVAL
+    até o fim ou AGENT_JOB_TIMEOUT.
+
+Job concluído é entregue ao usuário por GET /sessions/{id}/events (SSE),
+se houver alguém ouvindo, ou pelo Synthesis no próximo turno da sessão.
+Depois de entregue, sai da sessão.
+
+Os pollers vivem no processo: num restart, jobs pendentes só terminam via
+webhook.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+import ipaddress
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.agents_client import agents_client
+from app.config import (
+    AGENT_JOB_POLL_INTERVAL,
+    AGENT_JOB_TIMEOUT,
+    AGENT_JOBS_CALLBACK_SECRET,
+    AGENT_JOBS_CALLBACK_URL,
+)
+from app.schemas import AgentCard, GraphState
+from app.session import SessionManager, session_manager
+
+logger = logging.getLogger(__name__)
+
+# Callbacks guardados à espera do job (chegaram antes do 202 ser processado)
+MAX_EARLY_CALLBACKS = 1000
+
+# Status do agente que ainda não são resultado final
+RUNNING_STATUSES = {"accepted", "pending", "running"}
+FAILED_STATUSES = {"error", "failed"}
+
+
+class JobManager:
+    """Registra jobs na sessão, acompanha (poller/webhook) e publica os concluídos."""
+
+    def __init__(
+        self,
+        sessions: SessionManager,
+        callback_base_url: str = AGENT_JOBS_CALLBACK_URL,
+        callback_secret: str = AGENT_JOBS_CALLBACK_SECRET,
+        poll_interval: float = AGENT_JOB_POLL_INTERVAL,
+        timeout: float = AGENT_JOB_TIMEOUT,
+    ):
+        self.sessions = sessions
+        self.callback_base_url = callback_base_url.rstrip("/")
+        self.callback_secret = callback_secret
+        if self.callback_base_url and not callback_secret and not _is_local_url(self.callback_base_url):
+            raise ValueError(
+                f"AGENT_JOBS_CALLBACK_SECRET é obrigatório com AGENT_JOBS_CALLBACK_URL público: '{callback_base_url}'"
+            )
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._pollers: dict[str, asyncio.Task] = {}
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        # Callback que chegou antes do job ser gravado (agente muito rápido)
+        self._early: dict[tuple[str, str], dict] = {}
+        self.counters: Counter = Counter()
+
+    # ── Webhook ────────────────────────────────────────────────────────
+
+    def callback_url(self, session_id: str) -> Optional[str]:
+        if not self.callback_base_url:
+            return None
+        url = f"{self.callback_base_url}/agents/callback/{session_id}"
+        if self.callback_secret:
+            url += f"?token={self._token(session_id)}"
+        return url
+
+    def verify_token(self, session_id: str, token: Optional[str]) -> bool:
+        if not self.callback_secret:
+            # Sem segredo só em dev (URL local, checada no __init__); sem webhook, nenhum callback é esperado
+            return bool(self.callback_base_url)
+        return token is not None and hmac.compare_digest(token, self._token(session_id))
+
+    def _token(self, session_id: str) -> str:
+        return hmac.new(self.callback_secret.encode(), session_id.encode(), hashlib.sha256).hexdigest()
+
+    # ── Ciclo de vida do job ───────────────────────────────────────────
+
+    def start(self, session_id: str, card: AgentCard, intent: str, slots: dict, job_id: str) -> dict:
+        """Grava o job pendente na sessão e, sem webhook, inicia o poller."""
+        job = {
+            "job_id": job_id,
+            "agent_id": card.id,
+            "agent_name": card.name,
+            "intent": intent,
+            "slots": slots,
+            "status": "pending",
+            "created_at": time.time(),
+        }
+        if not self.sessions.store.put_job(session_id, job):
+            # Primeiro turno de sessão nova: ela só seria gravada no commit do turno
+            self.sessions.save(GraphState(session_id=session_id))
+            self.sessions.store.put_job(session_id, job)
+        self.counters["started"] += 1
+
+        early = self._early.pop((session_id, job_id), None)
+        if early is not None:
+            return self.complete(session_id, job_id, early) or job
+        if not self.callback_base_url:
+            task = asyncio.get_running_loop().create_task(self._poll(session_id, card, job_id))
+            self._pollers[job_id] = task
+            task.add_done_callback(lambda _: self._pollers.pop(job_id, None))
+        return job
+
+    def complete(self, session_id: str, job_id: str, result: dict) -> Optional[dict]:
+        """Registra o resultado final. None se o job não existe (ainda) ou já terminou."""
+        job = self.sessions.store.get_job(session_id, job_id)
+        if job is None:
+            if len(self._early) >= MAX_EARLY_CALLBACKS:
+                self._early.pop(next(iter(self._early)))
+            self._early[(session_id, job_id)] = result
+            return None
+        if job["status"] != "pending":
+            return None
+
+        failed = result.get("status") in FAILED_STATUSES
+        job = {
+            **job,
+            "status": "error" if failed else "done",
+            "response": result.get("response", ""),
+            "data": result.get("data", {}),
+            "error": result.get("error"),
+            "finished_at": time.time(),
+        }
+        self.sessions.store.put_job(session_id, job)
+        self.counters[job["status"]] += 1
+        self._publish(session_id, job)
+        return job
+
+    async def _poll(self, session_id: str, card: AgentCard, job_id: str) -> None:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if time.monotonic() > deadline:
+                self.complete(session_id, job_id, {"status": "error", "error": f"Job sem resultado em {self.timeout:.0f}s"})
+                return
+            try:
+                result = await agents_client.job_status(card, job_id)
+            except httpx.HTTPError as e:
+                self.counters["poll_errors"] += 1
+                logger.warning(f"[{session_id}] Falha ao consultar job {job_id} de {card.id}: {e!r}")
+                continue
+            if result.get("status") not in RUNNING_STATUSES:
+                self.complete(session_id, job_id, result)
+                return
+
+    # ── Entrega ────────────────────────────────────────────────────────
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Fila de eventos da sessão; já começa com os jobs concluídos ainda não entregues."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[session_id].add(queue)
+        state = self.sessions.store.get(session_id)
+        finished = [job for job in (state.jobs if state else []) if job.get("status") != "pending"]
+        for job in finished:
+            queue.put_nowait(_job_event(session_id, job))
+        if finished:
+            self._delivered(session_id, [job["job_id"] for job in finished])
+        try:
+            yield queue
+        finally:
+            self._subscribers[session_id].discard(queue)
+            if not self._subscribers[session_id]:
+                del self._subscribers[session_id]
+
+    def _publish(self, session_id: str, job: dict) -> None:
+        queues = self._subscribers.get(session_id)
+        if not queues:
+            return  # fica na sessão até o próximo turno
+        for queue in queues:
+            queue.put_nowait(_job_event(session_id, job))
+        self._delivered(session_id, [job["job_id"]])
+
+    def _delivered(self, session_id: str, job_ids: list[str]) -> None:
+        self.sessions.store.delete_jobs(session_id, job_ids)
+        self.counters["delivered_by_events"] += len(job_ids)
+
+    async def aclose(self) -> None:
+        for task in list(self._pollers.values()):
+            task.cancel()
+        if self._pollers:
+            await asyncio.gather(*self._pollers.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "mode": "webhook" if self.callback_base_url else "poller",
+            "polling": len(self._pollers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            **self.counters,
+        }
+
+
+def _job_event(session_id: str, job: dict) -> dict:
+    return {"type": "job_done", "session_id": session_id, "job": job}
+
+
+def _is_local_url(url: str) -> bool:
+    host = urlsplit(url).hostname or ""
+    if host == "localhost" or host.endswith(".localhost"):
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+job_manager = JobManager(session_manager)
@@ -0,0 +1,386 @@
+"""
+Métricas do orquestrador (formato de exposição Prometheus, sem dependências).
+
+  - Latência por nó do grafo (cada nó é envolvido por `instrument_node`)
+  - Chamadas LLM por nó/papel: latência, tokens (entrada, entrada em cache
+    no provider, saída) e custo estimado (LLM_PRICING)
+  - Origem das respostas do synthesis (LLM, template, modo fundido) e
+    latência de LLM evitada
+  - Parse das respostas do classificador (ok, reparado, nova chamada,
+    falha) e antecedência de mode/intent no streaming
+  - Dispatch especulativo: acertos, cancelamentos e latência economizada
+  - Latência HTTP da API de agentes por agent_id e status; circuit breaker,
+    rejeições e requisições em andamento por agente
+  - Latência por endpoint, espera pelo lock de sessão e tamanho do SessionStore
+
+`render_metrics()` gera o texto servido em GET /metrics.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import threading
+import time
+from collections import Counter as _TokenCounter, defaultdict
+from contextvars import ContextVar
+from typing import Callable, Iterable
+
+from app.config import LLM_PRICING, LLM_ROLES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Nó em execução no contexto atual — usado para rotular chamadas LLM
+_current_node: ContextVar[str] = ContextVar("current_node", default="none")
+
+
+# ══════════════════════════════════════════════════════════════════════
+# Tipos de métrica
+# ══════════════════════════════════════════════════════════════════════
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def collect(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] += amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> list[str]:
+        lines = super().collect()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = buckets
+        # key → [contagem por bucket..., soma, contagem total]
+        self._series: dict[tuple, list[float]] = {}
+        # Callbacks (valor, labels) para quem precisa das amostras cruas (benchmarks)
+        self.observers: list[Callable[[float, dict], None]] = []
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+        for observer in self.observers:
+            observer(value, labels)
+
+    def mean(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-2] / series[-1] if series and series[-1] else 0.0
+
+    def collect(self) -> list[str]:
+        lines = super().collect()
+        with self._lock:
+            for key, series in self._series.items():
+                for bound, count in zip(self.buckets, series):
+                    le = _labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                inf = _labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
+
+
+# ══════════════════════════════════════════════════════════════════════
+# Métricas do orquestrador
+# ══════════════════════════════════════════════════════════════════════
+
+REQUEST_DURATION = Histogram(
+    "orchestrator_request_duration_seconds", "Duração do turno por endpoint", ["endpoint"]
+)
+NODE_DURATION = Histogram(
+    "orchestrator_node_duration_seconds", "Duração de cada nó do grafo", ["node"]
+)
+NODE_ERRORS = Counter(
+    "orchestrator_node_errors_total", "Exceções propagadas por nó do grafo", ["node"]
+)
+LLM_DURATION = Histogram(
+    "orchestrator_llm_duration_seconds", "Duração das chamadas LLM", ["node", "role"]
+)
+LLM_CALLS = Counter(
+    "orchestrator_llm_calls_total", "Chamadas LLM", ["node", "role"]
+)
+LLM_TOKENS = Counter(
+    "orchestrator_llm_tokens_total",
+    "Tokens LLM (kind=input|cached_input|output; cached_input ⊂ input)",
+    ["node", "role", "kind"],
+)
+LLM_COST = Counter(
+    "orchestrator_llm_cost_usd_total", "Custo estimado das chamadas LLM (USD)", ["node", "role"]
+)
+FUSED_REPLIES = Counter(
+    "orchestrator_fused_replies_total",
+    "Classificações via LLM no modo fundido (outcome=used|missing|not_applicable)",
+    ["outcome"],
+)
+SYNTHESIS_RESPONSES = Counter(
+    "orchestrator_synthesis_responses_total",
+    "Respostas do synthesis por origem (source=llm|template|fused)",
+    ["source"],
+)
+SYNTHESIS_SECONDS_SAVED = Counter(
+    "orchestrator_synthesis_llm_seconds_saved_total",
+    "Latência de LLM evitada por templates/modo fundido (estimada pela média das chamadas de synthesis)",
+)
+AGENT_DURATION = Histogram(
+    "orchestrator_agent_request_duration_seconds",
+    "Latência HTTP da API de agentes (por tentativa)",
+    ["agent_id", "status"],
+)
+AGENT_CIRCUIT_STATE = Gauge(
+    "orchestrator_agent_circuit_state", "Circuit breaker por agente (0=closed, 1=half_open, 2=open)", ["agent_id"]
+)
+AGENT_REJECTIONS = Counter(
+    "orchestrator_agent_rejections_total",
+    "Chamadas a agentes rejeitadas sem ir à rede (reason=circuit_open|bulkhead_full)",
+    ["agent_id", "reason"],
+)
+AGENT_IN_FLIGHT = Gauge(
+    "orchestrator_agent_in_flight", "Requisições em andamento por agente (bulkhead)", ["agent_id"]
+)
+AGENT_CACHE_LOOKUPS = Counter(
+    "orchestrator_agent_cache_lookups_total",
+    "Consultas ao cache de resultados de agentes (result=hit|miss|coalesced)",
+    ["agent_id", "result"],
+)
+CLASSIFICATION_BATCH_SIZE = Histogram(
+    "orchestrator_classification_batch_size",
+    "Classificações por chamada LLM no micro-batching",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+CLASSIFICATION_BATCH_FALLBACKS = Counter(
+    "orchestrator_classification_batch_fallbacks_total",
+    "Itens de um lote reclassificados individualmente (resposta do lote sem o id ou inválida)",
+)
+CLASSIFICATION_PARSE = Counter(
+    "orchestrator_classification_parse_total",
+    "Respostas do classificador por resultado do parse (outcome=ok|repaired|truncated|retried|failed)",
+    ["outcome"],
+)
+CLASSIFICATION_ROUTE_LEAD = Histogram(
+    "orchestrator_classification_route_lead_seconds",
+    "Antecedência com que mode/intent ficam disponíveis no streaming, antes do fim do JSON",
+)
+SPECULATIVE_DISPATCHES = Counter(
+    "orchestrator_speculative_dispatches_total",
+    "Chamadas de agente iniciadas durante a classificação (outcome=hit|cancelled)",
+    ["agent_id", "outcome"],
+)
+SPECULATIVE_SECONDS_SAVED = Counter(
+    "orchestrator_speculative_seconds_saved_total",
+    "Latência de agente sobreposta à classificação nos dispatches especulativos usados",
+)
+SESSION_LOCK_WAIT = Histogram(
+    "orchestrator_session_lock_wait_seconds", "Espera pelo lock da sessão (turnos concorrentes na mesma sessão)"
+)
+SESSION_STORE = Gauge(
+    "orchestrator_session_store", "Tamanho do SessionStore (metric=sessions|bytes)", ["backend", "metric"]
+)
+
+# Agregado simples por papel, exposto em GET /cache/stats
+llm_usage: dict[str, _TokenCounter] = defaultdict(_TokenCounter)
+
+
+# ══════════════════════════════════════════════════════════════════════
+# Instrumentação
+# ══════════════════════════════════════════════════════════════════════
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """Envolve um nó do grafo: mede a duração e registra o nó em `node_path`."""
+
+    def _finish(result, start: float):
+        NODE_DURATION.observe(time.perf_counter() - start, node=name)
+        update = dict(result or {})
+        update["node_path"] = [name]
+        return update
+
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state):
+            token = _current_node.set(name)
+            start = time.perf_counter()
+            try:
+                result = await node(state)
+            except BaseException:
+                NODE_ERRORS.inc(node=name)
+                raise
+            finally:
+                _current_node.reset(token)
+            return _finish(result, start)
+
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state):
+        token = _current_node.set(name)
+        start = time.perf_counter()
+        try:
+            result = node(state)
+        except BaseException:
+            NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            _current_node.reset(token)
+        return _finish(result, start)
+
+    return wrapper
+
+
+def estimate_cost(model: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+    """Custo em USD pela tabela LLM_PRICING; 0 para modelos sem preço cadastrado."""
+    price = LLM_PRICING.get(model)
+    if price is None:
+        return 0.0
+    uncached = input_tokens - cached_tokens
+    return (
+        uncached * price["input"]
+        + cached_tokens * price["cached_input"]
+        + output_tokens * price["output"]
+    ) / 1_000_000
+
+
+def record_llm_call(role: str, message, duration: float) -> None:
+    """Registra uma chamada LLM (latência, tokens e custo); tokens só se houver usage_metadata."""
+    node = _current_node.get()
+    LLM_CALLS.inc(node=node, role=role)
+    LLM_DURATION.observe(duration, node=node, role=role)
+    llm_usage[role]["calls"] += 1
+
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    input_tokens = usage.get("input_tokens", 0) or 0
+    cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    output_tokens = usage.get("output_tokens", 0) or 0
+    cost = estimate_cost(LLM_ROLES[role]["model"], input_tokens, cached, output_tokens)
+
+    LLM_TOKENS.inc(input_tokens, node=node, role=role, kind="input")
+    LLM_TOKENS.inc(cached, node=node, role=role, kind="cached_input")
+    LLM_TOKENS.inc(output_tokens, node=node, role=role, kind="output")
+    LLM_COST.inc(cost, node=node, role=role)
+
+    counters = llm_usage[role]
+    counters["input_tokens"] += input_tokens
+    counters["cached_input_tokens"] += cached
+    counters["output_tokens"] += output_tokens
+    logger.debug(f"[{role}] prompt: {input_tokens} tokens ({cached} em cache), {duration * 1000:.0f} ms")
+
+
+def record_synthesis(source: str) -> None:
+    """Conta a origem da resposta; sem LLM, credita a latência média de uma chamada de synthesis."""
+    SYNTHESIS_RESPONSES.inc(source=source)
+    if source == "llm":
+        return
+    SYNTHESIS_SECONDS_SAVED.inc(LLM_DURATION.mean(node="synthesis", role="synthesizer"))
+
+
+def record_agent_request(agent_id: str, status: str, duration: float) -> None:
+    AGENT_DURATION.observe(duration, agent_id=agent_id, status=status)
+
+
+def record_agent_rejection(agent_id: str, reason: str) -> None:
+    AGENT_REJECTIONS.inc(agent_id=agent_id, reason=reason)
+
+
+def record_agent_cache(agent_id: str, result: str) -> None:
+    AGENT_CACHE_LOOKUPS.inc(agent_id=agent_id, result=result)
+
+
+def record_classification_parse(outcome: str, count: int = 1) -> None:
+    CLASSIFICATION_PARSE.inc(count, outcome=outcome)
+
+
+def record_request(endpoint: str, duration: float) -> None:
+    REQUEST_DURATION.observe(duration, endpoint=endpoint)
+
+
+def set_session_store_stats(stats: dict) -> None:
+    backend = stats.get("backend", "unknown")
+    SESSION_STORE.set(stats.get("sessions", 0), backend=backend, metric="sessions")
+    if "bytes" in stats:
+        SESSION_STORE.set(stats["bytes"], backend=backend, metric="bytes")
+
+
+def llm_usage_stats() -> dict:
+    stats = {}
+    for role, counters in llm_usage.items():
+        input_tokens = counters["input_tokens"]
+        stats[role] = {
+            **counters,
+            "uncached_input_tokens": input_tokens - counters["cached_input_tokens"],
+            "cached_ratio": counters["cached_input_tokens"] / input_tokens if input_tokens else 0.0,
+        }
+    return stats
+
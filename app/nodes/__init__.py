@@ -4,6 +4,7 @@ from app.nodes.small_talk import small_talk_node
 from app.nodes.clarify import clarify_node
 from app.nodes.self_serve import self_serve_node
 from app.nodes.dispatch import dispatch_node
+from app.nodes.fan_out import fan_out_node
 from app.nodes.synthesis import synthesis_node
 
 __all__ = [
@@ -13,5 +14,6 @@ __all__ = [
     "clarify_node",
     "self_serve_node",
     "dispatch_node",
+    "fan_out_node",
     "synthesis_node",
 ]
@@ -3,15 +3,54 @@ Nó Classification — LLM classifica a mensagem e retorna JSON estruturado.
 
 Única responsabilidade: determinar mode, intent, confidence, missing_slots,
 extrair slots da mensagem atual. NÃO gera linguagem natural.
+
+Antes da LLM roda o fast path determinístico (app/fast_path.py): turnos
+óbvios (cumprimentos, agradecimentos, resposta a um único slot pendente)
+são classificados sem chamada LLM. Em seguida, o cache de classificação
+(app/classification_cache.py); só então a LLM.
+
+Com registry grande (AGENT_SHORTLIST_MIN_AGENTS), o prompt não lista todos
+os agentes: o índice léxico (app/agent_index.py) escolhe os candidatos da
+mensagem, que vão junto da mensagem atual — o prefixo estático continua
+igual entre chamadas.
+
+A chamada LLM passa pelo ClassificationBatcher (app/classification_batcher.py):
+com CLASSIFICATION_BATCH_ENABLED, turnos concorrentes de sessões diferentes
+são classificados juntos numa única chamada. A resposta chega já validada
+(saída estruturada nativa + parser tolerante, app/structured_output.py);
+None só sobra quando nem o reparo nem a nova chamada deram um JSON
+utilizável, e aí o turno cai no fallback small_talk.
+
+Com SPECULATIVE_DISPATCH_ENABLED, os campos que fecham no stream vão para
+o SpeculativeDispatcher (app/speculation.py), que pode começar a chamada
+do agente antes do fim do JSON; a classificação final confirma ou cancela.
 """
 
 from __future__ import annotations
 
-import json
+from functools import lru_cache
+from typing import Optional
+
 from langchain_core.messages import HumanMessage, SystemMessage
 
-from app.schemas import Classification, GraphState
-from app.config import get_llm, AGENT_REGISTRY
+from pydantic import ValidationError
+
+from app.schemas import Classification, GraphState, IntentRequest
+from app.config import (
+    registry_version,
+    AGENT_REGISTRY,
+    CLASSIFICATION_HISTORY_TOKENS,
+    FUSED_MODE_ENABLED,
+    VOICE_TONE,
+)
+from app.history import budget_history, format_history, history_before_turn
+from app.metrics import FUSED_REPLIES
+from app.agent_index import shortlist_agents
+from app.classification_batcher import OnFields, classification_batcher
+from app.classification_cache import classification_cache
+from app.fast_path import fast_classify
+from app.nodes.dispatch import call_agent
+from app.speculation import speculative_dispatcher
 
 
 CLASSIFICATION_PROMPT = """\
@@ -21,12 +60,6 @@ do usuário e retorne APENAS um JSON válido. Sem markdown, sem explicações.
 ## Agentes disponíveis (LISTA EXAUSTIVA — não existe nenhum outro)
 {agents_description}
 
-## Slots já coletados nesta sessão
-{current_slots}
-
-## Intent acumulada (de turnos anteriores)
-{current_intent}
-
 ## Regras de classificação
 
 ### 1. small_talk (PADRÃO)
@@ -51,9 +84,21 @@ fornece múltiplas informações de uma vez. Exemplos:
 - "Clima em Curitiba" → extracted_slots: {{"cidade": "Curitiba"}} → dispatch
 
 NÃO peça um slot por vez se o usuário já deu tudo. Combine extracted_slots com
-current_slots para decidir se vai para clarify (ainda falta algo) ou dispatch/self_serve
+os slots já coletados (informados junto da mensagem atual) para decidir se vai para clarify (ainda falta algo) ou dispatch/self_serve
 (tudo preenchido).
 
+## Vários pedidos na mesma mensagem
+Se a mensagem traz DOIS OU MAIS pedidos para agentes diferentes, preencha "intents"
+com um item por pedido, na ordem em que aparecem, cada um com seus próprios
+extracted_slots e missing_slots. Os campos principais (mode, intent,
+extracted_slots, missing_slots) descrevem o primeiro pedido. Exemplo:
+
+- "Clima em Curitiba e me lembra de comprar pão às 18h" → intents: [
+    {{"intent": "clima", "extracted_slots": {{"cidade": "Curitiba"}}, "missing_slots": []}},
+    {{"intent": "lembrete", "extracted_slots": {{"descricao": "comprar pão", "horario": "18:00"}}, "missing_slots": []}}]
+
+Com um único pedido (ou nenhum), "intents" é [].
+
 ## Referências ao histórico
 Se o usuário referencia algo da conversa anterior (ex: "aquele mesmo", "de novo",
 "o que eu falei"), use o histórico para resolver a referência e extrair os slots.
@@ -67,18 +112,68 @@ Se o usuário referencia algo da conversa anterior (ex: "aquele mesmo", "de novo
 {{
   "mode": "small_talk|clarify|self_serve|dispatch",
   "intent": "string ou null",
-  "confidence": 0.0 a 1.0,
+  "extracted_slots": {{"slot_name": "valor"}},
   "missing_slots": ["slot1"],
+  "confidence": 0.0 a 1.0,
   "question_to_ask": "string ou null",
   "candidate_agents": ["agent-id"],
-  "extracted_slots": {{"slot_name": "valor"}}
+  "intents": [{{"intent": "string", "extracted_slots": {{...}}, "missing_slots": [...]}}]
 }}
 """
 
+# Anexado ao prompt quando FUSED_MODE_ENABLED: a mesma chamada já escreve a resposta
+FUSED_REPLY_PROMPT = """
+## Resposta ao usuário (campo "reply")
+Além da classificação, inclua no JSON o campo "reply":
+- mode small_talk ou clarify → "reply" é a mensagem final para o usuário.
+- mode self_serve ou dispatch → "reply" DEVE ser null (a resposta depende do agente).
+
+Tom de voz para o "reply":
+{voice_tone}
+
+- Soe como uma pessoa conversando, não como um sistema. Espelhe o estilo do usuário.
+- small_talk: responda o que foi perguntado. Só se apresente e diga o que sabe fazer
+  se não houver histórico; nas demais, não fique oferecendo ajuda.
+- clarify: peça o que falta de forma conversacional ("Pra quem é o parabéns?"),
+  pode pedir dois slots de uma vez e não repita o que o usuário já disse.
+
+Formato com o campo extra:
+{{"mode": "...", "intent": ..., "extracted_slots": {{...}}, "missing_slots": [...],
+  "confidence": ..., "question_to_ask": ..., "candidate_agents": [...],
+  "intents": [...], "reply": "string ou null"}}
+"""
+
+FUSED_MODES = ("small_talk", "clarify")
+
+# Catálogo do system prompt quando a shortlist está ativa
+SHORTLIST_AGENTS_NOTE = """Os agentes candidatos para esta mensagem vêm junto da mensagem atual, na seção
+"Agentes candidatos". Considere SOMENTE esses: nenhum outro existe para este turno."""
+
+SHORTLIST_TURN_SECTION = """## Agentes candidatos (LISTA EXAUSTIVA para esta mensagem)
+{agents_description}
+
+"""
+
 
-def _build_agents_description() -> str:
+# Conteúdo variável do turno — vai DEPOIS do prefixo estático e do histórico,
+# para que o system prompt inteiro seja reaproveitado pelo cache de prefixo do provider.
+CLASSIFICATION_TURN_TEMPLATE = """\
+## Resumo da conversa anterior
+{history_summary}
+
+## Slots já coletados nesta sessão
+{current_slots}
+
+## Intent acumulada (de turnos anteriores)
+{current_intent}
+
+Mensagem atual do usuário: {user_input}"""
+
+
+def _build_agents_description(intents: Optional[list[str]] = None) -> str:
     lines = []
-    for intent, card in AGENT_REGISTRY.items():
+    for intent in AGENT_REGISTRY if intents is None else intents:
+        card = AGENT_REGISTRY[intent]
         lines.append(
             f"- intent='{intent}' → {card.name} (id={card.id}, "
             f"required_slots={card.required_slots}, self_serve={card.self_serve}): "
@@ -87,20 +182,26 @@ def _build_agents_description() -> str:
     return "\n".join(lines)
 
 
-def classification_node(state: GraphState) -> dict:
-    """Classifica a mensagem via LLM. Retorna dados estruturados."""
-    llm = get_llm()
+@lru_cache(maxsize=8)
+def _system_prompt(version: str, fused: bool = False, shortlisted: bool = False) -> str:
+    """Prefixo estático (regras + catálogo de agentes), montado uma vez por versão do registry."""
+    agents_description = SHORTLIST_AGENTS_NOTE if shortlisted else _build_agents_description()
+    prompt = CLASSIFICATION_PROMPT.format(agents_description=agents_description)
+    if fused:
+        prompt += FUSED_REPLY_PROMPT.format(voice_tone=VOICE_TONE)
+    return prompt
 
-    system = SystemMessage(content=CLASSIFICATION_PROMPT.format(
-        agents_description=_build_agents_description(),
-        current_slots=state.slots or {},
-        current_intent=state.current_intent or "nenhuma",
-    ))
 
-    # Inclui histórico recente para contexto (últimas 10 mensagens, user + assistant)
+async def _classify_with_llm(state: GraphState, on_fields: Optional[OnFields] = None) -> Optional[dict]:
+    """Chama a LLM e devolve o JSON de classificação validado, ou None se inválido."""
+    shortlist = shortlist_agents(state.user_input, state.current_intent)
+    system = SystemMessage(content=_system_prompt(registry_version(), FUSED_MODE_ENABLED, shortlist is not None))
+
+    # Histórico recente dentro do orçamento de tokens (sem a mensagem atual, que vai no fim)
     from langchain_core.messages import AIMessage
+    history = budget_history(history_before_turn(state), CLASSIFICATION_HISTORY_TOKENS)
     history_msgs = []
-    for msg in state.messages[-10:]:
+    for msg in history:
         role = msg.get("role", "user")
         content = msg.get("content", "")
         if role == "user":
@@ -108,30 +209,70 @@ def classification_node(state: GraphState) -> dict:
         elif role == "assistant":
             history_msgs.append(AIMessage(content=content))
 
-    human = HumanMessage(content=f"Mensagem atual do usuário: {state.user_input}")
+    turn = CLASSIFICATION_TURN_TEMPLATE.format(
+        history_summary=state.history_summary or "(nenhum)",
+        current_slots=state.slots or {},
+        current_intent=state.current_intent or "nenhuma",
+        user_input=state.user_input,
+    )
+    candidates = None
+    if shortlist is not None:
+        candidates = _build_agents_description(shortlist) or "(nenhum — a mensagem não corresponde a nenhum agente)"
+        turn = SHORTLIST_TURN_SECTION.format(agents_description=candidates) + turn
+    human = HumanMessage(content=turn)
+
+    # Mesmo pedido como item de lote: histórico em texto, já que o lote é uma mensagem só
+    batch_item = {
+        "resumo": state.history_summary or "(nenhum)",
+        "historico": format_history(history) or "(primeira mensagem)",
+        "slots_coletados": state.slots or {},
+        "intent_acumulada": state.current_intent or "nenhuma",
+        "mensagem": state.user_input,
+    }
+    if candidates is not None:
+        batch_item["agentes_candidatos"] = candidates
+
+    return await classification_batcher.classify(
+        [system] + history_msgs + [human], batch_item, FUSED_MODE_ENABLED, on_fields
+    )
+
 
-    response = llm.invoke([system] + history_msgs + [human])
+FALLBACK_CLASSIFICATION = {
+    "mode": "small_talk",
+    "intent": None,
+    "confidence": 0.5,
+    "missing_slots": [],
+    "question_to_ask": None,
+    "candidate_agents": [],
+    "extracted_slots": {},
+}
 
-    # Parse JSON
-    raw = response.content.strip()
-    if raw.startswith("```"):
-        raw = raw.split("\n", 1)[1] if "\n" in raw else raw[3:]
-    if raw.endswith("```"):
-        raw = raw[:-3]
-    raw = raw.strip()
 
+async def classification_node(state: GraphState) -> dict:
+    """Classifica a mensagem (fast path, cache ou LLM). Retorna dados estruturados."""
     try:
-        data = json.loads(raw)
-    except json.JSONDecodeError:
-        data = {
-            "mode": "small_talk",
-            "intent": None,
-            "confidence": 0.5,
-            "missing_slots": [],
-            "question_to_ask": None,
-            "candidate_agents": [],
-            "extracted_slots": {},
-        }
+        return await _classify_turn(state)
+    except BaseException:
+        # Sem settle/take, uma chamada especulativa já disparada ficaria órfã até o próximo turno
+        if state.session_id:
+            speculative_dispatcher.discard(state.session_id)
+        raise
+
+
+async def _classify_turn(state: GraphState) -> dict:
+    data = fast_classify(state) or classification_cache.get(state)
+    from_llm = data is None
+    if data is None:
+        on_fields = speculative_dispatcher.watcher(
+            state.session_id, state.slots,
+            lambda intent, slots: call_agent(intent, slots, state.session_id),
+        )
+        data = await _classify_with_llm(state, on_fields)
+        if data is None:
+            data = FALLBACK_CLASSIFICATION
+        else:
+            # A resposta do modo fundido é do turno, não da classificação
+            classification_cache.put(state, {k: v for k, v in data.items() if k != "reply"})
 
     # Merge slots extraídos com os existentes
     extracted = data.get("extracted_slots", {})
@@ -151,6 +292,13 @@ def classification_node(state: GraphState) -> dict:
     if mode in ("dispatch", "self_serve") and not intent:
         mode = "small_talk"
 
+    # ── Vários pedidos: só intents do registry; 2+ grupos vão para o fan_out ──
+    intents = _intent_groups(data.get("intents"))
+    if intents:
+        intent = intent or intents[0].intent
+        if mode == "small_talk":
+            mode = "dispatch"
+
     classification = Classification(
         mode=mode,
         intent=intent,
@@ -159,10 +307,48 @@ def classification_node(state: GraphState) -> dict:
         question_to_ask=data.get("question_to_ask"),
         candidate_agents=data.get("candidate_agents", []),
         extracted_slots=extracted,
+        intents=intents,
     )
 
+    # Mesma decisão de route_after_classification (app/graph.py)
+    route = "fan_out" if intents else mode
+    speculative_dispatcher.settle(state.session_id, route, intent, merged_slots)
+
+    fused_reply = None
+    if FUSED_MODE_ENABLED and from_llm:
+        fused_reply = _fused_reply(mode, data)
+
     return {
         "classification": classification,
         "slots": merged_slots,
         "current_intent": classification.intent or state.current_intent,
-    }
\ No newline at end of file
+        "fused_reply": fused_reply,
+    }
+
+
+def _intent_groups(raw) -> list[IntentRequest]:
+    """Grupos válidos (intent conhecida, sem repetição); menos de 2 → pedido único."""
+    groups: list[IntentRequest] = []
+    seen: set[str] = set()
+    for item in raw if isinstance(raw, list) else []:
+        if not isinstance(item, dict) or item.get("intent") not in AGENT_REGISTRY or item["intent"] in seen:
+            continue
+        try:
+            groups.append(IntentRequest.model_validate(item))
+        except ValidationError:
+            continue
+        seen.add(item["intent"])
+    return groups if len(groups) > 1 else []
+
+
+def _fused_reply(mode: str, data: dict) -> Optional[str]:
+    """Resposta pronta do modo fundido; None faz o Synthesis chamar a LLM normalmente."""
+    if mode not in FUSED_MODES:
+        FUSED_REPLIES.inc(outcome="not_applicable")
+        return None
+    reply = data.get("reply")
+    if not isinstance(reply, str) or not reply.strip():
+        FUSED_REPLIES.inc(outcome="missing")
+        return None
+    FUSED_REPLIES.inc(outcome="used")
+    return reply.strip()
\ No newline at end of file
@@ -2,39 +2,62 @@
 Nó Dispatch — despacha para agente externo via HTTP.
 Retorna resultado estruturado. NÃO gera linguagem natural.
 
-Se a API falhar, retorna NodeResult com status="error".
+Se a API falhar — ou o circuit breaker/bulkhead do agente rejeitar a
+chamada sem ir à rede — retorna NodeResult com status="error".
 O Synthesis decide como comunicar o erro ao usuário.
+
+Agente assíncrono responde 202 com job_id: o job vai para a sessão
+(app/jobs.py) e o NodeResult sai com status="accepted" — o resultado é
+entregue depois, por /sessions/{id}/events ou no próximo turno.
+
+Agentes com `cache_ttl` passam pelo cache de resultados (app/agent_cache.py):
+mesma intent com os mesmos slots não vai à rede de novo dentro do TTL.
+
+Com dispatch especulativo (app/speculation.py), a chamada pode já ter
+começado durante a classificação: o nó só espera o resultado dela.
 """
 
 from __future__ import annotations
 
 import logging
+from typing import Any, Optional
+
 import httpx
 
+from app.agent_cache import agent_result_cache
+from app.agents_client import agents_client
+from app.jobs import job_manager
+from app.resilience import BulkheadFullError, CircuitOpenError
 from app.schemas import GraphState, NodeResult
-from app.config import AGENT_REGISTRY, AGENTS_API_BASE_URL, AGENTS_API_KEY
+from app.config import AGENT_REGISTRY
+from app.speculation import speculative_dispatcher
 
 logger = logging.getLogger(__name__)
 
 
-def _call_agent_api_sync(agent_id: str, intent: str, slots: dict) -> dict:
-    """Chama a API externa de agentes (síncrono)."""
-    url = f"{AGENTS_API_BASE_URL}/agents/{agent_id}/execute"
-    headers = {"Content-Type": "application/json"}
-    if AGENTS_API_KEY:
-        headers["Authorization"] = f"Bearer {AGENTS_API_KEY}"
-
-    payload = {"intent": intent, "slots": slots}
+async def dispatch_node(state: GraphState) -> dict:
+    """Despacha para agente externo. Retorna NodeResult estruturado."""
+    speculative = speculative_dispatcher.take(state.session_id, state.current_intent, state.slots)
+    if speculative is not None:
+        node_result, api_response = await speculative
+    else:
+        node_result, api_response = await call_agent(state.current_intent, state.slots, state.session_id)
+    if api_response is None:
+        return {"node_result": node_result}
 
-    with httpx.Client(timeout=30) as client:
-        resp = client.post(url, json=payload, headers=headers)
-        resp.raise_for_status()
-        return resp.json()
+    return {
+        "node_result": node_result,
+        "agent_result": api_response,
+        # Reset para próximo turno
+        "current_intent": None,
+        "slots": {},
+    }
 
 
-def dispatch_node(state: GraphState) -> dict:
-    """Despacha para agente externo. Retorna NodeResult estruturado."""
-    intent = state.current_intent
+async def call_agent(
+    intent: Optional[str], slots: dict[str, str], session_id: Optional[str] = None,
+) -> tuple[NodeResult, Optional[dict[str, Any]]]:
+    """Chama o agente da intent. Retorna (NodeResult, resposta da API) — resposta None em erro."""
     agent_card = AGENT_REGISTRY.get(intent)
 
     if not agent_card:
@@ -44,13 +67,29 @@ def dispatch_node(state: GraphState) -> dict:
             status="error",
             error_message=f"Agente não encontrado para intent '{intent}'",
         )
-        return {"node_result": node_result}
+        return node_result, None
 
     agent_id = agent_card.id
-    slots = state.slots
 
     try:
-        api_response = _call_agent_api_sync(agent_id, intent, slots)
+        callback_url = job_manager.callback_url(session_id) if session_id else None
+        api_response = await agent_result_cache.execute(
+            agent_card, intent, slots,
+            lambda: agents_client.execute(agent_card, intent, slots, callback_url=callback_url),
+        )
+
+        if api_response.get("status") == "accepted" and api_response.get("job_id") and session_id:
+            job = job_manager.start(session_id, agent_card, intent, slots, api_response["job_id"])
+            logger.info(f"Agente {agent_id} aceitou o job {job['job_id']}.")
+            node_result = NodeResult(
+                source_node="dispatch",
+                intent=intent,
+                status="accepted",
+                data={"agent_name": agent_card.name, "agent_id": agent_id, "job_id": job["job_id"]},
+                slots_collected=slots,
+            )
+            return node_result, api_response
+
         logger.info(f"Agente {agent_id} executado via API com sucesso.")
 
         node_result = NodeResult(
@@ -65,14 +104,23 @@ def dispatch_node(state: GraphState) -> dict:
             },
             slots_collected=slots,
         )
+        return node_result, api_response
 
-        return {
-            "node_result": node_result,
-            "agent_result": api_response,
-            # Reset para próximo turno
-            "current_intent": None,
-            "slots": {},
-        }
+    except (CircuitOpenError, BulkheadFullError) as e:
+        logger.warning(f"Chamada a {agent_id} rejeitada: {e}")
+        node_result = NodeResult(
+            source_node="dispatch",
+            intent=intent,
+            status="error",
+            data={
+                "agent_name": agent_card.name,
+                "agent_id": agent_id,
+                "rejected": "circuit_open" if isinstance(e, CircuitOpenError) else "bulkhead_full",
+            },
+            slots_collected=slots,
+            error_message=f"Agente temporariamente indisponível: {agent_card.name}",
+        )
+        return node_result, None
 
     except httpx.ConnectError as e:
         logger.warning(f"API indisponível para {agent_id}: {e}")
@@ -84,7 +132,7 @@ def dispatch_node(state: GraphState) -> dict:
             slots_collected=slots,
             error_message=f"API do agente indisponível: {agent_card.name}",
         )
-        return {"node_result": node_result}
+        return node_result, None
 
     except httpx.HTTPStatusError as e:
         logger.error(f"Erro HTTP do agente {agent_id}: {e.response.status_code}")
@@ -96,7 +144,7 @@ def dispatch_node(state: GraphState) -> dict:
             slots_collected=slots,
             error_message=f"Agente retornou erro HTTP {e.response.status_code}",
         )
-        return {"node_result": node_result}
+        return node_result, None
 
     except Exception as e:
         logger.exception(f"Erro inesperado ao chamar {agent_id}")
@@ -108,4 +156,4 @@ def dispatch_node(state: GraphState) -> dict:
             slots_collected=slots,
             error_message=f"Erro inesperado: {str(e)}",
         )
-        return {"node_result": node_result}
+        return node_result, None
@@ -0,0 +1,99 @@
+"""
+Nó Fan-out — vários pedidos na mesma mensagem, despachados em paralelo.
+Retorna resultado estruturado. NÃO gera linguagem natural.
+
+"clima em Curitiba e me lembra de comprar pão às 18h" chega com um grupo
+por intent em `classification.intents`. Cada grupo completo chama seu
+agente (ou resolve internamente, se self_serve) via asyncio.gather, cada
+um com prazo próprio (FAN_OUT_AGENT_TIMEOUT): a latência do turno fica
+próxima à do agente mais lento, não à soma. Grupos com slots faltando
+viram resultados pending.
+
+Os resultados parciais vão juntos num único NodeResult (source_node =
+"fan_out", um item por intent em data["results"]) e o Synthesis responde
+tudo numa mensagem. O primeiro grupo pendente segue como intent
+acumulada para o próximo turno.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Optional
+
+from app.config import AGENT_REGISTRY, FAN_OUT_AGENT_TIMEOUT
+from app.nodes.dispatch import call_agent
+from app.nodes.self_serve import resolve_internally
+from app.schemas import GraphState, IntentRequest, NodeResult
+
+logger = logging.getLogger(__name__)
+
+
+async def fan_out_node(state: GraphState) -> dict:
+    """Executa todas as intents da mensagem em paralelo e agrega os resultados."""
+    groups = state.classification.intents
+    outcomes = await asyncio.gather(*(_run_group(group, state) for group in groups))
+
+    results = [node_result for node_result, _ in outcomes]
+    agent_results = {r.intent: api_response for r, api_response in outcomes if api_response is not None}
+    pending = next((r for r in results if r.status == "pending"), None)
+
+    node_result = NodeResult(
+        source_node="fan_out",
+        status=_aggregate_status(results),
+        data={"results": [r.model_dump(mode="json") for r in results]},
+        missing_slots=pending.missing_slots if pending else [],
+    )
+
+    return {
+        "node_result": node_result,
+        "agent_result": agent_results or None,
+        # Pedido incompleto continua no próximo turno (clarify); os demais estão resolvidos
+        "current_intent": pending.intent if pending else None,
+        "slots": pending.slots_collected if pending else {},
+    }
+
+
+async def _run_group(group: IntentRequest, state: GraphState) -> tuple[NodeResult, Optional[dict[str, Any]]]:
+    agent_card = AGENT_REGISTRY[group.intent]
+    # Slots de turnos anteriores só valem para a intent que estava sendo coletada
+    base = state.slots if group.intent == state.current_intent else {}
+    slots = {**base, **group.extracted_slots}
+
+    missing = [slot for slot in agent_card.required_slots if not slots.get(slot)]
+    if missing:
+        return NodeResult(
+            source_node="clarify",
+            intent=group.intent,
+            status="pending",
+            data={"agent_name": agent_card.name, "agent_id": agent_card.id},
+            slots_collected=slots,
+            missing_slots=missing,
+        ), None
+
+    if agent_card.self_serve:
+        return resolve_internally(group.intent, slots), None
+
+    try:
+        return await asyncio.wait_for(call_agent(group.intent, slots, state.session_id), FAN_OUT_AGENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"Agente {agent_card.id} passou de {FAN_OUT_AGENT_TIMEOUT}s no fan-out")
+        return NodeResult(
+            source_node="dispatch",
+            intent=group.intent,
+            status="error",
+            data={"agent_name": agent_card.name, "agent_id": agent_card.id},
+            slots_collected=slots,
+            error_message=f"Agente não respondeu em {FAN_OUT_AGENT_TIMEOUT:.0f}s",
+        ), None
+
+
+def _aggregate_status(results: list[NodeResult]) -> str:
+    """ok: tudo resolvido; error: nada resolvido nem pendente; partial: o resto."""
+    errors = sum(r.status == "error" for r in results)
+    pending = sum(r.status == "pending" for r in results)
+    if not errors and not pending:
+        return "ok"
+    if errors == len(results):
+        return "error"
+    return "partial"
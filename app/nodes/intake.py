@@ -8,12 +8,9 @@ from app.schemas import GraphState
 
 
 def intake_node(state: GraphState) -> dict:
-    """Registra a mensagem do usuário no histórico."""
-    new_messages = list(state.messages) + [
-        {"role": "user", "content": state.user_input}
-    ]
+    """Registra a mensagem do usuário no histórico (append via reducer)."""
     return {
-        "messages": new_messages,
+        "messages": [{"role": "user", "content": state.user_input}],
         "node_result": None,
         "response": "",
         "agent_result": None,
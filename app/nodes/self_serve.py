@@ -8,13 +8,23 @@ de negócio, MCP tools) e retornaria o resultado como dados.
 
 from __future__ import annotations
 
+from typing import Optional
+
 from app.schemas import GraphState, NodeResult
 from app.config import AGENT_REGISTRY
 
 
 def self_serve_node(state: GraphState) -> dict:
     """Resolve internamente e retorna NodeResult estruturado."""
-    intent = state.current_intent
+    return {
+        "node_result": resolve_internally(state.current_intent, state.slots),
+        # Reset para próximo turno
+        "current_intent": None,
+        "slots": {},
+    }
+
+
+def resolve_internally(intent: Optional[str], slots: dict[str, str]) -> NodeResult:
     agent_card = AGENT_REGISTRY.get(intent)
 
     # Aqui entraria lógica real: consulta DB, MCP tools, etc.
@@ -23,22 +33,15 @@ def self_serve_node(state: GraphState) -> dict:
         "agent_name": agent_card.name if agent_card else None,
         "agent_id": agent_card.id if agent_card else None,
         "resolved_internally": True,
-        "query_params": state.slots,
+        "query_params": slots,
         # Em produção, aqui viria o resultado real:
         # "saldo_ferias": 15, "proximo_periodo": "01/03/2025 — 15/03/2025", etc.
     }
 
-    node_result = NodeResult(
+    return NodeResult(
         source_node="self_serve",
         intent=intent,
         status="ok",
         data=result_data,
-        slots_collected=state.slots,
+        slots_collected=slots,
     )
-
-    return {
-        "node_result": node_result,
-        # Reset para próximo turno
-        "current_intent": None,
-        "slots": {},
-    }
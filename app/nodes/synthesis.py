@@ -6,17 +6,38 @@ em uma resposta no tom de voz configurado (VOICE_TONE).
 
 Todos os outros nós produzem apenas dados estruturados.
 O Synthesis é a "voz" do sistema.
+
+A resposta é gerada via `llm.astream`: cada token é emitido no stream
+`custom` do LangGraph (consumido por /chat/stream e /ws/chat). Em
+`ainvoke` o writer é no-op e só a resposta completa importa.
+
+Sem LLM quando não é preciso:
+  - modo fundido (FUSED_MODE_ENABLED): em small_talk/clarify a resposta pode
+    já ter vindo da chamada de classificação (`fused_reply`) e só é repassada;
+  - NodeResults formulaicos (erro de agente, clarify de um slot, job aceito)
+    usam os templates de app/response_templates.py.
+
+Jobs assíncronos concluídos e ainda não entregues (state.jobs) entram no
+prompt do turno e desligam os atalhos acima: a LLM entrega o resultado
+junto com a resposta ao pedido atual.
 """
 
 from __future__ import annotations
 
 import json
+import time
 from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.config import get_stream_writer
 
 from app.schemas import GraphState
-from app.config import get_llm, VOICE_TONE
+from app.config import get_llm, SYNTHESIS_HISTORY_TOKENS, VOICE_TONE
+from app.history import budget_history, format_history, history_before_turn
+from app.metrics import record_llm_call, record_synthesis
+from app.response_templates import render_template
 
 
+# Prefixo estático (tom de voz + diretrizes). O conteúdo variável do turno
+# vai na mensagem humana, depois dele, para aproveitar o cache de prefixo do provider.
 SYNTHESIS_PROMPT = """\
 {voice_tone}
 
@@ -27,14 +48,6 @@ processamento interno e os transforma em uma mensagem natural para o usuário.
 
 Você deve soar como uma pessoa conversando — não como um sistema executando comandos.
 
-## Histórico da conversa
-{conversation_history}
-
-## Dados estruturados do processamento atual
-```json
-{node_result_json}
-```
-
 ## Diretrizes de naturalidade
 
 **Conversa geral (source_node = small_talk):**
@@ -56,6 +69,22 @@ Você deve soar como uma pessoa conversando — não como um sistema executando
 - Integre com o fluxo da conversa. Se o usuário pediu de forma casual,
   responda casualmente. Se pediu de forma formal, responda formalmente.
 
+**Vários pedidos (source_node = fan_out):**
+- `data.results` traz um resultado por pedido, na ordem em que o usuário pediu.
+- Responda tudo numa única mensagem fluida, cobrindo cada pedido na ordem.
+- status=partial: entregue o que deu certo e diga com leveza o que falhou ou o que
+  ainda falta informar (resultados com status=pending → peça os missing_slots).
+
+**Pedido em andamento (status=accepted):**
+- O agente aceitou o pedido e vai terminar em segundo plano (data.job_id).
+- Avise que já está cuidando disso e que o resultado chega em seguida, sem prometer prazo:
+  "Já estou gerando, te aviso assim que ficar pronto!"
+
+**Resultados que ficaram prontos (seção "Pedidos concluídos"):**
+- São pedidos de turnos anteriores que terminaram em segundo plano.
+- Entregue cada um (`response`/`data` do job; status=error → diga que não deu certo)
+  antes ou depois da resposta à mensagem atual, do jeito que soar mais natural.
+
 **Erros (status=error):**
 - Seja transparente mas não alarmista. "Não consegui conectar com o serviço
   agora, tenta de novo daqui a pouco?" é melhor que "ERRO: serviço indisponível".
@@ -66,45 +95,91 @@ sendo informal, seja informal. Se está sendo direto, seja direto. Espelhe o est
 Responda APENAS com a mensagem para o usuário.
 """
 
+SYNTHESIS_TURN_TEMPLATE = """\
+## Resumo da conversa anterior
+{history_summary}
+
+## Histórico da conversa
+{conversation_history}
+
+## Pedidos concluídos em segundo plano
+{finished_jobs}
+
+## Dados estruturados do processamento atual
+```json
+{node_result_json}
+```
+
+## Mensagem atual do usuário
+{user_input}"""
 
-def synthesis_node(state: GraphState) -> dict:
+SYNTHESIS_SYSTEM_PROMPT = SYNTHESIS_PROMPT.format(voice_tone=VOICE_TONE)
+
+
+async def synthesis_node(state: GraphState) -> dict:
     """Transforma NodeResult estruturado em linguagem natural."""
-    llm = get_llm()
+    llm = get_llm("synthesizer")
     node_result = state.node_result
 
     if node_result is None:
         return {
             "response": "Desculpe, algo deu errado internamente. Pode tentar novamente?",
-            "messages": list(state.messages) + [
+            "messages": [
                 {"role": "assistant", "content": "Desculpe, algo deu errado internamente. Pode tentar novamente?"}
             ],
         }
 
-    # Monta histórico resumido (últimas 8 mensagens)
-    recent_history = state.messages[-8:] if state.messages else []
-    history_text = "\n".join(
-        f"{'Usuário' if m['role'] == 'user' else 'Assistente'}: {m['content']}"
-        for m in recent_history
-    )
+    finished_jobs = [job for job in state.jobs if job.get("status") != "pending"]
+
+    # Jobs concluídos precisam ser entregues: sem atalhos
+    if not finished_jobs:
+        if state.fused_reply:
+            return _direct_reply(state.fused_reply, "fused")
+
+        template_reply = render_template(node_result, state.user_input)
+        if template_reply is not None:
+            return _direct_reply(template_reply, "template")
+
+    # Histórico recente dentro do orçamento de tokens (a mensagem atual vai no fim)
+    history_text = format_history(budget_history(history_before_turn(state), SYNTHESIS_HISTORY_TOKENS))
 
     # Serializa o NodeResult para JSON
     node_result_json = node_result.model_dump_json(indent=2)
 
-    system = SystemMessage(content=SYNTHESIS_PROMPT.format(
-        voice_tone=VOICE_TONE,
+    system = SystemMessage(content=SYNTHESIS_SYSTEM_PROMPT)
+    human = HumanMessage(content=SYNTHESIS_TURN_TEMPLATE.format(
+        history_summary=state.history_summary or "(nenhum)",
         conversation_history=history_text or "(primeira mensagem)",
+        finished_jobs=json.dumps(finished_jobs, ensure_ascii=False, indent=2) if finished_jobs else "(nenhum)",
         node_result_json=node_result_json,
+        user_input=state.user_input,
     ))
 
-    response = llm.invoke([system, HumanMessage(content=state.user_input)])
-    response_text = response.content.strip()
+    writer = get_stream_writer()
+    chunks: list[str] = []
+    full = None
+    start = time.perf_counter()
+    async for chunk in llm.astream([system, human]):
+        full = chunk if full is None else full + chunk
+        if chunk.content:
+            chunks.append(chunk.content)
+            writer({"token": chunk.content})
+    record_llm_call("synthesizer", full, time.perf_counter() - start)
+    record_synthesis("llm")
+    response_text = "".join(chunks).strip()
+
+    # Registra no histórico (append via reducer)
+    return {
+        "response": response_text,
+        "messages": [{"role": "assistant", "content": response_text}],
+    }
 
-    # Registra no histórico
-    new_messages = list(state.messages) + [
-        {"role": "assistant", "content": response_text}
-    ]
 
+def _direct_reply(text: str, source: str) -> dict:
+    """Resposta pronta (modo fundido ou template): emite de uma vez, sem LLM."""
+    get_stream_writer()({"token": text})
+    record_synthesis(source)
     return {
-        "response": response_text,
-        "messages": new_messages,
-    }
\ No newline at end of file
+        "response": text,
+        "messages": [{"role": "assistant", "content": text}],
+    }
@@ -0,0 +1,172 @@
+"""
+Proteções por agente na chamada à API de agentes.
+
+  - CircuitBreaker: janela deslizante das últimas tentativas. Quando a taxa
+    de falha passa de AGENT_CIRCUIT_FAILURE_RATE (com pelo menos
+    AGENT_CIRCUIT_MIN_CALLS amostras), o circuito abre e as chamadas falham
+    na hora (CircuitOpenError) em vez de esperar o timeout do agente. Depois
+    de AGENT_CIRCUIT_OPEN_SECONDS vai para half-open: poucas tentativas de
+    teste decidem entre fechar (sucesso) e reabrir (falha).
+  - Bulkhead: limite de requisições simultâneas por agente, para um agente
+    lento não ocupar o pool de conexões inteiro. Sem vaga em
+    AGENT_BULKHEAD_WAIT, BulkheadFullError.
+
+Falha = erro de transporte (conexão, timeout) ou HTTP 5xx; 4xx é erro do
+pedido, não do agente. Estado em GET /admin/agents e nas métricas
+orchestrator_agent_circuit_state / orchestrator_agent_rejections_total.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+from app.config import (
+    AGENT_BULKHEAD_WAIT,
+    AGENT_CIRCUIT_FAILURE_RATE,
+    AGENT_CIRCUIT_HALF_OPEN_PROBES,
+    AGENT_CIRCUIT_MIN_CALLS,
+    AGENT_CIRCUIT_OPEN_SECONDS,
+    AGENT_CIRCUIT_WINDOW,
+)
+from app.metrics import AGENT_CIRCUIT_STATE, AGENT_IN_FLIGHT
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Circuito do agente aberto: chamada rejeitada sem ir à rede."""
+
+    def __init__(self, agent_id: str, retry_in: float):
+        super().__init__(f"Circuito aberto para {agent_id} (nova tentativa em {retry_in:.0f}s)")
+        self.agent_id = agent_id
+        self.retry_in = retry_in
+
+
+class BulkheadFullError(Exception):
+    """Agente no limite de requisições simultâneas."""
+
+    def __init__(self, agent_id: str, limit: int):
+        super().__init__(f"Agente {agent_id} no limite de {limit} requisições simultâneas")
+        self.agent_id = agent_id
+        self.limit = limit
+
+
+class CircuitBreaker:
+    """closed → open (taxa de falha) → half_open (após open_seconds) → closed | open."""
+
+    def __init__(
+        self,
+        agent_id: str,
+        window: int = AGENT_CIRCUIT_WINDOW,
+        min_calls: int = AGENT_CIRCUIT_MIN_CALLS,
+        failure_rate: float = AGENT_CIRCUIT_FAILURE_RATE,
+        open_seconds: float = AGENT_CIRCUIT_OPEN_SECONDS,
+        half_open_probes: int = AGENT_CIRCUIT_HALF_OPEN_PROBES,
+    ):
+        self.agent_id = agent_id
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._probes = 0
+        # Muda a cada transição: identifica em que estado a tentativa foi admitida
+        self._generation = 0
+        self._set_state(CLOSED)
+
+    def before_call(self) -> int:
+        """Reserva a tentativa e devolve o ticket a passar para `record`, ou levanta CircuitOpenError."""
+        if self.state == OPEN:
+            remaining = self.opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.agent_id, remaining)
+            self._set_state(HALF_OPEN)
+            self._probes = 0
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                raise CircuitOpenError(self.agent_id, 0.0)
+            self._probes += 1
+        return self._generation
+
+    def record(self, success: Optional[bool], ticket: int) -> None:
+        """Resultado da tentativa reservada; None = cancelada (só libera a vaga de teste).
+
+        No half-open só contam as tentativas de teste admitidas nele: uma
+        chamada que começou com o circuito fechado e termina depois não
+        decide o estado nem libera vaga de teste.
+        """
+        if self.state == HALF_OPEN:
+            if ticket != self._generation:
+                return
+            self._probes = max(self._probes - 1, 0)
+            if success is True:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+            elif success is False:
+                self._open()
+            return
+        if success is None:
+            return
+        self._outcomes.append(success)
+        if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def reset(self) -> None:
+        self._outcomes.clear()
+        self._probes = 0
+        self._set_state(CLOSED)
+
+    def snapshot(self) -> dict:
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "failure_rate": self._outcomes.count(False) / calls if calls else 0.0,
+            "times_opened": self.times_opened,
+            "retry_in": max(self.opened_at + self.open_seconds - time.monotonic(), 0.0) if self.state == OPEN else 0.0,
+        }
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        self._generation += 1
+        AGENT_CIRCUIT_STATE.set(_STATE_VALUES[state], agent_id=self.agent_id)
+
+
+class Bulkhead:
+    """Semáforo por agente com espera limitada."""
+
+    def __init__(self, agent_id: str, limit: int, wait: float = AGENT_BULKHEAD_WAIT):
+        self.agent_id = agent_id
+        self.limit = limit
+        self.wait = wait
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __aenter__(self) -> None:
+        if self._semaphore.locked() and self.wait <= 0:
+            raise BulkheadFullError(self.agent_id, self.limit)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.wait)
+        except asyncio.TimeoutError:
+            raise BulkheadFullError(self.agent_id, self.limit) from None
+        self.in_flight += 1
+        AGENT_IN_FLIGHT.set(self.in_flight, agent_id=self.agent_id)
+
+    async def __aexit__(self, *exc) -> None:
+        self.in_flight -= 1
+        AGENT_IN_FLIGHT.set(self.in_flight, agent_id=self.agent_id)
+        self._semaphore.release()
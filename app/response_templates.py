@@ -0,0 +1,159 @@
+"""
+Templates de resposta para NodeResults formulaicos — sem LLM.
+
+O Synthesis consulta `render_template` antes de chamar a LLM. Um template
+é escolhido pela chave (source_node, status, intent, missing_slots), do
+mais específico para o mais genérico ("*" casa qualquer valor):
+
+  - dispatch com status=error (API indisponível, erro HTTP, timeout)
+  - clarify com exatamente UM slot pendente de um agente conhecido
+  - dispatch com status=accepted (job assíncrono aceito pelo agente)
+
+Cada estilo (RESPONSE_TEMPLATES) tem suas próprias frases, com variantes
+escolhidas de forma determinística por turno para não soar repetitivo.
+Placeholders vêm de `data` e `slots_collected` do NodeResult; se algum
+faltar, o template não se aplica e a LLM responde normalmente.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import Optional
+
+from app.config import DEFAULT_VOICE_TONE, RESPONSE_TEMPLATES, VOICE_TONE
+from app.schemas import NodeResult
+
+ANY = "*"
+
+# estilo → (source_node, status, intent, missing_slots) → variantes
+TEMPLATES: dict[str, dict[tuple[str, str, str, tuple[str, ...] | str], list[str]]] = {
+    "formal": {
+        ("dispatch", "error", ANY, ANY): [
+            "Não consegui falar com o {agent_name} agora. Pode tentar de novo em alguns instantes?",
+            "O {agent_name} não respondeu desta vez. Tente novamente daqui a pouco, por favor.",
+        ],
+        ("dispatch", "accepted", ANY, ANY): [
+            "Já pedi ao {agent_name}. Assim que ficar pronto, eu te aviso por aqui.",
+            "O {agent_name} já está cuidando disso — envio o resultado assim que sair.",
+        ],
+        ("clarify", "pending", "clima", ("cidade",)): [
+            "De qual cidade você quer a previsão do tempo?",
+            "Para qual cidade devo consultar o clima?",
+        ],
+        ("clarify", "pending", "happy_birthday", ("nome",)): [
+            "Para quem é a mensagem de aniversário?",
+            "Qual o nome da pessoa aniversariante?",
+        ],
+        ("clarify", "pending", "happy_birthday", ("data",)): [
+            "Qual é a data do aniversário de {nome}?",
+            "Quando é o aniversário de {nome}?",
+        ],
+        ("clarify", "pending", "traduzir", ("idioma",)): [
+            "Para qual idioma devo traduzir?",
+            "Em qual idioma você quer a tradução?",
+        ],
+        ("clarify", "pending", "traduzir", ("texto",)): [
+            "Qual texto você quer traduzir para {idioma}?",
+            "Me envie o texto que devo traduzir para {idioma}.",
+        ],
+        ("clarify", "pending", "lembrete", ("horario",)): [
+            "Para que horário devo criar o lembrete de {descricao}?",
+            "Que horas você quer ser lembrado de {descricao}?",
+        ],
+        ("clarify", "pending", "lembrete", ("descricao",)): [
+            "Do que devo te lembrar às {horario}?",
+            "Qual é o lembrete para as {horario}?",
+        ],
+    },
+    "casual": {
+        ("dispatch", "error", ANY, ANY): [
+            "Eita, o {agent_name} não respondeu agora. Tenta de novo daqui a pouco?",
+            "Não rolou falar com o {agent_name} dessa vez. Bora tentar de novo já já?",
+        ],
+        ("dispatch", "accepted", ANY, ANY): [
+            "Beleza, tô gerando aqui! Te aviso assim que ficar pronto.",
+            "Deixa comigo, o {agent_name} já tá nisso. Já já te mando!",
+        ],
+        ("clarify", "pending", "clima", ("cidade",)): [
+            "Beleza! De qual cidade?",
+            "Show, qual cidade?",
+        ],
+        ("clarify", "pending", "happy_birthday", ("nome",)): [
+            "Pra quem é o parabéns?",
+            "Quem tá fazendo aniversário?",
+        ],
+        ("clarify", "pending", "happy_birthday", ("data",)): [
+            "E quando é o aniversário de {nome}?",
+            "Fechou! Qual a data do niver de {nome}?",
+        ],
+        ("clarify", "pending", "traduzir", ("idioma",)): [
+            "Pra qual idioma?",
+            "Traduzo pra qual língua?",
+        ],
+        ("clarify", "pending", "traduzir", ("texto",)): [
+            "Manda o texto que eu passo pro {idioma}!",
+            "Qual texto vai pro {idioma}?",
+        ],
+        ("clarify", "pending", "lembrete", ("horario",)): [
+            "Que horas te lembro de {descricao}?",
+            "Fechado! Pra que horas o lembrete de {descricao}?",
+        ],
+        ("clarify", "pending", "lembrete", ("descricao",)): [
+            "Te lembro do quê às {horario}?",
+            "Beleza, e qual é o lembrete das {horario}?",
+        ],
+    },
+}
+
+
+def active_style(setting: str = RESPONSE_TEMPLATES, voice_tone: str = VOICE_TONE) -> Optional[str]:
+    """Estilo em uso. `auto` só liga com o VOICE_TONE padrão — um tom customizado não tem variantes."""
+    if setting == "off":
+        return None
+    if setting == "auto":
+        return "formal" if voice_tone == DEFAULT_VOICE_TONE else None
+    if setting not in TEMPLATES:
+        raise ValueError(f"RESPONSE_TEMPLATES desconhecido: '{setting}'")
+    return setting
+
+
+STYLE = active_style()
+
+
+def _lookup(style: str, result: NodeResult) -> Optional[list[str]]:
+    templates = TEMPLATES[style]
+    missing = tuple(result.missing_slots)
+    intent = result.intent or ANY
+    for key in (
+        (result.source_node, result.status, intent, missing),
+        (result.source_node, result.status, intent, ANY),
+        (result.source_node, result.status, ANY, missing),
+        (result.source_node, result.status, ANY, ANY),
+    ):
+        if key in templates:
+            return templates[key]
+    return None
+
+
+def render_template(result: NodeResult, user_input: str, style: Optional[str] = STYLE) -> Optional[str]:
+    """Resposta pronta para o NodeResult, ou None para o Synthesis usar a LLM."""
+    if style is None:
+        return None
+    # Pergunta no meio de um clarify ("você sabe onde eu moro?") merece resposta de verdade
+    if result.source_node == "clarify" and "?" in user_input:
+        return None
+
+    # Erro explicado pelo próprio agente tem conteúdo — só falhas de transporte são formulaicas
+    if result.data.get("agent_response"):
+        return None
+
+    variants = _lookup(style, result)
+    if not variants:
+        return None
+
+    values = {**result.slots_collected, **{k: v for k, v in result.data.items() if isinstance(v, str)}}
+    variant = variants[zlib.crc32(user_input.encode()) % len(variants)]
+    try:
+        return variant.format(**values)
+    except (KeyError, IndexError):
+        return None
@@ -8,9 +8,10 @@ natural para o usuário, usando o tom de voz configurado.
 
 from __future__ import annotations
 
+import operator
 import uuid
 from enum import Enum
-from typing import Any, Optional
+from typing import Annotated, Any, Optional
 
 from pydantic import BaseModel, Field
 
@@ -26,15 +27,27 @@ class RouteMode(str, Enum):
 
 # ── Structured outputs dos nós ─────────────────────────────────────────
 
+class IntentRequest(BaseModel):
+    """Um dos pedidos de uma mensagem com várias intents (fan-out)."""
+    intent: str
+    extracted_slots: dict[str, str] = Field(default_factory=dict)
+    missing_slots: list[str] = Field(default_factory=list)
+
+
 class Classification(BaseModel):
     """Saída estruturada do nó de classificação (JSON da LLM)."""
+    # Ordem dos campos = ordem do schema na saída estruturada: a rota
+    # (mode, intent, extracted_slots) fecha primeiro no streaming
     mode: RouteMode
     intent: Optional[str] = None
-    confidence: float = Field(default=0.0, ge=0.0, le=1.0)
+    extracted_slots: dict[str, str] = Field(default_factory=dict)
     missing_slots: list[str] = Field(default_factory=list)
+    confidence: float = Field(default=0.0, ge=0.0, le=1.0)
     question_to_ask: Optional[str] = None
     candidate_agents: list[str] = Field(default_factory=list)
-    extracted_slots: dict[str, str] = Field(default_factory=dict)
+    # Mensagem com 2+ pedidos ("clima em Curitiba e me lembra de..."): um grupo
+    # por intent, despachados em paralelo pelo nó fan_out. Vazio = pedido único.
+    intents: list[IntentRequest] = Field(default_factory=list)
 
 
 class NodeResult(BaseModel):
@@ -43,9 +56,9 @@ class NodeResult(BaseModel):
     (small_talk, clarify, self_serve, dispatch).
     O synthesis consome isso para gerar a resposta final.
     """
-    source_node: str                          # qual nó produziu
+    source_node: str                          # qual nó produziu (fan_out: data["results"] por intent)
     intent: Optional[str] = None
-    status: str = "ok"                        # ok, error, pending
+    status: str = "ok"                        # ok, error, pending, accepted (job assíncrono; fan_out: partial)
     data: dict[str, Any] = Field(default_factory=dict)  # payload do resultado
     slots_collected: dict[str, str] = Field(default_factory=dict)
     missing_slots: list[str] = Field(default_factory=list)
@@ -62,9 +75,25 @@ class GraphState(BaseModel):
     session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
 
     # Histórico de mensagens (lista de dicts para serialização)
-    messages: list[dict[str, str]] = Field(default_factory=list)
+    # Reducer de append: nós retornam só as mensagens NOVAS do turno.
+    # Na entrada do grafo contém apenas a janela recente (SESSION_HISTORY_WINDOW);
+    # o histórico completo fica no SessionStore.
+    messages: Annotated[list[dict[str, str]], operator.add] = Field(default_factory=list)
     # Formato: [{"role": "user"|"assistant", "content": "..."}, ...]
 
+    # Posição da janela no histórico da sessão (preenchidas pelo SessionStore):
+    # mensagens anteriores à janela e quantas mensagens a janela trouxe — o
+    # que vier depois delas em `messages` é o delta do turno
+    history_offset: int = 0
+    history_loaded: int = 0
+
+    # Resumo incremental das mensagens anteriores à janela (mantido pelo SessionStore)
+    history_summary: str = ""
+
+    # Jobs assíncronos de agentes da sessão (app/jobs.py): pendentes e concluídos
+    # ainda não entregues — o Synthesis entrega os concluídos no turno
+    jobs: list[dict[str, Any]] = Field(default_factory=list)
+
     # Input do turno atual
     user_input: str = ""
 
@@ -80,9 +109,15 @@ class GraphState(BaseModel):
     # Intent acumulada (persiste entre turnos de clarify)
     current_intent: Optional[str] = None
 
+    # Resposta já gerada pela classificação no modo fundido (small_talk/clarify)
+    fused_reply: Optional[str] = None
+
     # Resposta final (gerada APENAS pelo synthesis)
     response: str = ""
 
+    # Nós executados no turno, na ordem (preenchido por app.metrics.instrument_node)
+    node_path: Annotated[list[str], operator.add] = Field(default_factory=list)
+
     # Resultado bruto do agente externo (para debug/log)
     agent_result: Optional[dict[str, Any]] = None
 
@@ -106,6 +141,15 @@ class ChatResponse(BaseModel):
     debug: Optional[dict[str, Any]] = None
 
 
+class JobCallback(BaseModel):
+    """Resultado de job assíncrono enviado pelo agente (POST /agents/callback/{session_id})."""
+    job_id: str
+    status: str = "ok"                        # ok | error
+    response: str = ""
+    data: dict[str, Any] = Field(default_factory=dict)
+    error: Optional[str] = None
+
+
 # ── Agent Registry ────────────────────────────────────────────────────
 
 class AgentCard(BaseModel):
@@ -116,3 +160,11 @@ class AgentCard(BaseModel):
     required_slots: list[str] = Field(default_factory=list)
     endpoint: Optional[str] = None
     self_serve: bool = False
+
+    # Orçamento de chamada à API de agentes
+    timeout: float = 30.0                     # segundos por tentativa
+    max_retries: int = 0                      # tentativas extras em falha transitória
+    idempotent: bool = False                  # pode repetir/duplicar sem efeito colateral
+    hedge_after: Optional[float] = None       # s; dispara 2ª tentativa (exige idempotent)
+    max_concurrency: Optional[int] = None     # bulkhead; None = AGENT_MAX_CONCURRENCY
+    cache_ttl: Optional[float] = None         # s; resultado cacheável por (agente, slots); None = não cacheia
@@ -1,16 +1,45 @@
 """
 FastAPI server — expõe o orquestrador A2A via HTTP.
+
+  POST /chat         resposta completa (JSON); aceita header Idempotency-Key
+  POST /chat/stream  eventos SSE: classification → node_result → token* → done
+  WS   /ws/chat      mesmos eventos, um turno por mensagem recebida
+  GET  /metrics      métricas no formato Prometheus
+  GET  /admin/agents circuit breaker e bulkhead por agente
+
+  POST /agents/callback/{session_id}  webhook de job assíncrono de agente
+  GET  /sessions/{session_id}/events  eventos SSE com os jobs concluídos
+  GET  /sessions/{session_id}/state   checkpoint atual da sessão (ou ?checkpoint_id=)
+  GET  /sessions/{session_id}/checkpoints  checkpoints dos últimos turnos
+
+Cada turno passa só a mensagem nova ao grafo: o estado da sessão é carregado
+e persistido pelo checkpointer (app/checkpoint.py), sob o lock da sessão.
 """
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+import time
 from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 
-from app.schemas import ChatRequest, ChatResponse, GraphState
+from app.agent_cache import agent_result_cache
+from app.agents_client import agents_client
+from app.classification_batcher import classification_batcher
+from app.classification_cache import classification_cache
+from app.idempotency import IdempotencyConflict, idempotency_cache
+from app.jobs import job_manager
+from app.metrics import llm_usage_stats, record_request, render_metrics, set_session_store_stats
+from app.checkpoint import SESSION_CHANNELS, TURN_DURABILITY, thread_config, turn_input
+from app.config import close_llms, warmup_llms
+from app.schemas import ChatRequest, ChatResponse, GraphState, JobCallback
 from app.session import session_manager
 from app.graph import orchestrator_graph
 
@@ -20,8 +49,15 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await warmup_llms()
+    await agents_client.start()
     logger.info("🚀 A2A Orchestrator started")
     yield
+    await classification_batcher.drain()
+    await job_manager.aclose()
+    await session_manager.summarizer.drain()
+    await agents_client.aclose()
+    await close_llms()
     logger.info("👋 A2A Orchestrator stopped")
 
 
@@ -40,55 +76,158 @@ app.add_middleware(
 )
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Endpoint principal de chat."""
-    try:
-        state = session_manager.get_or_create(request.session_id)
-        state.user_input = request.message
+PROCESSING_NODES = ("small_talk", "clarify", "self_serve", "dispatch", "fan_out")
 
-        logger.info(f"[{state.session_id}] User: {request.message}")
+# Turnos em streaming rodam em tasks próprias: se o cliente desconectar,
+# o turno termina e é persistido mesmo assim.
+_background_turns: set[asyncio.Task] = set()
 
-        # Executa o grafo
-        result = orchestrator_graph.invoke(state.model_dump())
 
-        updated_state = GraphState(**result)
-        updated_state.session_id = state.session_id
-        session_manager.save(updated_state)
+def _turn_response(result: dict) -> ChatResponse:
+    """Monta a resposta do turno — o checkpointer já persistiu o delta."""
+    # Saída do grafo é confiável: sem revalidar
+    updated_state = GraphState.model_construct(**result)
 
-        classification = updated_state.classification
-        logger.info(
-            f"[{state.session_id}] "
-            f"Mode={classification.mode if classification else 'N/A'} "
-            f"Intent={classification.intent if classification else 'N/A'}"
-        )
+    classification = updated_state.classification
+    logger.info(
+        f"[{updated_state.session_id}] "
+        f"Mode={classification.mode if classification else 'N/A'} "
+        f"Intent={classification.intent if classification else 'N/A'}"
+    )
+
+    return ChatResponse(
+        session_id=updated_state.session_id,
+        response=updated_state.response,
+        classification=updated_state.classification,
+        node_result=updated_state.node_result,
+        agent_result=updated_state.agent_result,
+        debug={
+            "slots": updated_state.slots,
+            "current_intent": updated_state.current_intent,
+            "message_count": updated_state.history_offset + len(updated_state.messages),
+            "node_path": updated_state.node_path,
+        },
+    )
 
-        return ChatResponse(
-            session_id=updated_state.session_id,
-            response=updated_state.response,
-            classification=updated_state.classification,
-            node_result=updated_state.node_result,
-            agent_result=updated_state.agent_result,
-            debug={
-                "slots": updated_state.slots,
-                "current_intent": updated_state.current_intent,
-                "message_count": len(updated_state.messages),
-                "node_path": _get_node_path(updated_state),
-            },
+
+async def _run_turn(request: ChatRequest) -> ChatResponse:
+    async with session_manager.turn(request.session_id) as session_id:
+        logger.info(f"[{session_id}] User: {request.message}")
+
+        result = await orchestrator_graph.ainvoke(
+            turn_input(session_id, request.message), thread_config(session_id), durability=TURN_DURABILITY,
         )
+    return _turn_response(result)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, idempotency_key: Optional[str] = Header(default=None)):
+    """Endpoint principal de chat. Retries com o mesmo Idempotency-Key recebem a resposta guardada."""
+    start = time.perf_counter()
+    try:
+        return await idempotency_cache.run(idempotency_key, request, lambda: _run_turn(request))
 
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.exception(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        record_request("/chat", time.perf_counter() - start)
+
+
+async def _produce_turn_events(request: ChatRequest, queue: asyncio.Queue, endpoint: str) -> None:
+    """Executa o turno em streaming, publicando eventos na fila. None encerra."""
+    start = time.perf_counter()
+    try:
+        async with session_manager.turn(request.session_id) as session_id:
+            logger.info(f"[{session_id}] User (stream): {request.message}")
+
+            result: dict = {}
+            stream = orchestrator_graph.astream(
+                turn_input(session_id, request.message),
+                thread_config(session_id),
+                stream_mode=["updates", "custom", "values"],
+                durability=TURN_DURABILITY,
+            )
+            async for mode, chunk in stream:
+                if mode == "custom" and "token" in chunk:
+                    await queue.put({"type": "token", "content": chunk["token"]})
+                elif mode == "values":
+                    result = chunk
+                elif mode == "updates":
+                    for node, update in chunk.items():
+                        if node == "classification" and update.get("classification"):
+                            await queue.put({
+                                "type": "classification",
+                                "session_id": session_id,
+                                "classification": update["classification"].model_dump(mode="json"),
+                            })
+                        elif node in PROCESSING_NODES and update.get("node_result"):
+                            await queue.put({
+                                "type": "node_result",
+                                "node_result": update["node_result"].model_dump(mode="json"),
+                                "agent_result": update.get("agent_result"),
+                            })
+
+        response = _turn_response(result)
+        await queue.put({"type": "done", **response.model_dump(mode="json")})
+
+    except Exception as e:
+        logger.exception(f"Error (stream): {e}")
+        await queue.put({"type": "error", "detail": str(e)})
+    finally:
+        record_request(endpoint, time.perf_counter() - start)
+        await queue.put(None)
+
+
+async def _stream_turn(request: ChatRequest, endpoint: str) -> AsyncIterator[dict]:
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(_produce_turn_events(request, queue, endpoint))
+    _background_turns.add(task)
+    task.add_done_callback(_background_turns.discard)
+
+    while (event := await queue.get()) is not None:
+        yield event
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Chat via Server-Sent Events. Tokens do synthesis chegam conforme gerados."""
+
+    async def sse() -> AsyncIterator[str]:
+        async for event in _stream_turn(request, "/chat/stream"):
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
 
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-def _get_node_path(state: GraphState) -> list[str]:
-    """Reconstrói o caminho de nós executados."""
-    path = ["intake", "classification"]
-    if state.classification:
-        path.append(state.classification.mode.value)
-    path.append("synthesis")
-    return path
+
+@app.websocket("/ws/chat")
+async def chat_ws(websocket: WebSocket):
+    """Chat via WebSocket. Cada mensagem {session_id?, message} gera um turno."""
+    await websocket.accept()
+    # ?session_id= continua uma sessão (e roteia para o worker dono, com SESSION_AFFINITY)
+    session_id = websocket.query_params.get("session_id")
+    try:
+        while True:
+            payload = await websocket.receive_json()
+            try:
+                request = ChatRequest.model_validate(
+                    {**payload, "session_id": payload.get("session_id") or session_id}
+                )
+            except ValidationError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            async for event in _stream_turn(request, "/ws/chat"):
+                if event["type"] == "done":
+                    session_id = event["session_id"]
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
 
 
 @app.get("/sessions")
@@ -96,12 +235,124 @@ async def list_sessions():
     return {"sessions": session_manager.list_sessions()}
 
 
+@app.get("/sessions/stats")
+async def session_stats():
+    return {**session_manager.stats(), "jobs": job_manager.stats()}
+
+
+# Intervalo entre comentários de keep-alive no stream de eventos
+EVENTS_HEARTBEAT_SECONDS = 15.0
+
+
+def _checkpoint_view(snapshot) -> dict:
+    parent = snapshot.parent_config["configurable"]["checkpoint_id"] if snapshot.parent_config else None
+    return {
+        "checkpoint_id": snapshot.config["configurable"]["checkpoint_id"],
+        "parent_id": parent,
+        "created_at": snapshot.created_at,
+        "step": snapshot.metadata.get("step"),
+        "message_count": snapshot.metadata.get("message_count"),
+        "node_path": snapshot.metadata.get("node_path"),
+    }
+
+
+@app.get("/sessions/{session_id}/state")
+async def session_state(session_id: str, checkpoint_id: Optional[str] = Query(default=None)):
+    """Checkpoint da sessão — por padrão o atual, o estado que o próximo turno recebe."""
+    snapshot = await orchestrator_graph.aget_state(thread_config(session_id, checkpoint_id))
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail="Sessão ou checkpoint não encontrado")
+    return {
+        "session_id": session_id,
+        **_checkpoint_view(snapshot),
+        "state": {name: snapshot.values.get(name) for name in SESSION_CHANNELS},
+    }
+
+
+@app.get("/sessions/{session_id}/checkpoints")
+async def session_checkpoints(session_id: str, limit: Optional[int] = Query(default=None, ge=1)):
+    """Checkpoints guardados dos últimos turnos, do mais recente ao mais antigo."""
+    history = [
+        _checkpoint_view(snapshot)
+        async for snapshot in orchestrator_graph.aget_state_history(thread_config(session_id), limit=limit)
+    ]
+    if not history:
+        raise HTTPException(status_code=404, detail="Sessão não encontrada")
+    return {"session_id": session_id, "checkpoints": history}
+
+
+@app.get("/sessions/{session_id}/events")
+async def session_events(session_id: str):
+    """
+    Eventos SSE da sessão: cada job assíncrono concluído vira um evento
+    `job_done` assim que termina. Jobs entregues aqui não voltam no turno.
+    """
+    if session_manager.store.get(session_id) is None:
+        raise HTTPException(status_code=404, detail="Sessão não encontrada")
+
+    async def sse() -> AsyncIterator[str]:
+        async with job_manager.subscribe(session_id) as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/agents/callback/{session_id}", status_code=202)
+async def agent_job_callback(session_id: str, payload: JobCallback, token: Optional[str] = Query(default=None)):
+    """Webhook do agente com o resultado de um job aceito com 202."""
+    if not job_manager.verify_token(session_id, token):
+        raise HTTPException(status_code=403, detail="Token de callback inválido")
+    job_manager.complete(session_id, payload.job_id, payload.model_dump())
+    return {"status": "received", "job_id": payload.job_id}
+
+
 @app.delete("/sessions/{session_id}")
 async def delete_session(session_id: str):
     session_manager.delete(session_id)
     return {"status": "deleted"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "classification": classification_cache.stats(),
+        "idempotency": idempotency_cache.stats(),
+        "agent_results": agent_result_cache.stats(),
+        "prompt_cache": llm_usage_stats(),
+    }
+
+
+@app.get("/admin/agents")
+async def agents_status():
+    """Circuit breaker e bulkhead por agente, mais retries/hedges."""
+    return {"agents": agents_client.resilience_stats()}
+
+
+@app.post("/admin/agents/{agent_id}/reset")
+async def reset_agent_breaker(agent_id: str):
+    """Fecha o circuito do agente manualmente (ex.: depois de um deploy de correção)."""
+    if not agents_client.reset_breaker(agent_id):
+        raise HTTPException(status_code=404, detail=f"Sem circuit breaker para '{agent_id}'")
+    return {"status": "reset", "agent_id": agent_id}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas Prometheus (text exposition format 0.0.4)."""
+    set_session_store_stats(session_manager.stats())
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "service": "a2a-orchestrator", "version": "0.2.0"}
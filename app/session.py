@@ -1,39 +1,806 @@
 """
 Gerenciador de sessões — mantém GraphState entre turnos.
-Em produção, troque por Redis ou PostgreSQL.
+
+O armazenamento é plugável via SessionStore:
+  - InMemorySessionStore: LRU limitado por nº de entradas e bytes, com TTL ocioso.
+  - SQLiteSessionStore: persiste entre restarts (WAL), compartilhável entre
+    workers uvicorn no mesmo host.
+
+Backend escolhido por SESSION_BACKEND (memory | sqlite).
+
+Modelo de delta: `get` devolve um snapshot somente leitura com apenas a
+janela recente do histórico (SESSION_HISTORY_WINDOW), sem cópia profunda;
+ao fim do turno, `append` persiste só as mensagens novas e os slots/intent.
+
+Histórico longo: as mensagens que não entram mais no prompt (fora da janela
+ou do orçamento de tokens) são condensadas num resumo incremental (app.history, em background) que acompanha o snapshot em
+`history_summary`. Cada sessão guarda no máximo SESSION_MAX_STORED_MESSAGES
+mensagens; as mais antigas são arquivadas (JSONL no backend memory, tabela
+session_messages_archive no sqlite).
+
+Checkpoints: cada turno concluído grava, junto com o delta, um registro
+compacto do seu checkpoint (id, pai, passo, posição no histórico,
+slots/intent, caminho no grafo). `checkpoints` devolve os últimos
+SESSION_CHECKPOINT_HISTORY, do mais recente ao mais antigo.
+
+Jobs assíncronos de agentes (app/jobs.py) ficam na própria sessão:
+`put_job` grava/atualiza, `get` devolve os jobs em `GraphState.jobs` e
+`delete_jobs` remove os já entregues ao usuário.
+
+Checkpointer: o grafo carrega e persiste o estado pelo SessionCheckpointer
+(app/checkpoint.py), com thread_id = session_id — `get` no início do turno,
+`commit_turn` no checkpoint final. Com store bloqueante (sqlite), os métodos
+async (`run_io`, `acommit_turn`) fazem o I/O numa thread, fora do event loop.
+
+Concorrência: `SessionManager.turn` serializa os turnos de uma mesma sessão
+com um asyncio.Lock por session_id (checkpoint → grafo → checkpoint), então
+duas requisições simultâneas não perdem um turno. Sessões diferentes rodam
+em paralelo. O lock é por processo — com vários workers, o roteamento
+precisa manter a sessão no mesmo worker (serve.py --affinity, app/affinity.py).
 """
 
 from __future__ import annotations
 
+import asyncio
+import json
+import sqlite3
+import threading
+import time
 import uuid
-from typing import Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 
+from app.config import (
+    SESSION_ARCHIVE_PATH,
+    SESSION_BACKEND,
+    SESSION_CHECKPOINT_HISTORY,
+    SESSION_HISTORY_WINDOW,
+    SESSION_MAX_BYTES,
+    SESSION_MAX_ENTRIES,
+    SESSION_MAX_STORED_MESSAGES,
+    SESSION_PURGE_INTERVAL_SECONDS,
+    SESSION_SQLITE_PATH,
+    SESSION_TTL_SECONDS,
+)
+from app.history import HistorySummarizer, history_summarizer
+from app.metrics import SESSION_LOCK_WAIT
 from app.schemas import GraphState
 
 
-class SessionManager:
-    """In-memory session store."""
+class SessionStore(ABC):
+    """Interface de armazenamento de sessões."""
+
+    # Operações fazem I/O bloqueante: os caminhos async as rodam numa thread
+    blocking = False
 
     def __init__(self):
-        self._sessions: dict[str, GraphState] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.archived_messages = 0
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[GraphState]:
+        """Snapshot somente leitura com a janela recente do histórico, ou None se ausente/expirado."""
+
+    @abstractmethod
+    def save(self, state: GraphState) -> None:
+        """Grava o estado completo (criação de sessão)."""
+
+    @abstractmethod
+    def append(
+        self,
+        session_id: str,
+        messages: list[dict[str, str]],
+        slots: dict[str, str],
+        current_intent: Optional[str],
+        checkpoint: Optional[dict] = None,
+    ) -> int:
+        """Persiste o delta do turno (arquivando o excesso) e o checkpoint do turno. Retorna o total de mensagens."""
+
+    @abstractmethod
+    def checkpoints(self, session_id: str, limit: Optional[int] = None) -> list[dict]:
+        """Checkpoints guardados da sessão, do mais recente ao mais antigo."""
+
+    @abstractmethod
+    def get_summary(self, session_id: str) -> Optional[tuple[str, int, int]]:
+        """(resumo, mensagens cobertas pelo resumo, total de mensagens), ou None se ausente."""
+
+    @abstractmethod
+    def put_job(self, session_id: str, job: dict) -> bool:
+        """Grava/atualiza um job da sessão (chave `job_id`). False se a sessão não existe."""
+
+    @abstractmethod
+    def get_job(self, session_id: str, job_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    def delete_jobs(self, session_id: str, job_ids: list[str]) -> None: ...
+
+    @abstractmethod
+    def messages_range(self, session_id: str, start: int, end: int) -> list[dict[str, str]]:
+        """Mensagens com seq em [start, end) ainda não arquivadas."""
+
+    @abstractmethod
+    def set_summary(self, session_id: str, summary: str, upto: int) -> None: ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None: ...
+
+    @abstractmethod
+    def list_sessions(self) -> list[str]: ...
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "sessions": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "archived_messages": self.archived_messages,
+        }
+
+
+def _message_size(msg: dict[str, str]) -> int:
+    return 64 + len(msg.get("content", ""))
+
+
+def _slots_size(slots: dict[str, str]) -> int:
+    return sum(len(key) + len(value) for key, value in slots.items())
+
+
+def _job_size(job: dict) -> int:
+    return 64 + len(json.dumps(job, ensure_ascii=False))
+
+
+_checkpoint_size = _job_size
+
+
+class _SessionRecord:
+    """Entrada do InMemorySessionStore — dono exclusivo do histórico completo."""
+
+    __slots__ = (
+        "messages", "slots", "current_intent", "summary", "summary_upto", "archived", "jobs", "checkpoints",
+        "size", "last_access",
+    )
+
+    def __init__(self, messages: list[dict[str, str]], slots: dict[str, str], current_intent: Optional[str]):
+        self.messages = messages
+        self.slots = slots
+        self.current_intent = current_intent
+        self.summary = ""
+        self.summary_upto = 0
+        self.archived = 0       # mensagens arquivadas == seq da primeira em `messages`
+        self.jobs: dict[str, dict] = {}
+        self.checkpoints: list[dict] = []   # mais recente primeiro
+        self.size = 512 + _slots_size(slots) + sum(_message_size(m) for m in messages)
+        self.last_access = time.monotonic()
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU in-memory limitado por entradas e bytes, com expiração por inatividade."""
+
+    def __init__(
+        self,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        max_bytes: int = SESSION_MAX_BYTES,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        history_window: int = SESSION_HISTORY_WINDOW,
+        max_stored_messages: int = SESSION_MAX_STORED_MESSAGES,
+        archive_path: str = SESSION_ARCHIVE_PATH,
+        checkpoint_history: int = SESSION_CHECKPOINT_HISTORY,
+    ):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.history_window = history_window
+        self.max_stored_messages = max_stored_messages
+        self.archive_path = archive_path
+        self.checkpoint_history = checkpoint_history
+        # Ordem do OrderedDict = ordem LRU (== ordem de último acesso)
+        self._sessions: OrderedDict[str, _SessionRecord] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, session_id: str) -> Optional[GraphState]:
+        record = self._sessions.get(session_id)
+        if record is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        if now - record.last_access > self.ttl_seconds:
+            self._remove(session_id)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        record.last_access = now
+        self._sessions.move_to_end(session_id)
+        self.hits += 1
+        # Sem validação nem cópia profunda: dados internos confiáveis.
+        # O fatiamento cria uma lista nova; os slots nunca são mutados in place.
+        window = record.messages[-self.history_window:]
+        return GraphState.model_construct(
+            session_id=session_id,
+            messages=window,
+            history_offset=record.archived + len(record.messages) - len(window),
+            history_loaded=len(window),
+            slots=record.slots,
+            current_intent=record.current_intent,
+            history_summary=record.summary,
+            jobs=list(record.jobs.values()),
+        )
+
+    def save(self, state: GraphState) -> None:
+        self._remove(state.session_id)
+        record = _SessionRecord(list(state.messages), dict(state.slots), state.current_intent)
+        self._sessions[state.session_id] = record
+        self._bytes += record.size
+        self._evict()
+
+    def append(
+        self,
+        session_id: str,
+        messages: list[dict[str, str]],
+        slots: dict[str, str],
+        current_intent: Optional[str],
+        checkpoint: Optional[dict] = None,
+    ) -> int:
+        record = self._sessions.get(session_id)
+        if record is None:
+            # Sessão nova, ou expirou/foi removida durante o turno: começa com o delta
+            record = _SessionRecord([], {}, None)
+            self._sessions[session_id] = record
+            self._bytes += record.size
+
+        delta = sum(_message_size(m) for m in messages)
+        record.messages.extend(messages)
+        if slots != record.slots:
+            delta += _slots_size(slots) - _slots_size(record.slots)
+            record.slots = slots
+        overflow = len(record.messages) - self.max_stored_messages
+        if overflow > 0:
+            old = record.messages[:overflow]
+            del record.messages[:overflow]
+            self._archive(session_id, record.archived, old)
+            record.archived += overflow
+            delta -= sum(_message_size(m) for m in old)
+        if checkpoint is not None:
+            record.checkpoints.insert(0, checkpoint)
+            delta += _checkpoint_size(checkpoint)
+            for dropped in record.checkpoints[self.checkpoint_history:]:
+                delta -= _checkpoint_size(dropped)
+            del record.checkpoints[self.checkpoint_history:]
+        record.current_intent = current_intent
+        record.size += delta
+        record.last_access = time.monotonic()
+        self._bytes += delta
+        self._sessions.move_to_end(session_id)
+        self._evict()
+        return record.archived + len(record.messages)
+
+    def checkpoints(self, session_id: str, limit: Optional[int] = None) -> list[dict]:
+        record = self._sessions.get(session_id)
+        if record is None:
+            return []
+        return record.checkpoints[:limit]
+
+    def get_summary(self, session_id: str) -> Optional[tuple[str, int, int]]:
+        record = self._sessions.get(session_id)
+        if record is None:
+            return None
+        return record.summary, record.summary_upto, record.archived + len(record.messages)
+
+    def put_job(self, session_id: str, job: dict) -> bool:
+        record = self._sessions.get(session_id)
+        if record is None:
+            return False
+        previous = record.jobs.get(job["job_id"])
+        delta = _job_size(job) - (_job_size(previous) if previous else 0)
+        record.jobs[job["job_id"]] = job
+        record.size += delta
+        self._bytes += delta
+        return True
+
+    def get_job(self, session_id: str, job_id: str) -> Optional[dict]:
+        record = self._sessions.get(session_id)
+        return record.jobs.get(job_id) if record else None
+
+    def delete_jobs(self, session_id: str, job_ids: list[str]) -> None:
+        record = self._sessions.get(session_id)
+        if record is None:
+            return
+        for job_id in job_ids:
+            job = record.jobs.pop(job_id, None)
+            if job is not None:
+                record.size -= _job_size(job)
+                self._bytes -= _job_size(job)
+
+    def messages_range(self, session_id: str, start: int, end: int) -> list[dict[str, str]]:
+        record = self._sessions.get(session_id)
+        if record is None:
+            return []
+        return record.messages[max(start - record.archived, 0):max(end - record.archived, 0)]
+
+    def set_summary(self, session_id: str, summary: str, upto: int) -> None:
+        record = self._sessions.get(session_id)
+        if record is None or upto <= record.summary_upto:
+            return
+        delta = len(summary) - len(record.summary)
+        record.summary = summary
+        record.summary_upto = upto
+        record.size += delta
+        self._bytes += delta
+
+    def _archive(self, session_id: str, start: int, messages: list[dict[str, str]]) -> None:
+        self.archived_messages += len(messages)
+        if not self.archive_path:
+            return
+        archived_at = time.time()
+        with open(self.archive_path, "a", encoding="utf-8") as f:
+            for i, m in enumerate(messages):
+                f.write(json.dumps(
+                    {"session_id": session_id, "seq": start + i, "archived_at": archived_at, **m},
+                    ensure_ascii=False,
+                ) + "\n")
+
+    def delete(self, session_id: str) -> None:
+        self._remove(session_id)
+
+    def list_sessions(self) -> list[str]:
+        return list(self._sessions.keys())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "bytes": self._bytes}
+
+    def _remove(self, session_id: str) -> None:
+        record = self._sessions.pop(session_id, None)
+        if record is not None:
+            self._bytes -= record.size
+
+    def _evict(self) -> None:
+        # Ordem LRU == ordem de último acesso: expirados ficam no início
+        now = time.monotonic()
+        while self._sessions:
+            session_id, record = next(iter(self._sessions.items()))
+            if now - record.last_access > self.ttl_seconds:
+                self._remove(session_id)
+                self.expirations += 1
+            elif len(self._sessions) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(session_id)
+                self.evictions += 1
+            else:
+                break
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessões em SQLite (WAL) — sobrevivem a restarts e são compartilhadas entre processos.
+
+    Mensagens ficam numa tabela append-only; cada turno insere só as novas
+    e atualiza a linha da sessão (slots, intent, contagem). Acima de
+    `max_stored_messages`, as mais antigas migram para session_messages_archive.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str = SESSION_SQLITE_PATH,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        history_window: int = SESSION_HISTORY_WINDOW,
+        max_stored_messages: int = SESSION_MAX_STORED_MESSAGES,
+        purge_interval: float = SESSION_PURGE_INTERVAL_SECONDS,
+        checkpoint_history: int = SESSION_CHECKPOINT_HISTORY,
+    ):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.history_window = history_window
+        self.max_stored_messages = max_stored_messages
+        self.checkpoint_history = checkpoint_history
+        self.purge_interval = purge_interval
+        self._next_purge = time.monotonic() + purge_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " slots TEXT NOT NULL,"
+            " current_intent TEXT,"
+            " message_count INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " summary TEXT NOT NULL DEFAULT '',"
+            " summary_upto INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_messages ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_messages_archive ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " archived_at REAL NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_jobs ("
+            " session_id TEXT NOT NULL,"
+            " job_id TEXT NOT NULL,"
+            " job TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, job_id))"
+        )
+        # Ordem de gravação (rowid) == ordem dos turnos
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_checkpoints ("
+            " session_id TEXT NOT NULL,"
+            " checkpoint_id TEXT NOT NULL,"
+            " checkpoint TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, checkpoint_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """Bancos criados antes do resumo de histórico não têm as colunas summary/summary_upto."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        if "summary" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+        if "summary_upto" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN summary_upto INTEGER NOT NULL DEFAULT 0")
+
+    def get(self, session_id: str) -> Optional[GraphState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT slots, current_intent, updated_at, summary, message_count FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if time.time() - row[2] > self.ttl_seconds:
+                self._delete(session_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            rows = self._conn.execute(
+                "SELECT role, content FROM session_messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, self.history_window),
+            ).fetchall()
+            jobs = self._conn.execute(
+                "SELECT job FROM session_jobs WHERE session_id = ? ORDER BY rowid", (session_id,)
+            ).fetchall()
+            self.hits += 1
+
+        return GraphState.model_construct(
+            session_id=session_id,
+            messages=[{"role": role, "content": content} for role, content in reversed(rows)],
+            history_offset=row[4] - len(rows),
+            history_loaded=len(rows),
+            slots=json.loads(row[0]),
+            current_intent=row[1],
+            history_summary=row[3],
+            jobs=[json.loads(job) for (job,) in jobs],
+        )
+
+    def save(self, state: GraphState) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._delete(state.session_id)
+            self._insert_messages(state.session_id, 0, state.messages)
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, slots, current_intent, message_count, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (state.session_id, json.dumps(state.slots), state.current_intent, len(state.messages), time.time()),
+            )
+        self._maybe_purge()
+
+    def append(
+        self,
+        session_id: str,
+        messages: list[dict[str, str]],
+        slots: dict[str, str],
+        current_intent: Optional[str],
+        checkpoint: Optional[dict] = None,
+    ) -> int:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT message_count FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            start = row[0] if row else 0
+            self._insert_messages(session_id, start, messages)
+            total = start + len(messages)
+            now = time.time()
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, slots, current_intent, message_count, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(session_id) DO UPDATE SET slots = excluded.slots,"
+                " current_intent = excluded.current_intent, message_count = excluded.message_count,"
+                " updated_at = excluded.updated_at",
+                (session_id, json.dumps(slots), current_intent, total, now),
+            )
+            cutoff = total - self.max_stored_messages
+            if cutoff > 0:
+                self._archive(session_id, cutoff, now)
+            if checkpoint is not None:
+                self._put_checkpoint(session_id, checkpoint)
+        self._maybe_purge()
+        return total
+
+    def _archive(self, session_id: str, cutoff: int, now: float) -> None:
+        self._conn.execute(
+            "INSERT OR IGNORE INTO session_messages_archive (session_id, seq, role, content, archived_at)"
+            " SELECT session_id, seq, role, content, ? FROM session_messages WHERE session_id = ? AND seq < ?",
+            (now, session_id, cutoff),
+        )
+        self.archived_messages += self._conn.execute(
+            "DELETE FROM session_messages WHERE session_id = ? AND seq < ?", (session_id, cutoff)
+        ).rowcount
+
+    def _put_checkpoint(self, session_id: str, checkpoint: dict) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO session_checkpoints (session_id, checkpoint_id, checkpoint) VALUES (?, ?, ?)",
+            (session_id, checkpoint["checkpoint_id"], json.dumps(checkpoint, ensure_ascii=False)),
+        )
+        self._conn.execute(
+            "DELETE FROM session_checkpoints WHERE session_id = ? AND rowid NOT IN"
+            " (SELECT rowid FROM session_checkpoints WHERE session_id = ? ORDER BY rowid DESC LIMIT ?)",
+            (session_id, session_id, self.checkpoint_history),
+        )
+
+    def checkpoints(self, session_id: str, limit: Optional[int] = None) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT checkpoint FROM session_checkpoints WHERE session_id = ? ORDER BY rowid DESC LIMIT ?",
+                (session_id, -1 if limit is None else limit),
+            ).fetchall()
+        return [json.loads(checkpoint) for (checkpoint,) in rows]
+
+    def get_summary(self, session_id: str) -> Optional[tuple[str, int, int]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, summary_upto, message_count FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def messages_range(self, session_id: str, start: int, end: int) -> list[dict[str, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM session_messages WHERE session_id = ? AND seq >= ? AND seq < ?"
+                " ORDER BY seq",
+                (session_id, start, end),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def put_job(self, session_id: str, job: dict) -> bool:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            exists = self._conn.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if exists is None:
+                return False
+            self._conn.execute(
+                "INSERT INTO session_jobs (session_id, job_id, job) VALUES (?, ?, ?)"
+                " ON CONFLICT(session_id, job_id) DO UPDATE SET job = excluded.job",
+                (session_id, job["job_id"], json.dumps(job, ensure_ascii=False)),
+            )
+        return True
+
+    def get_job(self, session_id: str, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job FROM session_jobs WHERE session_id = ? AND job_id = ?", (session_id, job_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete_jobs(self, session_id: str, job_ids: list[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM session_jobs WHERE session_id = ? AND job_id = ?",
+                [(session_id, job_id) for job_id in job_ids],
+            )
+
+    def set_summary(self, session_id: str, summary: str, upto: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET summary = ?, summary_upto = ? WHERE session_id = ? AND summary_upto < ?",
+                (summary, upto, session_id, upto),
+            )
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._delete(session_id)
+
+    def list_sessions(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT session_id FROM sessions")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _insert_messages(self, session_id: str, start: int, messages: list[dict[str, str]]) -> None:
+        self._conn.executemany(
+            "INSERT INTO session_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+            [(session_id, start + i, m.get("role", "user"), m.get("content", "")) for i, m in enumerate(messages)],
+        )
+
+    def _delete(self, session_id: str) -> None:
+        self._conn.execute("DELETE FROM session_checkpoints WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM session_jobs WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM session_messages_archive WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self) -> int:
+        """Remove sessões ociosas além do TTL. Retorna quantas foram removidas."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for table in ("session_messages", "session_messages_archive", "session_jobs", "session_checkpoints"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE session_id IN"
+                    " (SELECT session_id FROM sessions WHERE updated_at < ?)",
+                    (cutoff,),
+                )
+            cursor = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+            self.expirations += cursor.rowcount
+            return cursor.rowcount
+
+    def _maybe_purge(self) -> None:
+        # Sessão expirada só sai no `get`; as abandonadas (e suas mensagens e
+        # arquivo) são varridas nas escritas, no máximo uma vez por intervalo
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        self.purge_expired()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def build_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"SESSION_BACKEND desconhecido: '{backend}'")
+
+
+class SessionLocks:
+    """Um asyncio.Lock por sessão ativa; o lock é descartado quando ninguém mais o usa."""
+
+    def __init__(self):
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._holders: dict[str, int] = {}
+        self.contended = 0
+
+    @asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        self._holders[session_id] = self._holders.get(session_id, 0) + 1
+        if lock.locked():
+            self.contended += 1
+        start = time.perf_counter()
+        try:
+            async with lock:
+                SESSION_LOCK_WAIT.observe(time.perf_counter() - start)
+                yield
+        finally:
+            self._holders[session_id] -= 1
+            if not self._holders[session_id]:
+                del self._holders[session_id]
+                del self._locks[session_id]
+
+    def stats(self) -> dict:
+        return {"active": len(self._locks), "contended": self.contended}
+
+
+class SessionManager:
+    """Fachada de sessões usada pelo server e CLI."""
+
+    def __init__(self, store: Optional[SessionStore] = None, summarizer: Optional[HistorySummarizer] = None):
+        # `is None`: um store vazio é falsy (__len__ == 0)
+        self.store = store if store is not None else build_session_store()
+        self.summarizer = summarizer if summarizer is not None else history_summarizer
+        self.locks = SessionLocks()
 
     def get_or_create(self, session_id: Optional[str] = None) -> GraphState:
-        if session_id and session_id in self._sessions:
-            return self._sessions[session_id].model_copy(deep=True)
+        if session_id:
+            state = self.store.get(session_id)
+            if state is not None:
+                return state
 
         sid = session_id or str(uuid.uuid4())
         state = GraphState(session_id=sid)
-        self._sessions[sid] = state
+        self.store.save(state)
         return state
 
+    @asynccontextmanager
+    async def turn(self, session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Lock do turno da sessão — use em volta da execução do grafo. Entrega o session_id.
+
+        O estado em si é carregado e persistido pelo checkpointer do grafo
+        (app/checkpoint.py). Sessão nova (sem session_id) não precisa de lock:
+        o id gerado ainda não é conhecido por nenhuma outra requisição.
+        """
+        if not session_id:
+            yield str(uuid.uuid4())
+            return
+        async with self.locks.hold(session_id):
+            yield session_id
+
     def save(self, state: GraphState) -> None:
-        self._sessions[state.session_id] = state.model_copy(deep=True)
+        self.store.save(state)
+
+    def commit_turn(self, state: GraphState, checkpoint: Optional[dict] = None) -> int:
+        """Persiste só o delta do turno (mensagens após a janela carregada + slots/intent) e o
+        checkpoint do turno, se houver. Retorna o total de mensagens. Sessão nova é criada aqui.
+
+        Se houver mensagens suficientes fora do prompt (janela + orçamento de tokens), agenda a atualização do
+        resumo em background — o turno não espera por ela.
+        """
+        total, summary_target = self._write_turn(state, checkpoint)
+        if summary_target is not None:
+            self.summarizer.start(self.store, state.session_id, summary_target)
+        return total
+
+    async def acommit_turn(self, state: GraphState, checkpoint: Optional[dict] = None) -> int:
+        """`commit_turn` com a escrita fora do event loop se o store bloqueia."""
+        total, summary_target = await self.run_io(self._write_turn, state, checkpoint)
+        if summary_target is not None:
+            self.summarizer.start(self.store, state.session_id, summary_target)
+        return total
+
+    async def run_io(self, fn, *args):
+        """Roda `fn` numa thread se o store faz I/O bloqueante; direto se é em memória."""
+        if self.store.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _write_turn(self, state: GraphState, checkpoint: Optional[dict]) -> tuple[int, Optional[int]]:
+        """Escrita do turno no store: total de mensagens e até onde resumir (ou None)."""
+        new_messages = state.messages[state.history_loaded:]
+        total = self.store.append(state.session_id, new_messages, state.slots, state.current_intent, checkpoint)
+        # Jobs concluídos que o turno viu foram entregues pelo Synthesis
+        # (nenhum nó escreve `jobs`: são os carregados no início do turno)
+        delivered = [job["job_id"] for job in state.jobs if job.get("status") != "pending"]
+        if delivered:
+            self.store.delete_jobs(state.session_id, delivered)
+        return total, self.summarizer.due(self.store, state.session_id, total, state.messages)
 
     def delete(self, session_id: str) -> None:
-        self._sessions.pop(session_id, None)
+        self.store.delete(session_id)
 
     def list_sessions(self) -> list[str]:
-        return list(self._sessions.keys())
+        return self.store.list_sessions()
+
+    def stats(self) -> dict:
+        return {**self.store.stats(), "summarizer": self.summarizer.stats(), "locks": self.locks.stats()}
 
 
 session_manager = SessionManager()
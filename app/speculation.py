@@ -0,0 +1,137 @@
+"""
+Dispatch especulativo — a chamada do agente começa durante a classificação.
+
+O grafo é sequencial: classification → dispatch → synthesis. Mas a
+classificação chega em streaming e o schema começa por `mode`, `intent` e
+`extracted_slots`: quando esses campos fecham com mode=dispatch e os
+`required_slots` do agente completos, a decisão de rota já está tomada e o
+resto do JSON (confiança, candidatos, `intents`) raramente a muda.
+
+Com SPECULATIVE_DISPATCH_ENABLED, `SpeculativeDispatcher.watcher` devolve o
+callback `on_fields` do turno, que dispara a chamada nesse momento. Ao fim
+da classificação, `settle` compara com a rota final:
+  - mesma rota, intent e slots → a chamada fica para o nó dispatch, que a
+    pega com `take` em vez de chamar o agente de novo (hit)
+  - qualquer divergência (outra rota, fan-out, slots diferentes) → a
+    chamada é cancelada (cancelled)
+  - classificação que falha (ou é cancelada) depois do disparo → o nó
+    descarta a especulação antes de propagar o erro
+
+Só agentes `idempotent` entram: uma chamada descartada não pode ter efeito
+colateral (lembrete criado à toa). Uma especulação por sessão; o lock de
+sessão garante um turno por vez.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from app.config import AGENT_REGISTRY, SPECULATIVE_DISPATCH_ENABLED
+from app.metrics import SPECULATIVE_DISPATCHES, SPECULATIVE_SECONDS_SAVED
+from app.structured_output import normalize_slots
+
+logger = logging.getLogger(__name__)
+
+# (intent, slots) → coroutine da chamada do agente (o mesmo call_agent do dispatch)
+AgentCall = Callable[[str, dict[str, str]], Awaitable[Any]]
+
+
+@dataclass
+class _Speculation:
+    intent: str
+    agent_id: str
+    slots: dict[str, str]
+    task: asyncio.Task
+    started: float
+    finished: Optional[float] = None
+
+
+class SpeculativeDispatcher:
+    """Chamadas de agente especulativas por sessão (uma por turno)."""
+
+    def __init__(self, enabled: bool = SPECULATIVE_DISPATCH_ENABLED):
+        self.enabled = enabled
+        self._running: dict[str, _Speculation] = {}
+        self.counters: Counter = Counter()
+
+    def watcher(
+        self, session_id: Optional[str], slots: dict[str, str], call: AgentCall,
+    ) -> Optional[Callable[[dict[str, Any]], None]]:
+        """Callback `on_fields` da classificação do turno; None se desligado."""
+        if not self.enabled or not session_id:
+            return None
+        self.discard(session_id)  # sobra de um turno interrompido
+
+        def on_fields(fields: dict[str, Any]) -> None:
+            if session_id in self._running or fields.get("mode") != "dispatch" or "extracted_slots" not in fields:
+                return
+            intent = fields.get("intent")
+            card = AGENT_REGISTRY.get(intent) if isinstance(intent, str) else None
+            if card is None or not card.idempotent:
+                return
+            merged = {**slots, **normalize_slots(fields["extracted_slots"])}
+            if any(not merged.get(slot) for slot in card.required_slots):
+                return
+            self._start(session_id, intent, card.id, merged, call)
+
+        return on_fields
+
+    def _start(self, session_id: str, intent: str, agent_id: str, slots: dict[str, str], call: AgentCall) -> None:
+        task = asyncio.get_running_loop().create_task(call(intent, slots))
+        speculation = _Speculation(intent, agent_id, slots, task, time.perf_counter())
+        task.add_done_callback(lambda _: setattr(speculation, "finished", time.perf_counter()))
+        self._running[session_id] = speculation
+        self.counters["started"] += 1
+        logger.debug(f"[{session_id}] dispatch especulativo: {intent} {slots}")
+
+    def settle(self, session_id: Optional[str], route: str, intent: Optional[str], slots: dict[str, str]) -> None:
+        """Classificação final: mantém a chamada se a rota bate, senão cancela."""
+        speculation = self._running.get(session_id) if session_id else None
+        if speculation is None:
+            return
+        if route != "dispatch" or speculation.intent != intent or speculation.slots != slots:
+            self.discard(session_id)
+
+    def take(self, session_id: Optional[str], intent: Optional[str], slots: dict[str, str]) -> Optional[asyncio.Task]:
+        """Chamada já em andamento para este dispatch, ou None (o nó chama o agente)."""
+        speculation = self._running.pop(session_id, None) if session_id else None
+        if speculation is None:
+            return None
+        if speculation.intent != intent or speculation.slots != slots:
+            self._cancel(speculation)
+            return None
+        # Latência sobreposta à classificação: do início até agora (ou até o fim, se já terminou)
+        saved = (speculation.finished or time.perf_counter()) - speculation.started
+        SPECULATIVE_DISPATCHES.inc(agent_id=speculation.agent_id, outcome="hit")
+        SPECULATIVE_SECONDS_SAVED.inc(saved)
+        self.counters["hit"] += 1
+        self.counters["seconds_saved"] += saved
+        return speculation.task
+
+    def discard(self, session_id: str) -> None:
+        speculation = self._running.pop(session_id, None)
+        if speculation is not None:
+            self._cancel(speculation)
+
+    def _cancel(self, speculation: _Speculation) -> None:
+        speculation.task.cancel()
+        SPECULATIVE_DISPATCHES.inc(agent_id=speculation.agent_id, outcome="cancelled")
+        self.counters["cancelled"] += 1
+        logger.debug(f"Dispatch especulativo cancelado: {speculation.intent} {speculation.slots}")
+
+    def stats(self) -> dict:
+        settled = self.counters["hit"] + self.counters["cancelled"]
+        return {
+            "enabled": self.enabled,
+            "running": len(self._running),
+            **self.counters,
+            "hit_rate": self.counters["hit"] / settled if settled else 0.0,
+        }
+
+
+speculative_dispatcher = SpeculativeDispatcher()
@@ -0,0 +1,280 @@
+"""
+Saída estruturada do classificador — response_format nativo + parser tolerante.
+
+Três camadas, da mais barata para a mais cara:
+
+1. `classifier_response_format`: pede ao provider saída estruturada nativa
+   (CLASSIFIER_RESPONSE_FORMAT=json_schema, com o schema de `Classification`,
+   ou json_object = JSON mode). O modelo praticamente não erra o formato.
+2. `parse_json_reply`: se mesmo assim o JSON vier quebrado (cerca de
+   markdown, texto depois do objeto, vírgula sobrando, resposta cortada por
+   max_tokens), o parser repara localmente, sem nova chamada.
+3. `JSONFieldStream`: durante o streaming, extrai os campos de primeiro
+   nível assim que cada um fecha — `mode` e `intent` chegam nos primeiros
+   tokens, bem antes do fim do JSON (o roteamento pode começar ali).
+
+`coerce_classification` valida o dict (mode conhecido, tipos dos campos)
+antes de ele chegar ao nó: um slot numérico vira string em vez de derrubar
+o turno com ValidationError.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from typing import Any, Optional
+
+from app.config import CLASSIFIER_RESPONSE_FORMAT
+from app.schemas import Classification, RouteMode
+
+ROUTE_FIELDS = ("mode", "intent")
+
+
+# ── response_format ───────────────────────────────────────────────────
+
+@lru_cache(maxsize=2)
+def classification_schema(fused: bool = False) -> dict:
+    """JSON schema de `Classification` (+ campo `reply` no modo fundido)."""
+    schema = Classification.model_json_schema()
+    if fused:
+        schema["properties"]["reply"] = {"anyOf": [{"type": "string"}, {"type": "null"}]}
+    return schema
+
+
+def classifier_response_format(fused: bool = False, batch: bool = False) -> Optional[dict]:
+    """
+    response_format da chamada de classificação, ou None (só o prompt).
+
+    Não usa strict: `extracted_slots` é um objeto de chaves livres, que o modo
+    strict não aceita. O lote usa JSON mode ({"results": [...]} não é uma
+    Classification).
+    """
+    if CLASSIFIER_RESPONSE_FORMAT == "off":
+        return None
+    if CLASSIFIER_RESPONSE_FORMAT == "json_object" or batch:
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "classification", "schema": classification_schema(fused), "strict": False},
+    }
+
+
+# ── Parse tolerante ───────────────────────────────────────────────────
+
+def _strip_fences(content: str) -> str:
+    raw = content.strip()
+    if raw.startswith("```"):
+        raw = raw.split("\n", 1)[1] if "\n" in raw else raw[3:]
+    if raw.endswith("```"):
+        raw = raw[:-3]
+    return raw.strip()
+
+
+def _repair(text: str) -> tuple[Optional[Any], bool]:
+    """
+    Reconstrói o primeiro objeto JSON do texto: descarta o que vem antes e
+    depois dele, remove vírgulas sobrando e fecha strings/chaves abertas. Se
+    a resposta foi cortada no meio de um campo, volta até o último campo
+    completo. Devolve o objeto e se ele estava cortado (fechado pelo reparo).
+    """
+    start = text.find("{")
+    if start < 0:
+        return None, False
+    out: list[str] = []
+    stack: list[str] = []
+    # Pontos de corte seguros: (tamanho de out, fechamentos pendentes)
+    safe: list[tuple[int, list[str]]] = []
+    in_string = escape = complete = False
+
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+            safe.append((len(out), list(stack)))
+            continue
+        elif ch in "}]":
+            while out and out[-1] in " \t\r\n,":
+                out.pop()
+            out.append(stack.pop())
+            if not stack:
+                complete = True
+                break
+            continue
+        elif ch == ",":
+            safe.append((len(out), list(stack)))
+        out.append(ch)
+
+    candidates = ["".join(out)]
+    if not complete:
+        tail = '"' if in_string else ""
+        candidates = ["".join(out) + tail + "".join(reversed(stack))]
+        for length, pending in reversed(safe):
+            prefix = "".join(out[:length]).rstrip(" \t\r\n,")
+            candidates.append(prefix + "".join(reversed(pending)))
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate), not complete
+        except json.JSONDecodeError:
+            continue
+    return None, False
+
+
+def parse_json_reply(content: str) -> tuple[Optional[Any], str]:
+    """
+    JSON da resposta da LLM e o resultado do parse: "ok" (JSON válido, com ou
+    sem cerca de markdown), "repaired" (objeto completo consertado localmente:
+    texto em volta, vírgula sobrando), "truncated" (objeto cortado, fechado
+    pelo reparo) ou "invalid".
+    """
+    raw = _strip_fences(content)
+    try:
+        return json.loads(raw), "ok"
+    except json.JSONDecodeError:
+        pass
+    data, truncated = _repair(raw)
+    if data is None:
+        return None, "invalid"
+    return data, "truncated" if truncated else "repaired"
+
+
+# ── Validação ─────────────────────────────────────────────────────────
+
+_MODES = {mode.value for mode in RouteMode}
+# Fora do small_talk, resposta que o reparo local cortou (max_tokens) antes
+# dos slots despacharia o agente sem os dados: é tratada como inválida.
+# Em JSON completo esses campos são opcionais (defaults do schema).
+_ROUTED_FIELDS = ("intent", "extracted_slots", "missing_slots")
+
+
+def _optional_str(value: Any) -> Optional[str]:
+    return (value.strip() or None) if isinstance(value, str) else None
+
+
+def _str_list(value: Any) -> list[str]:
+    return [str(item) for item in value if item is not None] if isinstance(value, list) else []
+
+
+def normalize_slots(slots: Any) -> dict[str, str]:
+    """Slots como strings, sem valores vazios; {} se não for objeto."""
+    if not isinstance(slots, dict):
+        return {}
+    return {str(k): str(v) for k, v in slots.items() if v is not None and str(v).strip()}
+
+
+def coerce_classification(data: Any, truncated: bool = False) -> Optional[dict]:
+    """
+    Dict de classificação com tipos normalizados e defaults do schema nos
+    campos ausentes, ou None se não dá para usar (não é objeto, `mode`
+    desconhecido, ou — com `truncated`, JSON fechado pelo reparo local — mode
+    com intent sem os campos de slots). Campos extras (`reply`, `intents`)
+    passam adiante; os grupos de `intents` são validados no nó.
+    """
+    if not isinstance(data, dict) or data.get("mode") not in _MODES:
+        return None
+    if truncated and data["mode"] != RouteMode.small_talk.value and any(f not in data for f in _ROUTED_FIELDS):
+        return None
+    try:
+        confidence = min(max(float(data.get("confidence", 0.5)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        confidence = 0.5
+    return {
+        **data,
+        "intent": _optional_str(data.get("intent")),
+        "confidence": confidence,
+        "missing_slots": _str_list(data.get("missing_slots")),
+        "question_to_ask": _optional_str(data.get("question_to_ask")),
+        "candidate_agents": _str_list(data.get("candidate_agents")),
+        "extracted_slots": normalize_slots(data.get("extracted_slots")),
+    }
+
+
+# ── Streaming ─────────────────────────────────────────────────────────
+
+class JSONFieldStream:
+    """
+    Campos de primeiro nível de um objeto JSON recebido aos pedaços.
+
+    `feed(chunk)` devolve os campos que acabaram de fechar naquele pedaço
+    (strings, números, literais e também objetos/listas completos). Cada
+    caractere é visto uma vez; só o valor fechado passa por `json.loads`.
+    """
+
+    def __init__(self):
+        self.fields: dict[str, Any] = {}
+        self._buffer = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._key: Optional[str] = None        # chave lida, aguardando ":"
+        self._value_key: Optional[str] = None  # chave cujo valor está sendo lido
+        self._value_start = 0
+
+    def _close_value(self, end: int, found: dict[str, Any]) -> None:
+        key, self._value_key = self._value_key, None
+        raw = self._buffer[self._value_start:end].strip()
+        if key is None or not raw:
+            return
+        try:
+            found[key] = self.fields[key] = json.loads(raw)
+        except json.JSONDecodeError:
+            pass
+
+    def feed(self, chunk: str) -> dict[str, Any]:
+        found: dict[str, Any] = {}
+        offset = len(self._buffer)
+        self._buffer += chunk
+        for i in range(offset, len(self._buffer)):
+            ch = self._buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._value_key is not None:
+                            self._close_value(i + 1, found)
+                        else:
+                            self._key = json.loads(self._buffer[self._string_start:i + 1])
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and self._value_key is not None:
+                    self._value_start = i
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and self._value_key is not None:
+                    self._value_start = i
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_key is not None:
+                    self._close_value(i + 1, found)
+                elif self._depth == 0 and self._value_key is not None:
+                    self._close_value(i, found)
+            elif self._depth == 1 and ch == ":":
+                self._value_key, self._key = self._key, None
+                self._value_start = i + 1
+            elif self._depth == 1 and ch == "," and self._value_key is not None:
+                self._close_value(i, found)
+        return found
+
+    def route(self) -> Optional[dict[str, Any]]:
+        """{"mode", "intent"} assim que os dois fecharam; None antes disso."""
+        if all(field in self.fields for field in ROUTE_FIELDS):
+            return {field: self.fields[field] for field in ROUTE_FIELDS}
+        return None
@@ -0,0 +1,29 @@
+"""
+Normalização de texto compartilhada (fast path, caches).
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas e espaços colapsados — acentos e pontuação ficam."""
+    return _WHITESPACE.sub(" ", text.casefold()).strip()
+
+
+def normalize_text(text: str, keep_punctuation: bool = False) -> str:
+    """Minúsculas, sem acentos, espaços colapsados (e sem pontuação, por padrão)."""
+    text = strip_accents(text.lower())
+    if not keep_punctuation:
+        text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
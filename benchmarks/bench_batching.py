@@ -0,0 +1,116 @@
+"""
+Benchmark: micro-batching de classificação entre sessões.
+
+Dispara R classificações de sessões diferentes com concorrência C contra a
+LLM fake e compara o modo sem lote com lotes em várias janelas/tamanhos.
+A LLM fake imita um provider com limite de chamadas simultâneas
+(`--provider-concurrency`), custo de prefill por token de entrada e de
+decode por token de saída — o lote economiza chamadas e prefill do system
+prompt, mas a resposta fica N vezes maior.
+
+Cada mensagem tem classificação roteirizada própria (cidade única), então
+o benchmark também confere se cada resultado voltou para o turno certo.
+
+Uso: python -m benchmarks.bench_batching [--requests 1000] [--concurrency 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.classification_batcher import classification_batcher
+from app.classification_cache import classification_cache
+from app.config import LLM_ROLES, set_llm
+from app.metrics import llm_usage
+from app.nodes.classification import classification_node
+from app.schemas import GraphState
+from app.text import normalize_text
+from benchmarks.bench_hedging import _percentile
+from benchmarks.fake_llm import DEFAULT_CLASSIFICATION, FakeChatModel
+
+# (janela ms, tamanho máximo); None = sem lote
+VARIANTS = [None, (5, 8), (10, 16), (20, 32)]
+
+
+def _message(i: int) -> str:
+    return f"como está o clima na cidade {i}"
+
+
+def _script(requests: int) -> dict[str, dict]:
+    return {
+        normalize_text(_message(i)): {
+            **DEFAULT_CLASSIFICATION,
+            "mode": "dispatch",
+            "intent": "clima",
+            "extracted_slots": {"cidade": f"cidade {i}"},
+        }
+        for i in range(requests)
+    }
+
+
+async def _run(requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    misrouted = 0
+
+    async def one(i: int) -> None:
+        nonlocal misrouted
+        state = GraphState(user_input=_message(i), messages=[{"role": "user", "content": _message(i)}])
+        async with semaphore:
+            start = time.perf_counter()
+            result = await classification_node(state)
+            latencies.append(time.perf_counter() - start)
+        misrouted += result["classification"].extracted_slots.get("cidade") != f"cidade {i}"
+
+    calls_before = llm_usage["classifier"]["calls"]
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    calls = llm_usage["classifier"]["calls"] - calls_before
+    return {"latencies": latencies, "elapsed": elapsed, "calls": calls, "misrouted": misrouted}
+
+
+async def main(args: argparse.Namespace) -> None:
+    fake = FakeChatModel(
+        latency=args.llm_latency,
+        prefill_latency=args.prefill_ms_per_1k / 1000,
+        decode_latency=args.decode_ms_per_1k / 1000,
+        max_concurrency=args.provider_concurrency,
+        script=_script(args.requests),
+    )
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+    classification_cache.enabled = False
+
+    print(
+        f"{args.requests} classificações, concorrência {args.concurrency}; LLM fake: "
+        f"{args.llm_latency * 1000:.0f} ms + {args.prefill_ms_per_1k:.0f} ms/1k tokens de entrada + "
+        f"{args.decode_ms_per_1k:.0f} ms/1k tokens de saída, {args.provider_concurrency} chamadas simultâneas\n"
+    )
+    print(f"{'variante':<22} {'class/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'chamadas':>9} {'lote médio':>10} {'erros':>6}")
+
+    for variant in VARIANTS:
+        classification_batcher.enabled = variant is not None
+        if variant is not None:
+            classification_batcher.window_ms, classification_batcher.max_size = variant
+        result = await _run(args.requests, args.concurrency)
+        name = "sem lote" if variant is None else f"janela {variant[0]} ms, máx {variant[1]}"
+        latencies = result["latencies"]
+        print(
+            f"{name:<22} {args.requests / result['elapsed']:>8.0f} "
+            f"{_percentile(latencies, 0.50) * 1000:>8.0f} {_percentile(latencies, 0.95) * 1000:>8.0f} "
+            f"{result['calls']:>9.0f} {args.requests / result['calls']:>10.1f} {result['misrouted']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching de classificação com LLM fake")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200, help="Turnos classificando ao mesmo tempo")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Latência base por chamada (s)")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=30.0)
+    parser.add_argument("--decode-ms-per-1k", type=float, default=1000.0)
+    parser.add_argument("--provider-concurrency", type=int, default=16, help="Chamadas simultâneas aceitas pelo provider")
+    asyncio.run(main(parser.parse_args()))
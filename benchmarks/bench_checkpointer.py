@@ -0,0 +1,98 @@
+"""
+Benchmark: estado da sessão pelo checkpointer vs. carga/commit manual.
+
+Compara, por turno e por backend de sessão (memory, sqlite), os dois jeitos
+de rodar o grafo com o estado da sessão:
+
+  manual        store.get → input com todos os campos da sessão → grafo sem
+                checkpointer → commit_turn do delta (como o server fazia)
+  checkpointer  só a entrada nova + thread_id; o SessionCheckpointer carrega
+                e persiste (app/checkpoint.py), durability="exit"
+
+LLM fake com latência zero: o tempo medido é só orquestração. Cada sessão
+começa com `--sizes` mensagens no histórico.
+
+Uso: python -m benchmarks.bench_checkpointer [--sizes 10,100,1000] [--turns 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from app.checkpoint import TURN_DURABILITY, SessionCheckpointer, thread_config, turn_input
+from app.config import LLM_ROLES, set_llm
+from app.graph import build_graph
+from app.schemas import GraphState
+from app.session import InMemorySessionStore, SessionManager, SQLiteSessionStore
+from benchmarks.bench_turn_overhead import _history
+from benchmarks.fake_llm import FakeChatModel
+
+
+async def _manual_turn(graph, manager: SessionManager, session_id: str) -> None:
+    state = manager.store.get(session_id)
+    result = await graph.ainvoke({
+        "session_id": session_id,
+        "messages": state.messages,
+        "history_offset": state.history_offset,
+        "history_loaded": state.history_loaded,
+        "history_summary": state.history_summary,
+        "jobs": state.jobs,
+        "slots": state.slots,
+        "current_intent": state.current_intent,
+        "user_input": "oi",
+    })
+    manager.commit_turn(GraphState.model_construct(**result))
+
+
+async def _checkpointer_turn(graph, manager: SessionManager, session_id: str) -> None:
+    await graph.ainvoke(turn_input(session_id, "oi"), thread_config(session_id), durability=TURN_DURABILITY)
+
+
+async def _measure(turn, graph, manager: SessionManager, session_id: str, size: int, turns: int) -> list[float]:
+    manager.save(GraphState(session_id=session_id, messages=_history(size)))
+    for _ in range(5):  # aquecimento
+        await turn(graph, manager, session_id)
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        await turn(graph, manager, session_id)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(sizes: list[int], turns: int) -> None:
+    for role in LLM_ROLES:
+        set_llm(role, FakeChatModel(latency=0))
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": InMemorySessionStore(),
+            "sqlite": SQLiteSessionStore(os.path.join(tmp, "sessions.db")),
+        }
+        print(f"{'backend':<8} {'histórico':>10} {'manual p50':>11} {'ckpt p50':>9} {'manual p95':>11} {'ckpt p95':>9}  (ms)")
+        for name, store in backends.items():
+            manager = SessionManager(store)
+            plain, checkpointed = build_graph(), build_graph(checkpointer=SessionCheckpointer(manager))
+            for size in sizes:
+                manual = await _measure(_manual_turn, plain, manager, f"manual-{name}-{size}", size, turns)
+                ckpt = await _measure(_checkpointer_turn, checkpointed, manager, f"ckpt-{name}-{size}", size, turns)
+                await manager.summarizer.drain()
+                p50 = [statistics.median(s) * 1000 for s in (manual, ckpt)]
+                p95 = [statistics.quantiles(s, n=20)[-1] * 1000 for s in (manual, ckpt)]
+                print(f"{name:<8} {size:>10} {p50[0]:>11.2f} {p50[1]:>9.2f} {p95[0]:>11.2f} {p95[1]:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checkpointer vs. carga/commit manual da sessão")
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main([int(x) for x in args.sizes.split(",")], args.turns))
@@ -0,0 +1,97 @@
+"""
+Benchmark: circuit breaker por agente com falhas injetadas no mock.
+
+Roda o mock_agents_api em processo (ASGITransport) com um agente "fora do
+ar" — lento e respondendo 503 — e compara o AgentsClient com e sem
+circuit breaker: latência por chamada e quantas chamadas chegaram à rede.
+Depois remove a falha, espera o circuito passar a half-open e mostra a
+recuperação.
+
+Uso: python -m benchmarks.bench_circuit_breaker [--requests 200] [--fault-delay-ms 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import mock_agents_api
+from app.agents_client import AgentsClient
+from app.config import AGENT_REGISTRY
+from app.resilience import BulkheadFullError, CircuitOpenError
+from benchmarks.bench_hedging import _percentile
+
+INTENT = "lembrete"
+SLOTS = {"descricao": "comprar pão", "horario": "18:00"}
+
+
+async def _run(client: AgentsClient, card, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    outcomes = {"ok": 0, "http_error": 0, "rejected": 0}
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await client.execute(card, INTENT, SLOTS)
+                outcomes["ok"] += 1
+            except (CircuitOpenError, BulkheadFullError):
+                outcomes["rejected"] += 1
+            except httpx.HTTPError:
+                outcomes["http_error"] += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return {"latencies": latencies, **outcomes}
+
+
+def _print_row(name: str, result: dict) -> None:
+    latencies = result["latencies"]
+    print(
+        f"{name:<16} {_percentile(latencies, 0.50) * 1000:>8.1f} {_percentile(latencies, 0.95) * 1000:>8.1f} "
+        f"{sum(latencies) / len(latencies) * 1000:>8.1f} {result['http_error'] + result['ok']:>6} "
+        f"{result['rejected']:>9}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    card = AGENT_REGISTRY[INTENT]
+    mock_agents_api.FAULTS[card.id] = mock_agents_api.FaultConfig(
+        error_rate=1.0, status_code=503, delay_ms=args.fault_delay_ms,
+    )
+    print(
+        f"Agente {card.id}: 503 após {args.fault_delay_ms:.0f} ms em 100% das chamadas, "
+        f"{args.requests} requisições, concorrência {args.concurrency}\n"
+    )
+    print(f"{'variante':<16} {'p50 ms':>8} {'p95 ms':>8} {'média':>8} {'rede':>6} {'rejeitadas':>9}")
+
+    transport = httpx.ASGITransport(app=mock_agents_api.app)
+    for name, enabled in (("sem breaker", False), ("com breaker", True)):
+        client = AgentsClient(transport=transport, breakers_enabled=enabled)
+        client.breaker(card).open_seconds = args.open_seconds
+        result = await _run(client, card, args.requests, args.concurrency)
+        _print_row(name, result)
+        if enabled:
+            print(f"\nEstado após a falha: {client.breaker(card).snapshot()}")
+
+            # Recuperação: agente volta, circuito passa a half-open e a tentativa de teste fecha.
+            # Em série: com concorrência, quem chega durante a tentativa de teste é rejeitado
+            mock_agents_api.FAULTS.pop(card.id, None)
+            await asyncio.sleep(args.open_seconds)
+            recovery = await _run(client, card, args.requests, concurrency=1)
+            print(f"Após {args.open_seconds:.1f} s com o agente de volta: {recovery['ok']} ok, "
+                  f"{recovery['rejected']} rejeitadas → {client.breaker(card).state}")
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Circuit breaker com falhas injetadas no mock")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--fault-delay-ms", type=float, default=1000.0)
+    parser.add_argument("--open-seconds", type=float, default=1.0, help="Tempo com o circuito aberto")
+    asyncio.run(main(parser.parse_args()))
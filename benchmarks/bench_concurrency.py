@@ -0,0 +1,63 @@
+"""
+Benchmark: throughput de sessões concorrentes no /chat com LLM fake.
+
+Cada turno faz 2 chamadas LLM (classification + synthesis) com latência
+fixa. A mensagem é diferente em cada turno: um "oi" cairia no fast path e
+uma repetida no cache de classificação, com uma chamada só. Com o grafo
+assíncrono, N sessões concorrentes devem completar em ~2×latência, e não
+N×2×latência.
+
+Uso: python -m benchmarks.bench_concurrency [--latency 0.2] [--levels 1,10,50,100]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.fake_llm import FakeChatModel
+
+
+def _install_fake_llm(latency: float) -> None:
+    from app.config import LLM_ROLES, set_llm
+
+    fake = FakeChatModel(latency=latency)
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+
+
+async def _run_level(client: httpx.AsyncClient, concurrency: int) -> tuple[float, float]:
+    async def one_turn(i: int) -> None:
+        message = f"me conta uma curiosidade sobre o número {concurrency}-{i}"
+        resp = await client.post("/chat", json={"session_id": f"bench-{concurrency}-{i}", "message": message})
+        resp.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_turn(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return elapsed, concurrency / elapsed
+
+
+async def main(latency: float, levels: list[int]) -> None:
+    _install_fake_llm(latency)
+    from app.server import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"LLM fake: {latency * 1000:.0f} ms/chamada, 2 chamadas/turno\n")
+        print(f"{'sessões':>8} {'tempo (s)':>10} {'turnos/s':>10}")
+        for concurrency in levels:
+            elapsed, throughput = await _run_level(client, concurrency)
+            print(f"{concurrency:>8} {elapsed:>10.3f} {throughput:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de concorrência do /chat")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latência por chamada LLM (s)")
+    parser.add_argument("--levels", default="1,10,50,100", help="Níveis de concorrência")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.latency, [int(x) for x in args.levels.split(",")]))
@@ -0,0 +1,97 @@
+"""
+Benchmark: fast path determinístico de classificação.
+
+Reproduz conversas (JSONL) pelo grafo com LLM fake roteirizada pelo campo
+`expected` de cada turno e mede:
+  - % de turnos servidos pelo fast path (sem chamada LLM de classificação)
+  - concordância do fast path com o gabarito (mode, intent, slots)
+  - latência média por turno com e sem fast path
+
+Uso: python -m benchmarks.bench_fast_path [--file conversas.jsonl] [--llm-latency 0.4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+import mock_agents_api
+from app.agents_client import agents_client
+from app.checkpoint import TURN_DURABILITY, thread_config, turn_input
+from app.config import LLM_ROLES, set_llm
+from app.fast_path import fast_path_stats
+from app.schemas import GraphState
+from app.text import normalize_text
+from benchmarks.conversations import DEFAULT_CONVERSATIONS, load_conversations
+from benchmarks.fake_llm import FakeChatModel
+
+
+def _agrees(classification, expected: dict) -> bool:
+    if classification.mode.value != expected["mode"] or classification.intent != expected["intent"]:
+        return False
+    got = {k: normalize_text(v) for k, v in classification.extracted_slots.items()}
+    want = {k: normalize_text(v) for k, v in expected["extracted_slots"].items()}
+    return got == want
+
+
+async def main(args: argparse.Namespace) -> None:
+    fake = FakeChatModel(latency=args.llm_latency)
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+    agents_client.set_transport(httpx.ASGITransport(app=mock_agents_api.app))
+
+    from app.graph import orchestrator_graph
+
+    fast_latencies: list[float] = []
+    llm_latencies: list[float] = []
+    disagreements: list[str] = []
+
+    for conversation in load_conversations(args.file):
+        session_id = str(uuid.uuid4())
+        for turn in conversation["turns"]:
+            fake.classification = turn["expected"]
+            fast_before = fast_path_stats["small_talk"] + fast_path_stats["slot_fill"]
+
+            start = time.perf_counter()
+            result = await orchestrator_graph.ainvoke(
+                turn_input(session_id, turn["user"]), thread_config(session_id), durability=TURN_DURABILITY,
+            )
+            elapsed = time.perf_counter() - start
+            after = GraphState.model_construct(**result)
+
+            if fast_path_stats["small_talk"] + fast_path_stats["slot_fill"] > fast_before:
+                fast_latencies.append(elapsed)
+                if not _agrees(after.classification, turn["expected"]):
+                    disagreements.append(f"{conversation['id']}: {turn['user']!r}")
+            else:
+                llm_latencies.append(elapsed)
+
+    await agents_client.aclose()
+
+    total = len(fast_latencies) + len(llm_latencies)
+    fast = len(fast_latencies)
+    print(f"Turnos: {total}  |  LLM fake: {args.llm_latency * 1000:.0f} ms/chamada\n")
+    print(f"Fast path:        {fast}/{total} ({fast / total:.0%})")
+    print(f"  small_talk:     {fast_path_stats['small_talk']}")
+    print(f"  slot_fill:      {fast_path_stats['slot_fill']}")
+    print(f"  concordância:   {fast - len(disagreements)}/{fast}")
+    if fast_latencies:
+        print(f"Latência média fast path:   {statistics.mean(fast_latencies) * 1000:.0f} ms")
+    if llm_latencies:
+        print(f"Latência média via LLM:     {statistics.mean(llm_latencies) * 1000:.0f} ms")
+    print(f"Latência economizada:       {fast * args.llm_latency:.2f} s no total")
+    for item in disagreements:
+        print(f"  ✗ {item}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay do fast path de classificação")
+    parser.add_argument("--file", type=Path, default=DEFAULT_CONVERSATIONS)
+    parser.add_argument("--llm-latency", type=float, default=0.4)
+    asyncio.run(main(parser.parse_args()))
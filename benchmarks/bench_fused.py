@@ -0,0 +1,139 @@
+"""
+Benchmark A/B: pipeline padrão (classificação + synthesis) vs. modo fundido.
+
+Reproduz as mesmas conversas duas vezes pelo grafo, com LLM fake
+roteirizada por mensagem, alternando FUSED_MODE_ENABLED. Para cada braço:
+latência por turno (média/p50/p95), chamadas LLM, tokens e custo estimado
+por turno. Cache de classificação é limpo entre os braços.
+
+A LLM fake tem a mesma latência para as duas chamadas; numa LLM real a
+chamada fundida gera mais tokens de saída que a classificação pura, então
+o ganho real é um pouco menor que o medido aqui.
+
+Uso: python -m benchmarks.bench_fused [--file conversas.jsonl] [--synthetic 50] [--llm-latency 0.3] [--no-fast-path]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+import app.fast_path
+import app.nodes.classification as classification_module
+import mock_agents_api
+from app.agents_client import agents_client
+from app.checkpoint import TURN_DURABILITY, thread_config, turn_input
+from app.classification_cache import classification_cache
+from app.config import LLM_ROLES, set_llm
+from app.metrics import FUSED_REPLIES, estimate_cost, llm_usage
+from app.text import normalize_text
+from benchmarks.conversations import DEFAULT_CONVERSATIONS, load_conversations, synthetic_conversations
+from benchmarks.fake_llm import FakeChatModel
+
+
+def _usage_snapshot() -> dict[str, dict[str, int]]:
+    return {role: dict(counters) for role, counters in llm_usage.items()}
+
+
+def _usage_delta(before: dict, after: dict) -> dict[str, dict[str, int]]:
+    return {
+        role: {k: v - before.get(role, {}).get(k, 0) for k, v in counters.items()}
+        for role, counters in after.items()
+    }
+
+
+async def run_arm(conversations: list[dict], fused: bool, args: argparse.Namespace) -> dict:
+    from app.graph import orchestrator_graph
+
+    script = {normalize_text(t["user"]): t["expected"] for c in conversations for t in c["turns"]}
+    fake = FakeChatModel(latency=args.llm_latency, script=script, seen_prefixes=set())
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+    classification_module.FUSED_MODE_ENABLED = fused
+    classification_cache.clear()
+
+    latencies: list[float] = []
+    before = _usage_snapshot()
+    used_before = FUSED_REPLIES.value(outcome="used")
+
+    for conversation in conversations:
+        session_id = str(uuid.uuid4())
+        for turn in conversation["turns"]:
+            start = time.perf_counter()
+            await orchestrator_graph.ainvoke(
+                turn_input(session_id, turn["user"]), thread_config(session_id), durability=TURN_DURABILITY,
+            )
+            latencies.append(time.perf_counter() - start)
+
+    usage = _usage_delta(before, _usage_snapshot())
+    turns = len(latencies)
+    cost = sum(
+        estimate_cost(
+            LLM_ROLES[role]["model"],
+            counters.get("input_tokens", 0),
+            counters.get("cached_input_tokens", 0),
+            counters.get("output_tokens", 0),
+        )
+        for role, counters in usage.items()
+    )
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "turns": turns,
+        "mean": statistics.mean(latencies),
+        "p50": cuts[49],
+        "p95": cuts[94],
+        "llm_calls": sum(c.get("calls", 0) for c in usage.values()) / turns,
+        "input_tokens": sum(c.get("input_tokens", 0) for c in usage.values()) / turns,
+        "output_tokens": sum(c.get("output_tokens", 0) for c in usage.values()) / turns,
+        "cost": cost / turns,
+        "fused_used": FUSED_REPLIES.value(outcome="used") - used_before,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    conversations = load_conversations(args.file)
+    if args.synthetic:
+        conversations += synthetic_conversations(args.synthetic, seed=args.seed)
+
+    app.fast_path.FAST_PATH_ENABLED = not args.no_fast_path
+    agents_client.set_transport(httpx.ASGITransport(app=mock_agents_api.app))
+    logging.disable(logging.INFO)
+    try:
+        baseline = await run_arm(conversations, fused=False, args=args)
+        fused = await run_arm(conversations, fused=True, args=args)
+    finally:
+        await agents_client.aclose()
+
+    print(f"Turnos por braço: {baseline['turns']}  |  LLM fake: {args.llm_latency * 1000:.0f} ms/chamada\n")
+    rows = [
+        ("latência média (ms)", "mean", 1000, ".0f"),
+        ("latência p50 (ms)", "p50", 1000, ".0f"),
+        ("latência p95 (ms)", "p95", 1000, ".0f"),
+        ("chamadas LLM/turno", "llm_calls", 1, ".2f"),
+        ("tokens entrada/turno", "input_tokens", 1, ".0f"),
+        ("tokens saída/turno", "output_tokens", 1, ".0f"),
+        ("custo/1k turnos (USD)", "cost", 1000, ".4f"),
+    ]
+    print(f"{'':<24} {'padrão':>10} {'fundido':>10} {'Δ':>8}")
+    for label, key, scale, fmt in rows:
+        a, b = baseline[key] * scale, fused[key] * scale
+        delta = f"{(b - a) / a:+.0%}" if a else "—"
+        print(f"{label:<24} {a:>10{fmt}} {b:>10{fmt}} {delta:>8}")
+    print(f"\nTurnos respondidos direto pela classificação: {fused['fused_used']:.0f}/{fused['turns']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="A/B do modo fundido (1 chamada LLM em small_talk/clarify)")
+    parser.add_argument("--file", type=Path, default=DEFAULT_CONVERSATIONS)
+    parser.add_argument("--synthetic", type=int, default=0, help="Conversas sintéticas adicionais")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--no-fast-path", action="store_true", help="Desliga o fast path (toda classificação via LLM)")
+    asyncio.run(main(parser.parse_args()))
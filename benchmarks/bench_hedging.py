@@ -0,0 +1,78 @@
+"""
+Benchmark: hedging de requisições na API de agentes.
+
+Roda o mock_agents_api em processo (ASGITransport) com latência de cauda
+injetada e compara p50/p95/p99 do AgentsClient com e sem hedging.
+
+Uso: python -m benchmarks.bench_hedging [--requests 500] [--tail-prob 0.05]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import mock_agents_api
+from app.agents_client import AgentsClient
+from app.config import AGENT_REGISTRY
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _run(card, requests: int, concurrency: int) -> tuple[list[float], AgentsClient]:
+    client = AgentsClient(transport=httpx.ASGITransport(app=mock_agents_api.app))
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await client.execute(card, "clima", {"cidade": "Curitiba"})
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    await client.aclose()
+    return latencies, client
+
+
+async def main(args: argparse.Namespace) -> None:
+    mock_agents_api.LATENCY = mock_agents_api.LatencyConfig(
+        base_ms=args.base_ms, tail_ms=args.tail_ms, tail_prob=args.tail_prob,
+    )
+    base_card = AGENT_REGISTRY["clima"]
+    variants = {
+        "sem hedging": base_card.model_copy(update={"hedge_after": None}),
+        "com hedging": base_card.model_copy(update={"hedge_after": args.hedge_after}),
+    }
+
+    print(
+        f"Mock: base={args.base_ms:.0f} ms, cauda=+{args.tail_ms:.0f} ms "
+        f"com p={args.tail_prob:.2f}, {args.requests} requisições\n"
+    )
+    print(f"{'variante':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'média':>8} {'hedges':>7} {'vitórias':>9}")
+    for name, card in variants.items():
+        latencies, client = await _run(card, args.requests, args.concurrency)
+        stats = client.stats[card.id]
+        print(
+            f"{name:<12} {_percentile(latencies, 0.50) * 1000:>8.1f} "
+            f"{_percentile(latencies, 0.95) * 1000:>8.1f} {_percentile(latencies, 0.99) * 1000:>8.1f} "
+            f"{statistics.mean(latencies) * 1000:>8.1f} {stats['hedges']:>7} {stats['hedge_wins']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de hedging da API de agentes")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--base-ms", type=float, default=20)
+    parser.add_argument("--tail-ms", type=float, default=500)
+    parser.add_argument("--tail-prob", type=float, default=0.02)
+    parser.add_argument("--hedge-after", type=float, default=0.05, help="Limiar inicial do hedge (s)")
+    asyncio.run(main(parser.parse_args()))
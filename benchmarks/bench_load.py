@@ -0,0 +1,247 @@
+"""
+Benchmark de carga offline: replay de conversas contra o app FastAPI.
+
+Sem custo de API: LLM fake roteirizada por mensagem (o `expected` de cada
+turno vira a classificação devolvida), com latência + jitter configuráveis,
+e mock_agents_api.py como backend de agentes (in-process, via ASGI).
+
+Conversas vêm de um JSONL (formato de benchmarks/conversations.py) e/ou
+são geradas sinteticamente. Cada conversa roda em sua própria sessão, com
+turnos em sequência; `--concurrency` conversas rodam em paralelo.
+
+Relatório:
+  - p50/p95/p99 por endpoint (/chat, /chat/stream) e por nó do grafo
+  - p50/p95/p99 por agente (latência HTTP)
+  - turnos/s e erros
+  - memória por sessão (estimativa do SessionStore e delta de RSS)
+
+Com `--max-p95-ms` o processo sai com código 1 se algum endpoint passar
+do limite — serve de gate de regressão no CI.
+
+Uso:
+  python -m benchmarks.bench_load --synthetic 500 --concurrency 50
+  python -m benchmarks.bench_load --file conversas.jsonl --endpoint mix --json resultado.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+import mock_agents_api
+from app.agents_client import agents_client
+from app.config import LLM_ROLES, set_llm
+from app.metrics import AGENT_DURATION, NODE_DURATION
+from app.text import normalize_text
+from benchmarks.conversations import DEFAULT_CONVERSATIONS, load_conversations, synthetic_conversations
+from benchmarks.fake_llm import FakeChatModel
+
+ENDPOINTS = {"chat": "/chat", "stream": "/chat/stream"}
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _build_script(conversations: list[dict]) -> dict[str, dict]:
+    return {normalize_text(t["user"]): t["expected"] for c in conversations for t in c["turns"]}
+
+
+async def _send_turn(client: httpx.AsyncClient, endpoint: str, session_id: str, message: str) -> bool:
+    """Executa um turno; True se terminou sem erro."""
+    payload = {"session_id": session_id, "message": message}
+    resp = await client.post(endpoint, json=payload)
+    if resp.status_code != 200:
+        return False
+    if endpoint == "/chat/stream":
+        return "event: done" in resp.text
+    return True
+
+
+async def run_load(
+    conversations: list[dict],
+    concurrency: int,
+    endpoint_mode: str,
+    seed: int,
+) -> dict:
+    from app.server import app
+    from app.session import session_manager
+
+    node_samples: dict[str, list[float]] = defaultdict(list)
+    agent_samples: dict[str, list[float]] = defaultdict(list)
+    NODE_DURATION.observers.append(lambda v, labels: node_samples[labels["node"]].append(v))
+    AGENT_DURATION.observers.append(lambda v, labels: agent_samples[labels["agent_id"]].append(v))
+
+    endpoint_samples: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    rng = random.Random(seed)
+    queue: asyncio.Queue = asyncio.Queue()
+    for i, conversation in enumerate(conversations):
+        if endpoint_mode == "mix":
+            endpoint = rng.choice(list(ENDPOINTS.values()))
+        else:
+            endpoint = ENDPOINTS[endpoint_mode]
+        queue.put_nowait((f"load-{i}-{conversation['id']}", endpoint, conversation["turns"]))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            session_id, endpoint, turns = queue.get_nowait()
+            for turn in turns:
+                start = time.perf_counter()
+                try:
+                    ok = await _send_turn(client, endpoint, session_id, turn["user"])
+                except httpx.HTTPError:
+                    ok = False
+                endpoint_samples[endpoint].append(time.perf_counter() - start)
+                if not ok:
+                    errors[endpoint] += 1
+
+    sessions_before = len(session_manager.store)
+    rss_before = _rss_bytes()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    rss_after = _rss_bytes()
+    store_stats = session_manager.stats()
+    new_sessions = max(len(session_manager.store) - sessions_before, 1)
+    turns = sum(len(s) for s in endpoint_samples.values())
+
+    memory: dict[str, Optional[float]] = {"sessions": len(session_manager.store)}
+    if "bytes" in store_stats and store_stats["sessions"]:
+        memory["store_bytes_per_session"] = store_stats["bytes"] / store_stats["sessions"]
+    if rss_before is not None and rss_after is not None:
+        memory["rss_delta_bytes_per_session"] = (rss_after - rss_before) / new_sessions
+
+    return {
+        "conversations": len(conversations),
+        "turns": turns,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "turns_per_s": turns / elapsed if elapsed else 0.0,
+        "errors": dict(errors),
+        "endpoints": {e: {"count": len(s), **_percentiles(s)} for e, s in endpoint_samples.items()},
+        "nodes": {n: {"count": len(s), **_percentiles(s)} for n, s in node_samples.items()},
+        "agents": {a: {"count": len(s), **_percentiles(s)} for a, s in agent_samples.items()},
+        "memory": memory,
+    }
+
+
+def _print_table(title: str, rows: dict[str, dict]) -> None:
+    print(f"\n{title:<28} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, row in rows.items():
+        print(
+            f"  {name:<26} {row['count']:>6} {row['p50'] * 1000:>8.1f} "
+            f"{row['p95'] * 1000:>8.1f} {row['p99'] * 1000:>8.1f}"
+        )
+
+
+def print_report(report: dict, args: argparse.Namespace) -> None:
+    print(
+        f"Conversas: {report['conversations']}  |  turnos: {report['turns']}  |  "
+        f"concorrência: {report['concurrency']}  |  LLM fake: {args.llm_latency * 1000:.0f} ms "
+        f"+ até {args.llm_jitter * 1000:.0f} ms de jitter"
+    )
+    print(f"Tempo total: {report['elapsed_s']:.2f} s  |  {report['turns_per_s']:.1f} turnos/s")
+    if report["errors"]:
+        print(f"Erros: {report['errors']}")
+    _print_table("Endpoint", report["endpoints"])
+    _print_table("Nó", report["nodes"])
+    if report["agents"]:
+        _print_table("Agente (HTTP)", report["agents"])
+
+    memory = report["memory"]
+    print(f"\nSessões no store: {memory['sessions']}")
+    if "store_bytes_per_session" in memory:
+        print(f"  estimativa do store:  {memory['store_bytes_per_session'] / 1024:.1f} KiB/sessão")
+    if "rss_delta_bytes_per_session" in memory:
+        print(f"  delta de RSS:         {memory['rss_delta_bytes_per_session'] / 1024:.1f} KiB/sessão")
+
+
+async def main(args: argparse.Namespace) -> int:
+    conversations: list[dict] = []
+    if args.file is not None:
+        conversations += load_conversations(args.file) * args.repeat
+    if args.synthetic:
+        conversations += synthetic_conversations(args.synthetic, seed=args.seed)
+    if not conversations:
+        conversations = load_conversations(DEFAULT_CONVERSATIONS) * args.repeat
+
+    fake = FakeChatModel(
+        latency=args.llm_latency,
+        jitter=args.llm_jitter,
+        token_latency=args.token_latency,
+        script=_build_script(conversations),
+    )
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+
+    mock_agents_api.LATENCY = mock_agents_api.LatencyConfig(base_ms=args.agent_latency_ms)
+    agents_client.set_transport(httpx.ASGITransport(app=mock_agents_api.app))
+    logging.disable(logging.INFO)
+
+    try:
+        report = await run_load(conversations, args.concurrency, args.endpoint, args.seed)
+    finally:
+        await agents_client.aclose()
+
+    print_report(report, args)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nRelatório salvo em {args.json}")
+
+    if args.max_p95_ms is not None:
+        slow = {
+            e: row["p95"] * 1000 for e, row in report["endpoints"].items()
+            if row["p95"] * 1000 > args.max_p95_ms
+        }
+        if slow:
+            print(f"\n✗ p95 acima de {args.max_p95_ms:.0f} ms: {slow}")
+            return 1
+    if report["errors"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga offline (replay com LLM fake)")
+    parser.add_argument("--file", type=Path, default=None, help="JSONL de conversas (default: fixture)")
+    parser.add_argument("--repeat", type=int, default=1, help="Repetições das conversas do arquivo")
+    parser.add_argument("--synthetic", type=int, default=0, help="Conversas sintéticas adicionais")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--endpoint", choices=["chat", "stream", "mix"], default="chat")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Latência por chamada LLM (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="Jitter máximo por chamada LLM (s)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Intervalo entre tokens (s)")
+    parser.add_argument("--agent-latency-ms", type=float, default=50.0)
+    parser.add_argument("--json", type=Path, default=None, help="Salva o relatório em JSON")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="Falha se p95 de algum endpoint passar disso")
+    sys.exit(asyncio.run(main(parser.parse_args())))
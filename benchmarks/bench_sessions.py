@@ -0,0 +1,74 @@
+"""
+Benchmark: throughput de get/save dos backends de sessão.
+
+Cria N sessões com histórico curto, depois mede save (escrita de todas)
+e get (leitura aleatória) em cada backend.
+
+Uso: python -m benchmarks.bench_sessions [--sessions 100000] [--messages 6]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.schemas import GraphState
+from app.session import InMemorySessionStore, SessionStore, SQLiteSessionStore
+
+
+def _make_states(count: int, messages: int) -> list[GraphState]:
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"mensagem de teste número {i}"}
+        for i in range(messages)
+    ]
+    return [
+        GraphState(session_id=f"s-{i}", messages=list(history), slots={"cidade": "Curitiba"})
+        for i in range(count)
+    ]
+
+
+def _bench(store: SessionStore, states: list[GraphState], reads: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    for state in states:
+        store.save(state)
+    save_rate = len(states) / (time.perf_counter() - start)
+
+    ids = [random.choice(states).session_id for _ in range(reads)]
+    start = time.perf_counter()
+    for session_id in ids:
+        store.get(session_id)
+    get_rate = reads / (time.perf_counter() - start)
+    return save_rate, get_rate
+
+
+def main(args: argparse.Namespace) -> None:
+    states = _make_states(args.sessions, args.messages)
+    print(f"{args.sessions} sessões, {args.messages} mensagens cada, {args.reads} leituras\n")
+    print(f"{'backend':<28} {'save/s':>10} {'get/s':>10} {'hit rate':>9} {'evictions':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores: dict[str, SessionStore] = {
+            "memory (sem limite)": InMemorySessionStore(max_entries=args.sessions, max_bytes=10**12),
+            f"memory (max {args.sessions // 2})": InMemorySessionStore(max_entries=args.sessions // 2),
+            "sqlite (WAL)": SQLiteSessionStore(path=os.path.join(tmp, "sessions.db")),
+        }
+        for name, store in stores.items():
+            save_rate, get_rate = _bench(store, states, args.reads)
+            stats = store.stats()
+            print(
+                f"{name:<28} {save_rate:>10.0f} {get_rate:>10.0f} "
+                f"{stats['hit_rate']:>9.2f} {stats['evictions']:>10}"
+            )
+            if isinstance(store, SQLiteSessionStore):
+                store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de sessão")
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=6)
+    parser.add_argument("--reads", type=int, default=100_000)
+    main(parser.parse_args())
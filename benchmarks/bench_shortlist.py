@@ -0,0 +1,206 @@
+"""
+Benchmark: shortlist de agentes com um registry sintético grande.
+
+Monta um AGENT_REGISTRY de N agentes (domínio × ação, ex.: "Cancela
+boleto", "Agenda sala de reunião") e, para cada consulta gerada com
+sinônimos ("quero cancelar o boleto 123"), roda o nó de classificação
+com o registry inteiro no prompt e com a shortlist em vários k. Mede:
+  - tokens de entrada por chamada de classificação (~4 caracteres por token)
+  - latência da classificação com LLM fake: base fixa + prefill
+    proporcional ao prompt (pior caso, sem cache de prefixo do provider)
+  - acurácia de roteamento: a LLM fake é um "oráculo" que acerta a intent
+    se, e só se, o agente correto estiver no prompt — mede quanto a
+    shortlist deixa de fora, não a qualidade de uma LLM real
+
+Uso: python -m benchmarks.bench_shortlist [--agents 1000] [--queries 200] [--k 4 8 16]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import random
+import statistics
+import time
+from typing import Optional
+
+from langchain_core.messages import BaseMessage
+
+from app.agent_index import agent_index, shortlist_agents
+from app.classification_cache import classification_cache
+from app.config import AGENT_REGISTRY, LLM_ROLES, set_llm
+from app.nodes import classification
+from app.schemas import AgentCard, GraphState
+from benchmarks.fake_llm import DEFAULT_CLASSIFICATION, FakeChatModel
+
+# (domínio, slot, valor de exemplo)
+DOMAINS = [
+    ("boleto", "numero_boleto", "34191"), ("fatura do cartão", "mes", "março"),
+    ("pedido de compra", "numero_pedido", "4500123"), ("entrega", "codigo_rastreio", "BR123"),
+    ("estoque de papel", "produto", "kraft"), ("férias", "periodo", "janeiro"),
+    ("holerite", "mes", "abril"), ("reembolso de despesas", "valor", "R$ 250"),
+    ("viagem corporativa", "destino", "Telêmaco Borba"), ("sala de reunião", "sala", "Araucária"),
+    ("senha do sistema", "sistema", "SAP"), ("acesso à VPN", "usuario", "jsilva"),
+    ("notebook", "patrimonio", "NB-778"), ("contrato de fornecedor", "fornecedor", "Acme"),
+    ("nota fiscal", "numero_nota", "8812"), ("ponto eletrônico", "data", "ontem"),
+    ("plano de saúde", "beneficiario", "Maria"), ("vale refeição", "valor", "R$ 40"),
+    ("treinamento obrigatório", "curso", "NR-12"), ("crachá", "matricula", "10233"),
+    ("estacionamento", "placa", "ABC1D23"), ("ordem de manutenção", "equipamento", "bomba 3"),
+    ("licença de software", "software", "AutoCAD"), ("orçamento do projeto", "projeto", "Puma"),
+    ("certificado digital", "cnpj", "89.637.490"), ("frete de carga", "rota", "Paranaguá"),
+    ("inventário florestal", "talhao", "T-45"), ("colheita de madeira", "area", "fazenda Monte"),
+    ("caldeira da fábrica", "unidade", "Otacílio Costa"), ("embalagem de papelão", "cliente", "Ambev"),
+    ("amostra de celulose", "lote", "L-99"), ("relatório de vendas", "regiao", "Sul"),
+    ("meta comercial", "vendedor", "Carlos"), ("chamado de TI", "numero_chamado", "INC0042"),
+    ("impressora", "andar", "3º andar"), ("e-mail corporativo", "endereco", "ana@klabin"),
+    ("transferência de setor", "setor", "logística"), ("admissão de funcionário", "candidato", "Pedro"),
+    ("auditoria interna", "area", "compras"), ("descarte de resíduos", "tipo_residuo", "químico"),
+]
+
+# (descrição da ação, sinônimos usados nas consultas)
+ACTIONS = [
+    ("Consulta o status de", ["como está", "qual o status do", "ver situação de"]),
+    ("Cancela", ["quero cancelar", "cancela", "desistir de"]),
+    ("Agenda", ["marcar", "agendar", "reservar horário para"]),
+    ("Aprova", ["aprovar", "dar ok em", "autorizar"]),
+    ("Emite segunda via de", ["segunda via do", "reemitir", "gerar outra via de"]),
+    ("Atualiza os dados de", ["atualizar", "alterar dados de", "mudar informações de"]),
+    ("Solicita", ["pedir", "solicitar", "preciso de"]),
+    ("Abre reclamação sobre", ["reclamar de", "reclamação sobre", "registrar queixa sobre"]),
+    ("Gera relatório de", ["relatório de", "gerar relatório do", "relatório sobre"]),
+    ("Exporta planilha de", ["exportar", "planilha do", "baixar planilha de"]),
+    ("Renova", ["renovar", "renova", "prorrogar"]),
+    ("Transfere", ["transferir", "transfere", "mover"]),
+    ("Calcula o custo de", ["quanto custa", "custo do", "calcular custo de"]),
+    ("Lista pendências de", ["pendências de", "o que está pendente em", "itens pendentes do"]),
+    ("Envia lembrete sobre", ["lembrete sobre", "avisar sobre", "me lembra do"]),
+    ("Registra ocorrência de", ["registrar ocorrência no", "ocorrência em", "reportar ocorrência de"]),
+    ("Consulta histórico de", ["histórico do", "ver histórico de", "últimos registros de"]),
+    ("Compara preços de", ["comparar preço de", "preços de", "qual preço mais barato em"]),
+    ("Valida documentos de", ["validar", "conferir documentos do", "validação de"]),
+    ("Notifica o gestor sobre", ["avisar meu gestor sobre", "notificar gestor de", "informar gestor do"]),
+    ("Reabre", ["reabrir", "reabre", "abrir de novo"]),
+    ("Bloqueia", ["bloquear", "bloqueia", "suspender"]),
+    ("Desbloqueia", ["desbloquear", "desbloqueia", "liberar bloqueio de"]),
+    ("Estima prazo de", ["prazo de", "estimar prazo do", "previsão de prazo de"]),
+    ("Traduz documentação de", ["traduzir documentação do", "tradução da documentação de", "traduz"]),
+]
+
+
+def _slug(text: str) -> str:
+    return "_".join(text.lower().split())[:40]
+
+
+def build_registry(size: int, rng: random.Random) -> tuple[dict[str, AgentCard], dict[str, tuple]]:
+    """Registry sintético e, por intent, (ação, domínio) para gerar as consultas."""
+    combos = [(action, domain) for action in ACTIONS for domain in DOMAINS]
+    rng.shuffle(combos)
+    registry: dict[str, AgentCard] = {}
+    sources: dict[str, tuple] = {}
+    for i, (action, domain) in enumerate(combos[:size]):
+        intent = f"{_slug(action[0].split()[0])}_{_slug(domain[0])}_{i}"
+        registry[intent] = AgentCard(
+            id=f"agent-{i:04d}",
+            name=f"Agente {action[0].split()[0]} {domain[0]}",
+            description=f"{action[0]} {domain[0]}",
+            required_slots=[domain[1]],
+        )
+        sources[intent] = (action, domain)
+    return registry, sources
+
+
+def build_queries(sources: dict[str, tuple], count: int, rng: random.Random) -> list[tuple[str, str]]:
+    queries = []
+    for intent in rng.sample(list(sources), min(count, len(sources))):
+        (_, synonyms), (domain, _, value) = sources[intent]
+        # Às vezes o usuário cita só o núcleo do domínio ("fatura" em vez de "fatura do cartão")
+        noun = domain if rng.random() < 0.6 else domain.split()[0]
+        queries.append((f"{rng.choice(synonyms)} {noun} {value}", intent))
+    return queries
+
+
+class OracleChatModel(FakeChatModel):
+    """Classificador que acerta a intent se o agente correto estiver no prompt."""
+
+    target: Optional[str] = None
+    last_input_tokens: int = 0
+
+    def _reply(self, messages: list[BaseMessage]) -> str:
+        prompt = "\n".join(str(m.content) for m in messages)
+        self.last_input_tokens = len(prompt) // 4
+        if self.target and f"intent='{self.target}'" in prompt:
+            card = AGENT_REGISTRY[self.target]
+            return json.dumps({
+                **DEFAULT_CLASSIFICATION,
+                "mode": "dispatch",
+                "intent": self.target,
+                "extracted_slots": {slot: "x" for slot in card.required_slots},
+            })
+        return json.dumps(DEFAULT_CLASSIFICATION)
+
+
+async def _run_variant(fake: OracleChatModel, queries: list[tuple[str, str]], k: Optional[int]) -> dict:
+    classification.shortlist_agents = (
+        functools.partial(shortlist_agents, enabled=False) if k is None
+        else functools.partial(shortlist_agents, k=k, min_agents=0)
+    )
+    tokens: list[int] = []
+    latencies: list[float] = []
+    correct = 0
+    for text, intent in queries:
+        fake.target = intent
+        start = time.perf_counter()
+        result = await classification.classification_node(GraphState(user_input=text))
+        latencies.append(time.perf_counter() - start)
+        tokens.append(fake.last_input_tokens)
+        correct += result["classification"].intent == intent
+    return {"tokens": tokens, "latencies": latencies, "accuracy": correct / len(queries)}
+
+
+async def main(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    registry, sources = build_registry(args.agents, rng)
+    AGENT_REGISTRY.clear()
+    AGENT_REGISTRY.update(registry)
+    queries = build_queries(sources, args.queries, rng)
+
+    classification_cache.enabled = False
+    fake = OracleChatModel(latency=args.llm_latency, prefill_latency=args.prefill_ms_per_1k / 1000)
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+
+    start = time.perf_counter()
+    index = agent_index()
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    top = [index.search(text, 1) for text, _ in queries]
+    search_us = (time.perf_counter() - start) / len(queries) * 1e6
+    top1 = sum(bool(hits) and hits[0][0] == intent for hits, (_, intent) in zip(top, queries))
+
+    print(f"Registry sintético: {len(registry)} agentes, {len(queries)} consultas")
+    print(f"Índice: montado em {build_ms:.0f} ms, busca média {search_us:.0f} µs, top-1 do índice {top1 / len(queries):.1%}")
+    print(f"LLM fake: {args.llm_latency * 1000:.0f} ms + {args.prefill_ms_per_1k:.0f} ms por 1000 tokens de entrada\n")
+    print(f"{'variante':<20} {'tokens':>8} {'p50 ms':>8} {'p95 ms':>8} {'acurácia':>9}")
+
+    for k in [None, *args.k]:
+        result = await _run_variant(fake, queries, k)
+        latencies = sorted(result["latencies"])
+        name = "registry completo" if k is None else f"shortlist k={k}"
+        print(
+            f"{name:<20} {statistics.mean(result['tokens']):>8.0f} "
+            f"{latencies[len(latencies) // 2] * 1000:>8.1f} {latencies[int(len(latencies) * 0.95)] * 1000:>8.1f} "
+            f"{result['accuracy']:>9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shortlist de agentes com registry sintético")
+    parser.add_argument("--agents", type=int, default=1000, help=f"Máximo {len(DOMAINS) * len(ACTIONS)}")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Latência base da LLM fake (s)")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=20.0, help="Prefill da LLM fake (ms por 1000 tokens)")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
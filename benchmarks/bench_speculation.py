@@ -0,0 +1,142 @@
+"""
+Benchmark: dispatch especulativo durante o streaming da classificação.
+
+Replay de conversas sintéticas contra o app FastAPI (in-process), com a
+LLM fake em streaming (TTFT + intervalo por token) e o mock_agents_api
+com latência fixa, com e sem SPECULATIVE_DISPATCH_ENABLED. Uma fração
+dos pedidos de clima vira mensagem com dois pedidos (`--fan-out-rate`):
+a classificação começa como dispatch de clima e só no campo `intents`
+vira fan-out — a especulação é cancelada.
+
+Relatório por tipo de turno (p50/p95), acertos/cancelamentos da
+especulação e latência economizada por acerto. Caches de classificação
+e de resultados de agentes ficam desligados para não mascarar a medida.
+
+Uso: python -m benchmarks.bench_speculation [--conversations 200] [--concurrency 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+import mock_agents_api
+from app.agent_cache import agent_result_cache
+from app.agents_client import agents_client
+from app.classification_cache import classification_cache
+from app.config import AGENT_REGISTRY, LLM_ROLES, set_llm
+from app.speculation import speculative_dispatcher
+from app.text import normalize_text
+from benchmarks.bench_hedging import _percentile
+from benchmarks.conversations import synthetic_conversations
+from benchmarks.fake_llm import FakeChatModel
+
+
+def _with_fan_out(conversations: list[dict], rate: float, seed: int) -> list[dict]:
+    """Troca uma fração dos pedidos de clima por "clima em X e me lembra de ..." (fan-out)."""
+    rng = random.Random(seed)
+    for conversation in conversations:
+        for turn in conversation["turns"]:
+            expected = turn["expected"]
+            if expected["intent"] != "clima" or expected["mode"] != "dispatch" or rng.random() >= rate:
+                continue
+            city = expected["extracted_slots"]["cidade"]
+            turn["user"] = f"{turn['user']} e me lembra de levar guarda-chuva às 8h"
+            turn["expected"] = {**expected, "intents": [
+                {"intent": "clima", "extracted_slots": {"cidade": city}},
+                {"intent": "lembrete", "extracted_slots": {"descricao": "levar guarda-chuva", "horario": "8h"}},
+            ]}
+    return conversations
+
+
+def _kind(expected: dict) -> str:
+    if expected.get("intents"):
+        return "fan-out"
+    if expected["mode"] != "dispatch":
+        return "sem dispatch"
+    card = AGENT_REGISTRY[expected["intent"]]
+    return "dispatch idempotente" if card.idempotent else "dispatch não idempotente"
+
+
+async def _replay(client: httpx.AsyncClient, conversations: list[dict], concurrency: int, prefix: str) -> dict:
+    samples: dict[str, list[float]] = defaultdict(list)
+    queue: asyncio.Queue = asyncio.Queue()
+    for conversation in conversations:
+        queue.put_nowait(conversation)
+
+    async def worker() -> None:
+        while not queue.empty():
+            conversation = queue.get_nowait()
+            session_id = f"{prefix}-{conversation['id']}"
+            for turn in conversation["turns"]:
+                start = time.perf_counter()
+                resp = await client.post("/chat", json={"session_id": session_id, "message": turn["user"]})
+                resp.raise_for_status()
+                samples[_kind(turn["expected"])].append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def main(args: argparse.Namespace) -> None:
+    conversations = _with_fan_out(synthetic_conversations(args.conversations, seed=args.seed), args.fan_out_rate, args.seed)
+    script = {normalize_text(t["user"]): t["expected"] for c in conversations for t in c["turns"]}
+    fake = FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency, script=script)
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+    classification_cache.enabled = False
+    agent_result_cache.enabled = False
+    mock_agents_api.LATENCY = mock_agents_api.LatencyConfig(base_ms=args.agent_latency_ms)
+    agents_client.set_transport(httpx.ASGITransport(app=mock_agents_api.app))
+    logging.disable(logging.WARNING)
+
+    from app.server import app
+
+    print(
+        f"{args.conversations} conversas, concorrência {args.concurrency}; LLM fake: TTFT "
+        f"{args.llm_latency * 1000:.0f} ms + {args.token_latency * 1000:.0f} ms/token; "
+        f"agentes: {args.agent_latency_ms:.0f} ms; fan-out em {args.fan_out_rate:.0%} dos pedidos de clima\n"
+    )
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+            for enabled in (False, True):
+                speculative_dispatcher.enabled = enabled
+                speculative_dispatcher.counters.clear()
+                results[enabled] = await _replay(client, conversations, args.concurrency, f"spec-{enabled}")
+    finally:
+        await agents_client.aclose()
+
+    print(f"{'turno':<26} {'n':>5} {'p50 sem':>8} {'p50 com':>8} {'p95 sem':>8} {'p95 com':>8}")
+    for kind in sorted(results[False]):
+        off, on = results[False][kind], results[True][kind]
+        print(
+            f"{kind:<26} {len(off):>5} {_percentile(off, 0.5) * 1000:>8.0f} {_percentile(on, 0.5) * 1000:>8.0f} "
+            f"{_percentile(off, 0.95) * 1000:>8.0f} {_percentile(on, 0.95) * 1000:>8.0f}"
+        )
+
+    stats = speculative_dispatcher.stats()
+    hits = stats.get("hit", 0)
+    saved_ms = stats.get("seconds_saved", 0.0) / hits * 1000 if hits else 0.0
+    print(
+        f"\nEspeculação: {stats.get('started', 0)} iniciadas, {hits} usadas, {stats.get('cancelled', 0)} canceladas "
+        f"(acerto {stats['hit_rate']:.1%}); economia média por acerto {saved_ms:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dispatch especulativo durante a classificação")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="TTFT da LLM fake (s)")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Intervalo entre tokens (s)")
+    parser.add_argument("--agent-latency-ms", type=float, default=300.0)
+    parser.add_argument("--fan-out-rate", type=float, default=0.1, help="Fração dos pedidos de clima com dois pedidos")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+Benchmark: time-to-first-token do /chat/stream vs. latência total do /chat.
+
+Sobe o server num uvicorn em processo (porta local) com LLM fake que
+emite um token por palavra, e mede via HTTP real:
+  - /chat:         tempo até a resposta completa
+  - /chat/stream:  tempo até o evento classification, o primeiro token e o done
+
+Uso: python -m benchmarks.bench_streaming [--latency 0.3] [--token-latency 0.03]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+import uvicorn
+
+from app.config import LLM_ROLES, set_llm
+from benchmarks.fake_llm import FakeChatModel
+
+SYNTHESIS_TEXT = (
+    "Oi! Tudo certo por aqui. Posso te ajudar com clima, lembretes, traduções "
+    "e mensagens de aniversário — é só falar o que precisa."
+)
+
+
+async def _start_server(port: int) -> tuple[uvicorn.Server, asyncio.Task]:
+    from app.server import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def _measure_chat(client: httpx.AsyncClient) -> float:
+    start = time.perf_counter()
+    resp = await client.post("/chat", json={"message": "oi"})
+    resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def _measure_stream(client: httpx.AsyncClient) -> dict[str, float]:
+    marks: dict[str, float] = {}
+    start = time.perf_counter()
+    async with client.stream("POST", "/chat/stream", json={"message": "oi"}) as resp:
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            key = "first_token" if event["type"] == "token" else event["type"]
+            marks.setdefault(key, time.perf_counter() - start)
+    return marks
+
+
+async def main(args: argparse.Namespace) -> None:
+    fake = FakeChatModel(latency=args.latency, token_latency=args.token_latency, synthesis_text=SYNTHESIS_TEXT)
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+
+    server, task = await _start_server(args.port)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            chat = [await _measure_chat(client) for _ in range(args.turns)]
+            stream = [await _measure_stream(client) for _ in range(args.turns)]
+    finally:
+        server.should_exit = True
+        await task
+
+    def ms(values: list[float]) -> str:
+        return f"{statistics.median(values) * 1000:>8.0f} ms"
+
+    print(
+        f"LLM fake: {args.latency * 1000:.0f} ms até o 1º token, "
+        f"{args.token_latency * 1000:.0f} ms/token, {len(SYNTHESIS_TEXT.split())} tokens\n"
+    )
+    print(f"/chat         resposta completa  {ms(chat)}")
+    print(f"/chat/stream  classification     {ms([m['classification'] for m in stream])}")
+    print(f"/chat/stream  1º token (TTFT)    {ms([m['first_token'] for m in stream])}")
+    print(f"/chat/stream  done               {ms([m['done'] for m in stream])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de TTFT do streaming")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.03)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,154 @@
+"""
+Benchmark: parse da classificação — parser antigo x saída estruturada.
+
+1. Robustez: pega as classificações esperadas das conversas sintéticas e
+   gera respostas em vários formatos que LLMs realmente devolvem (JSON
+   limpo, cerca de markdown, texto em volta, vírgula sobrando, resposta
+   cortada por max_tokens, slot numérico). Compara quantas viram uma
+   classificação utilizável com o parser antigo (strip da cerca +
+   json.loads + Classification) e com `parse_json_reply` +
+   `coerce_classification`, e o custo por parse.
+2. Streaming: com a LLM fake em streaming (TTFT + intervalo por token),
+   mede quando `mode`/`intent` ficam disponíveis (`on_fields`) comparado
+   com o fim do JSON — a antecedência que o roteamento pode ganhar.
+
+Uso: python -m benchmarks.bench_structured_output [--replies 2000] [--turns 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import ValidationError
+
+from app.classification_batcher import invoke_classifier
+from app.config import LLM_ROLES, set_llm
+from app.schemas import Classification
+from app.structured_output import ROUTE_FIELDS, coerce_classification, parse_json_reply
+from app.text import normalize_text
+from benchmarks.bench_hedging import _percentile
+from benchmarks.conversations import EXPECTED_DEFAULTS, synthetic_conversations
+from benchmarks.fake_llm import USER_MESSAGE_MARKER, FakeChatModel
+
+
+def _legacy_parse(content: str) -> Optional[dict]:
+    """Parser anterior: tira a cerca, json.loads; qualquer erro → fallback."""
+    raw = content.strip()
+    if raw.startswith("```"):
+        raw = raw.split("\n", 1)[1] if "\n" in raw else raw[3:]
+    if raw.endswith("```"):
+        raw = raw[:-3]
+    try:
+        data = json.loads(raw.strip())
+        Classification(**{k: v for k, v in data.items() if k in Classification.model_fields})
+        return data
+    except (json.JSONDecodeError, ValidationError, TypeError, AttributeError):
+        return None
+
+
+def _structured_parse(content: str) -> Optional[dict]:
+    data, outcome = parse_json_reply(content)
+    return coerce_classification(data, truncated=outcome == "truncated")
+
+
+def _truncate(text: str, rng: random.Random) -> str:
+    # Cortada depois dos slots (max_tokens no meio de "intents"/"question_to_ask")
+    cut = text.find('"extracted_slots"')
+    cut = text.find("}", cut) + 1 if cut >= 0 else len(text) // 2
+    return text[:cut + rng.randint(1, 12)]
+
+
+# formato → gerador da resposta a partir da classificação esperada
+FORMATS: dict[str, Callable[[dict, random.Random], str]] = {
+    "limpo": lambda d, rng: json.dumps(d, ensure_ascii=False),
+    "cerca markdown": lambda d, rng: f"```json\n{json.dumps(d, ensure_ascii=False, indent=2)}\n```",
+    "texto em volta": lambda d, rng: f"Claro! Segue a classificação:\n{json.dumps(d, ensure_ascii=False)}\nQualquer coisa, avise.",
+    "vírgula sobrando": lambda d, rng: json.dumps(d, ensure_ascii=False)[:-1] + ",\n}",
+    "cortada (max_tokens)": lambda d, rng: _truncate(json.dumps({**d, "intents": []}, ensure_ascii=False), rng),
+    "campos omitidos": lambda d, rng: json.dumps(
+        {k: v for k, v in d.items() if k not in ("extracted_slots", "missing_slots") or v}, ensure_ascii=False
+    ),
+    "slot numérico": lambda d, rng: json.dumps(
+        {**d, "extracted_slots": {k: 15 for k in d["extracted_slots"]} or {"numero": 15}}, ensure_ascii=False
+    ),
+}
+
+
+def _expected_classifications(count: int) -> list[dict]:
+    turns = [turn for conv in synthetic_conversations(count, seed=3) for turn in conv["turns"]]
+    return [{**EXPECTED_DEFAULTS, **turn["expected"]} for turn in turns][:count]
+
+
+def robustness(replies: int) -> None:
+    rng = random.Random(11)
+    expected = _expected_classifications(replies)
+    print(f"Robustez do parse ({len(expected)} respostas por formato)\n")
+    print(f"{'formato':<22} {'antigo':>8} {'novo':>8} {'antigo µs':>10} {'novo µs':>9}")
+    for name, render in FORMATS.items():
+        contents = [render(data, rng) for data in expected]
+        row = []
+        for parse in (_legacy_parse, _structured_parse):
+            for content in contents[:200]:  # aquecimento
+                parse(content)
+            start = time.perf_counter()
+            parsed = [parse(content) for content in contents]
+            elapsed = (time.perf_counter() - start) / len(contents) * 1e6
+            usable = sum(
+                result is not None and result["mode"] == data["mode"] and result.get("intent") == data["intent"]
+                for result, data in zip(parsed, expected)
+            )
+            row.append((usable / len(expected), elapsed))
+        (old_ok, old_us), (new_ok, new_us) = row
+        print(f"{name:<22} {old_ok:>8.1%} {new_ok:>8.1%} {old_us:>10.1f} {new_us:>9.1f}")
+
+
+async def streaming(turns: int, ttft: float, token_latency: float) -> None:
+    expected = _expected_classifications(turns)
+    fake = FakeChatModel(latency=ttft, token_latency=token_latency)
+    for role in LLM_ROLES:
+        set_llm(role, fake)
+    system = SystemMessage(content="Você é o classificador. Retorne APENAS JSON.")
+
+    route_ms: list[float] = []
+    total_ms: list[float] = []
+    for i, data in enumerate(expected):
+        message = f"mensagem {i}"
+        fake.script = {normalize_text(message): data}
+        routed: list[float] = []
+
+        def on_fields(fields: dict) -> None:
+            if not routed and all(field in fields for field in ROUTE_FIELDS):
+                routed.append(time.perf_counter())
+
+        start = time.perf_counter()
+        result: Any = await invoke_classifier(
+            [system, HumanMessage(content=f"{USER_MESSAGE_MARKER} {message}")], on_fields=on_fields,
+        )
+        total_ms.append((time.perf_counter() - start) * 1000)
+        route_ms.append((routed[0] - start) * 1000 if routed else total_ms[-1])
+        assert result is not None and result["mode"] == data["mode"]
+
+    print(
+        f"\nStreaming ({len(expected)} classificações; LLM fake: TTFT {ttft * 1000:.0f} ms, "
+        f"{token_latency * 1000:.0f} ms por token)\n"
+    )
+    print(f"{'':<22} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'mode/intent':<22} {_percentile(route_ms, 0.5):>8.0f} {_percentile(route_ms, 0.95):>8.0f}")
+    print(f"{'JSON completo':<22} {_percentile(total_ms, 0.5):>8.0f} {_percentile(total_ms, 0.95):>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse da classificação: parser antigo x saída estruturada")
+    parser.add_argument("--replies", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Tempo até o primeiro token da LLM fake (s)")
+    parser.add_argument("--token-latency", type=float, default=0.015, help="Intervalo entre tokens (s)")
+    args = parser.parse_args()
+    robustness(args.replies)
+    asyncio.run(streaming(args.turns, args.ttft, args.token_latency))
@@ -0,0 +1,74 @@
+"""
+Microbenchmark: overhead por turno do /chat em função do tamanho do histórico.
+
+LLM fake com latência zero, então o tempo medido é só orquestração
+(sessão, grafo, serialização). Para comparação, mede também o round-trip
+antigo (2× deep copy + model_dump + revalidação) sobre o mesmo histórico.
+
+Uso: python -m benchmarks.bench_turn_overhead [--sizes 10,100,500,1000] [--turns 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.config import LLM_ROLES, set_llm
+from app.schemas import GraphState
+from benchmarks.fake_llm import FakeChatModel
+
+
+def _history(size: int) -> list[dict[str, str]]:
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"mensagem {i} " + "x" * 80}
+        for i in range(size)
+    ]
+
+
+def _legacy_round_trip(state: GraphState) -> None:
+    """Cópias que o /chat fazia por turno antes do modelo de delta."""
+    loaded = state.model_copy(deep=True)
+    result = loaded.model_dump()
+    updated = GraphState(**result)
+    updated.model_copy(deep=True)
+
+
+async def main(sizes: list[int], turns: int) -> None:
+    for role in LLM_ROLES:
+        set_llm(role, FakeChatModel(latency=0))
+
+    from app.server import app
+    from app.session import session_manager
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'histórico':>10} {'turno (ms)':>11} {'round-trip antigo (ms)':>23}")
+        for size in sizes:
+            session_id = f"overhead-{size}"
+            state = GraphState(session_id=session_id, messages=_history(size))
+            session_manager.save(state)
+
+            start = time.perf_counter()
+            for _ in range(turns):
+                resp = await client.post("/chat", json={"session_id": session_id, "message": "oi"})
+                resp.raise_for_status()
+            per_turn = (time.perf_counter() - start) / turns
+
+            start = time.perf_counter()
+            for _ in range(turns):
+                _legacy_round_trip(state)
+            legacy = (time.perf_counter() - start) / turns
+
+            print(f"{size:>10} {per_turn * 1000:>11.2f} {legacy * 1000:>23.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overhead por turno vs. tamanho do histórico")
+    parser.add_argument("--sizes", default="10,100,500,1000")
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main([int(x) for x in args.sizes.split(",")], args.turns))
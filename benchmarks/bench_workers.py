@@ -0,0 +1,151 @@
+"""
+Benchmark: throughput do orquestrador por número de workers (serve.py).
+
+Para cada modo (uvicorn distribuindo conexões / roteador com afinidade de
+sessão) e cada número de workers, sobe `serve.py` num subprocesso com
+SESSION_BACKEND=sqlite (banco novo por rodada) e o app de
+benchmarks/fake_app.py — LLM fake e mock de agentes in-process, então o
+custo por turno é só o do orquestrador mais as esperas simuladas. Replay
+de conversas sintéticas por HTTP de verdade, `--concurrency` conversas em
+paralelo, cada uma com turnos em sequência.
+
+Relatório: turnos/s, speedup e eficiência em relação a 1 worker do mesmo
+modo, p50/p95 e erros. O gerador de carga roda na mesma máquina e disputa
+CPU com os workers: o ganho só aparece até o nº de núcleos livres.
+
+Uso: python -m benchmarks.bench_workers [--workers 1,2,4] [--modes uvicorn,affinity] [--concurrency 64]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.bench_hedging import _percentile
+from benchmarks.conversations import synthetic_conversations
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+async def _wait_ready(base_url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=1.0) as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"serve.py saiu com código {proc.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("serve.py não respondeu /health a tempo")
+
+
+async def _replay(base_url: str, conversations: list[dict], concurrency: int, prefix: str) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for conversation in conversations:
+        queue.put_nowait(conversation)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while not queue.empty():
+            conversation = queue.get_nowait()
+            session_id = f"{prefix}-{conversation['id']}"
+            for turn in conversation["turns"]:
+                start = time.perf_counter()
+                try:
+                    resp = await client.post("/chat", json={"session_id": session_id, "message": turn["user"]})
+                    errors += resp.status_code != 200
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"turns": len(latencies), "elapsed": elapsed, "latencies": latencies, "errors": errors}
+
+
+async def _run(mode: str, workers: int, port: int, conversations: list[dict], args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench-workers-") as tmp:
+        env = {
+            **os.environ,
+            "SESSION_BACKEND": "sqlite",
+            "SESSION_SQLITE_PATH": os.path.join(tmp, "sessions.db"),
+            "BENCH_CONVERSATIONS": str(args.conversations),
+            "BENCH_SEED": str(args.seed),
+            "BENCH_LLM_LATENCY": str(args.llm_latency),
+            "BENCH_AGENT_LATENCY_MS": str(args.agent_latency_ms),
+        }
+        proc = subprocess.Popen(
+            [
+                sys.executable, str(ROOT / "serve.py"), "--workers", str(workers),
+                "--affinity" if mode == "affinity" else "--no-affinity",
+                "--host", "127.0.0.1", "--port", str(port),
+                "--app", "benchmarks.fake_app:app", "--log-level", "warning",
+            ],
+            cwd=ROOT, env=env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            await _wait_ready(base_url, proc)
+            # Aquecimento: primeiros turnos de cada worker pagam imports e clientes preguiçosos
+            await _replay(base_url, conversations[: args.concurrency], args.concurrency, f"warmup-{mode}-{workers}")
+            return await _replay(base_url, conversations, args.concurrency, f"{mode}-{workers}")
+        finally:
+            proc.terminate()
+            proc.wait(30)
+
+
+async def main(args: argparse.Namespace) -> None:
+    conversations = synthetic_conversations(args.conversations, seed=args.seed)
+    worker_counts = [int(n) for n in args.workers.split(",")]
+    modes = args.modes.split(",")
+    cpus = os.cpu_count() or 1
+    print(
+        f"{len(conversations)} conversas ({sum(len(c['turns']) for c in conversations)} turnos), "
+        f"concorrência {args.concurrency}; LLM fake {args.llm_latency * 1000:.0f} ms, "
+        f"agentes {args.agent_latency_ms:.0f} ms; {cpus} CPU(s) na máquina\n"
+    )
+    print(f"{'modo':<10} {'workers':>7} {'turnos/s':>9} {'speedup':>8} {'eficiência':>10} {'p50 ms':>7} {'p95 ms':>7} {'erros':>6}")
+    for mode in modes:
+        baseline = None
+        for workers in worker_counts:
+            result = await _run(mode, workers, args.port, conversations, args)
+            throughput = result["turns"] / result["elapsed"]
+            # Throughput por worker da primeira rodada (normalmente 1 worker)
+            baseline = baseline or throughput / worker_counts[0]
+            speedup = throughput / baseline
+            print(
+                f"{mode:<10} {workers:>7} {throughput:>9.1f} {speedup:>7.2f}x {speedup / workers:>10.0%} "
+                f"{_percentile(result['latencies'], 0.5) * 1000:>7.0f} "
+                f"{_percentile(result['latencies'], 0.95) * 1000:>7.0f} {result['errors']:>6}"
+            )
+    if max(worker_counts) > cpus:
+        print(f"\nAviso: mais workers que CPUs ({cpus}) — acima disso o throughput não escala.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput por número de workers")
+    parser.add_argument("--workers", default="1,2,4", help="Lista de nº de workers")
+    parser.add_argument("--modes", default="uvicorn,affinity", help="uvicorn e/ou affinity")
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Latência da LLM fake (s)")
+    parser.add_argument("--agent-latency-ms", type=float, default=50.0)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,116 @@
+"""
+Carregador de conversas para replay (JSONL, uma conversa por linha).
+
+Formatos aceitos por linha:
+  {"id": "...", "turns": [{"user": "...", "expected": {...Classification}}, ...]}
+  {"messages": ["...", "..."]}
+  {"message": "..."}
+
+`expected` é opcional: quando presente, é o que a LLM fake devolve no
+turno e serve de gabarito para medir a acurácia de caminhos sem LLM.
+
+`synthetic_conversations` gera conversas aleatórias (com seed) no mesmo
+formato, combinando small talk, clarify e dispatch para os agentes do
+registry padrão.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+
+DEFAULT_CONVERSATIONS = Path(__file__).parent / "data" / "conversations.jsonl"
+
+EXPECTED_DEFAULTS = {
+    "mode": "small_talk",
+    "intent": None,
+    "confidence": 0.95,
+    "missing_slots": [],
+    "question_to_ask": None,
+    "candidate_agents": [],
+    "extracted_slots": {},
+}
+
+
+def load_conversations(path: Path = DEFAULT_CONVERSATIONS) -> list[dict]:
+    """Retorna [{"id": str, "turns": [{"user": str, "expected": dict}]}]; ignora linhas sem mensagens."""
+    conversations = []
+    for lineno, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "turns" in record:
+            turns = record["turns"]
+        elif "messages" in record:
+            turns = [{"user": m} for m in record["messages"]]
+        elif "message" in record:
+            turns = [{"user": record["message"]}]
+        else:
+            continue
+        conversations.append({
+            "id": record.get("id", f"linha-{lineno}"),
+            "turns": [
+                {"user": t["user"], "expected": {**EXPECTED_DEFAULTS, **t.get("expected", {})}}
+                for t in turns
+            ],
+        })
+    return conversations
+
+
+# ── Conversas sintéticas ──────────────────────────────────────────────
+
+_CITIES = ["Curitiba", "Recife", "Manaus", "Belém", "Natal", "Goiânia", "Florianópolis", "Salvador"]
+_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabi", "Hugo"]
+_TEXTS = ["good night", "see you soon", "thank you very much", "where is the station"]
+_LANGUAGES = ["espanhol", "francês", "alemão", "italiano"]
+_TASKS = ["pagar a conta", "ligar pro médico", "regar as plantas", "buscar as crianças"]
+_SMALL_TALK = ["oi", "tudo bem?", "me conta uma curiosidade", "kkkk boa", "valeu!", "o que você sabe fazer?"]
+
+
+def _turn(user: str, **expected) -> dict:
+    return {"user": user, "expected": {**EXPECTED_DEFAULTS, **expected}}
+
+
+def _flow(rng: random.Random) -> list[dict]:
+    kind = rng.choice(["small_talk", "clima", "clima_clarify", "traduzir", "lembrete", "parabens"])
+    if kind == "small_talk":
+        return [_turn(rng.choice(_SMALL_TALK))]
+    if kind == "clima":
+        city = rng.choice(_CITIES)
+        return [_turn(f"clima em {city}", mode="dispatch", intent="clima", extracted_slots={"cidade": city})]
+    if kind == "clima_clarify":
+        city = rng.choice(_CITIES)
+        return [
+            _turn("quero saber o clima", mode="clarify", intent="clima", missing_slots=["cidade"]),
+            _turn(city, mode="dispatch", intent="clima", extracted_slots={"cidade": city}),
+        ]
+    if kind == "traduzir":
+        text, language = rng.choice(_TEXTS), rng.choice(_LANGUAGES)
+        return [_turn(
+            f"traduz '{text}' pro {language}",
+            mode="dispatch", intent="traduzir", extracted_slots={"texto": text, "idioma": language},
+        )]
+    if kind == "lembrete":
+        task, hour = rng.choice(_TASKS), f"{rng.randint(7, 22)}h"
+        return [
+            _turn(f"me lembra de {task}", mode="clarify", intent="lembrete",
+                  missing_slots=["horario"], extracted_slots={"descricao": task}),
+            _turn(f"às {hour}", mode="dispatch", intent="lembrete", extracted_slots={"horario": hour}),
+        ]
+    name, date = rng.choice(_NAMES), f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}"
+    return [
+        _turn(f"manda um parabéns pro {name}", mode="clarify", intent="happy_birthday",
+              missing_slots=["data"], extracted_slots={"nome": name}),
+        _turn(date, mode="dispatch", intent="happy_birthday", extracted_slots={"data": date}),
+    ]
+
+
+def synthetic_conversations(count: int, seed: int = 0, max_flows: int = 3) -> list[dict]:
+    """Gera `count` conversas com 1..max_flows fluxos cada (mesmo formato de load_conversations)."""
+    rng = random.Random(seed)
+    conversations = []
+    for i in range(count):
+        turns = [turn for _ in range(rng.randint(1, max_flows)) for turn in _flow(rng)]
+        conversations.append({"id": f"sintetica-{i}", "turns": turns})
+    return conversations
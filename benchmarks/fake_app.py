@@ -0,0 +1,43 @@
+"""
+App do orquestrador para benchmarks multi-processo (serve.py --app benchmarks.fake_app:app).
+
+Cada worker importa este módulo: troca as LLMs pela FakeChatModel
+roteirizada com as conversas sintéticas (mesma seed do benchmark) e serve
+o mock_agents_api in-process via ASGI — sem rede e sem custo de API.
+
+Configuração por variável de ambiente (herdada pelos workers):
+  BENCH_CONVERSATIONS, BENCH_SEED      conversas do roteiro
+  BENCH_LLM_LATENCY                    TTFT da LLM fake (s)
+  BENCH_TOKEN_LATENCY                  intervalo entre tokens (s)
+  BENCH_AGENT_LATENCY_MS               latência do mock de agentes
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+import httpx
+
+import mock_agents_api
+from app.agents_client import agents_client
+from app.config import LLM_ROLES, set_llm
+from app.text import normalize_text
+from benchmarks.conversations import synthetic_conversations
+from benchmarks.fake_llm import FakeChatModel
+
+_conversations = synthetic_conversations(
+    int(os.getenv("BENCH_CONVERSATIONS", "200")), seed=int(os.getenv("BENCH_SEED", "0")),
+)
+_fake = FakeChatModel(
+    latency=float(os.getenv("BENCH_LLM_LATENCY", "0.05")),
+    token_latency=float(os.getenv("BENCH_TOKEN_LATENCY", "0")),
+    script={normalize_text(t["user"]): t["expected"] for c in _conversations for t in c["turns"]},
+)
+for _role in LLM_ROLES:
+    set_llm(_role, _fake)
+mock_agents_api.LATENCY = mock_agents_api.LatencyConfig(base_ms=float(os.getenv("BENCH_AGENT_LATENCY_MS", "50")))
+agents_client.set_transport(httpx.ASGITransport(app=mock_agents_api.app))
+logging.disable(logging.WARNING)
+
+from app.server import app  # noqa: E402,F401
@@ -0,0 +1,179 @@
+"""
+Fake chat model para benchmarks — latência fixa, zero custo de API.
+
+Detecta pelo system prompt se a chamada é de classificação ou de síntese
+e devolve um `Classification` JSON roteirizado ou um texto fixo (no modo
+fundido, o JSON ganha o campo `reply` para small_talk/clarify). O roteiro
+pode ser por mensagem (`script`: mensagem normalizada → Classification),
+o que permite replays concorrentes de várias conversas no mesmo modelo.
+
+Em streaming, `latency` é o tempo até o primeiro token e `token_latency`
+o intervalo entre tokens (um token por palavra). `jitter` soma a cada
+chamada um atraso extra uniforme em [0, jitter]. `prefill_latency` soma
+um atraso proporcional ao tamanho do prompt (s por 1000 tokens de entrada)
+e `decode_latency` ao tamanho da resposta (s por 1000 tokens de saída).
+`max_concurrency` imita o limite de chamadas simultâneas do provider: as
+excedentes esperam na fila.
+
+O JSON da classificação sai com os campos na ordem de `Classification`
+(a ordem do schema na saída estruturada). Chamadas de classificação em
+lote (app/classification_batcher.py) recebem {"results": [...]} com um
+item por pedido, roteirizado do mesmo jeito.
+
+Cada resposta traz `usage_metadata` estimado (~4 caracteres por token);
+o system prompt conta como cache hit a partir da segunda vez que aparece,
+imitando o cache de prefixo do provider.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from pydantic import PrivateAttr
+
+from app.classification_batcher import BATCH_ITEMS_MARKER, BATCH_MARKER
+from app.schemas import Classification
+from app.text import normalize_text
+
+
+USER_MESSAGE_MARKER = "Mensagem atual do usuário:"
+FUSED_MARKER = '"reply"'   # presente no prompt de classificação do modo fundido
+
+DEFAULT_CLASSIFICATION = {
+    "mode": "small_talk",
+    "intent": None,
+    "confidence": 0.95,
+    "missing_slots": [],
+    "question_to_ask": None,
+    "candidate_agents": [],
+    "extracted_slots": {},
+}
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model determinístico com latência configurável (segundos)."""
+
+    latency: float = 0.2
+    token_latency: float = 0.0
+    jitter: float = 0.0
+    prefill_latency: float = 0.0
+    decode_latency: float = 0.0
+    max_concurrency: int = 0
+    classification: dict[str, Any] = DEFAULT_CLASSIFICATION
+    script: dict[str, dict[str, Any]] = {}
+    synthesis_text: str = "Oi! Tudo certo por aqui."
+    seen_prefixes: set[str] = set()
+    _semaphore: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: list[BaseMessage]) -> str:
+        system = str(messages[0].content) if messages else ""
+        if "classificador" in system:
+            fused = FUSED_MARKER in system
+            content = str(messages[-1].content)
+            if BATCH_MARKER in content:
+                items = json.loads(content.split(BATCH_ITEMS_MARKER, 1)[1])
+                results = [{"id": item["id"], **self._classify(item["mensagem"], fused)} for item in items]
+                return json.dumps({"results": results}, ensure_ascii=False)
+            turn = content.rsplit(USER_MESSAGE_MARKER, 1)[-1]
+            return json.dumps(self._classify(turn, fused), ensure_ascii=False)
+        return self.synthesis_text
+
+    def _classify(self, message: str, fused: bool) -> dict[str, Any]:
+        scripted = self.script.get(normalize_text(message), self.classification)
+        # Campos na ordem do schema, como na saída estruturada de um provider real
+        classification = {name: scripted[name] for name in Classification.model_fields if name in scripted}
+        classification.update(scripted)
+        if fused:
+            reply = self.synthesis_text if classification["mode"] in ("small_talk", "clarify") else None
+            classification = {**classification, "reply": reply}
+        return classification
+
+    def _delay(self, messages: list[BaseMessage], reply: str = "") -> float:
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if self.prefill_latency:
+            delay += self.prefill_latency * sum(len(str(m.content)) for m in messages) / 4 / 1000
+        if self.decode_latency:
+            delay += self.decode_latency * len(reply) / 4 / 1000
+        return delay
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """Ocupa uma das `max_concurrency` vagas do provider durante a chamada."""
+        if not self.max_concurrency:
+            yield
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            yield
+
+    def _usage(self, messages: list[BaseMessage], reply: str) -> UsageMetadata:
+        system = str(messages[0].content) if messages else ""
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        cached = len(system) // 4 if system in self.seen_prefixes else 0
+        self.seen_prefixes.add(system)
+        output_tokens = len(reply) // 4
+        return UsageMetadata(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            input_token_details={"cache_read": cached},
+        )
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = self._reply(messages)
+        time.sleep(self._delay(messages, reply))
+        message = AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = self._reply(messages)
+        async with self._slot():
+            await asyncio.sleep(self._delay(messages, reply))
+        message = AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        async with self._slot():
+            await asyncio.sleep(self._delay(messages))
+            words = reply.split(" ")
+            for i, word in enumerate(words):
+                token = word if i == 0 else f" {word}"
+                pause = (self.token_latency if i else 0.0) + self.decode_latency * len(token) / 4 / 1000
+                if pause:
+                    await asyncio.sleep(pause)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, reply)))
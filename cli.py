@@ -92,6 +92,18 @@ def run_via_api():
 
 def run_direct():
     """Executa grafo diretamente."""
+    import asyncio
+
+    asyncio.run(_run_direct())
+
+
+async def _run_direct():
+    """Loop do CLI direto — um único event loop para reaproveitar os pools HTTP."""
+    import uuid
+
+    from app.agents_client import agents_client
+    from app.checkpoint import TURN_DURABILITY, thread_config, turn_input
+    from app.config import close_llms
     from app.graph import orchestrator_graph
     from app.schemas import GraphState
     from app.session import session_manager
@@ -102,8 +114,8 @@ def run_direct():
     print("╚══════════════════════════════════════════════╝")
     print("  'sair' para encerrar | 'debug' para toggle\n")
 
-    state = session_manager.get_or_create()
-    print(f"  Session: {state.session_id}\n")
+    session_id = str(uuid.uuid4())
+    print(f"  Session: {session_id}\n")
     show_debug = True
 
     while True:
@@ -122,33 +134,34 @@ def run_direct():
         if not user_input:
             continue
 
-        state.user_input = user_input
-
         try:
-            result = orchestrator_graph.invoke(state.model_dump())
-            state = GraphState(**result)
+            result = await orchestrator_graph.ainvoke(
+                turn_input(session_id, user_input), thread_config(session_id), durability=TURN_DURABILITY,
+            )
+            turn_state = GraphState.model_construct(**result)
 
             if show_debug:
                 _print_debug({
-                    "classification": state.classification.model_dump() if state.classification else None,
-                    "node_result": state.node_result.model_dump() if state.node_result else None,
+                    "classification": turn_state.classification.model_dump() if turn_state.classification else None,
+                    "node_result": turn_state.node_result.model_dump() if turn_state.node_result else None,
                     "debug": {
-                        "slots": state.slots,
-                        "current_intent": state.current_intent,
-                        "node_path": ["intake", "classification",
-                                      state.classification.mode.value if state.classification else "?",
-                                      "synthesis"],
+                        "slots": turn_state.slots,
+                        "current_intent": turn_state.current_intent,
+                        "node_path": turn_state.node_path,
                     },
                 })
 
-            print(f"\033[94mAava:\033[0m {state.response}\n")
-            session_manager.save(state)
+            print(f"\033[94mAava:\033[0m {turn_state.response}\n")
 
         except Exception as e:
             print(f"\033[91m  ✗ Erro: {e}\033[0m")
             import traceback
             traceback.print_exc()
 
+    await session_manager.summarizer.drain()
+    await agents_client.aclose()
+    await close_llms()
+
 
 def main():
     parser = argparse.ArgumentParser(description="A2A Orchestrator CLI")
@@ -3,13 +3,36 @@ Mock da API externa de agentes — para testes locais.
 Serviços genéricos para validar o fluxo de dados.
 
 Roda em porta 8001. Uso: python mock_agents_api.py
+
+Injeção de latência (para benchmark de hedging):
+  MOCK_LATENCY_MS=50 MOCK_TAIL_LATENCY_MS=1000 MOCK_TAIL_PROB=0.05 python mock_agents_api.py
+ou em runtime via PUT /admin/latency.
+
+Injeção de falhas por agente (para testar circuit breaker/bulkhead):
+  MOCK_FAULTS='{"agent-clima": {"error_rate": 1.0, "status_code": 503}}' python mock_agents_api.py
+ou em runtime via PUT /admin/faults/{agent_id} e DELETE /admin/faults/{agent_id}.
+
+Jobs assíncronos por agente (para testar o modo 202 do orquestrador):
+  MOCK_JOB_AGENTS='{"agent-happy-birthday": 3000}' python mock_agents_api.py
+ou em runtime via PUT /admin/jobs/{agent_id} e DELETE /admin/jobs/{agent_id}.
+O agente responde 202 {"job_id"} e termina após o atraso (ms): o resultado
+fica em GET /agents/{agent_id}/jobs/{job_id} e, se o payload trouxe
+`callback_url`, é enviado por POST para ela.
 """
 
 from __future__ import annotations
 
+import asyncio
+import json
+import os
+import random
+import uuid
 from datetime import datetime, timezone
+from typing import Optional
 
-from fastapi import FastAPI
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 app = FastAPI(title="Mock Agents API", version="0.2.0")
@@ -18,6 +41,7 @@ app = FastAPI(title="Mock Agents API", version="0.2.0")
 class ExecuteRequest(BaseModel):
     intent: str
     slots: dict
+    callback_url: Optional[str] = None
 
 
 class ExecuteResponse(BaseModel):
@@ -27,6 +51,77 @@ class ExecuteResponse(BaseModel):
     data: dict
 
 
+class LatencyConfig(BaseModel):
+    base_ms: float = float(os.getenv("MOCK_LATENCY_MS", "0"))
+    tail_ms: float = float(os.getenv("MOCK_TAIL_LATENCY_MS", "0"))
+    tail_prob: float = float(os.getenv("MOCK_TAIL_PROB", "0"))
+
+
+LATENCY = LatencyConfig()
+
+
+async def inject_latency() -> None:
+    """Simula latência: base fixa + cauda lenta com probabilidade tail_prob."""
+    delay_ms = LATENCY.base_ms
+    if LATENCY.tail_prob and random.random() < LATENCY.tail_prob:
+        delay_ms += LATENCY.tail_ms
+    if delay_ms:
+        await asyncio.sleep(delay_ms / 1000)
+
+
+class FaultConfig(BaseModel):
+    error_rate: float = 0.0     # fração das requisições que falham
+    status_code: int = 503      # status HTTP devolvido na falha
+    delay_ms: float = 0.0       # latência extra do agente (lento/travado), antes da falha
+
+
+FAULTS: dict[str, FaultConfig] = {
+    agent_id: FaultConfig(**config)
+    for agent_id, config in json.loads(os.getenv("MOCK_FAULTS", "{}")).items()
+}
+
+
+async def inject_fault(agent_id: str) -> JSONResponse | None:
+    """Aplica a falha configurada para o agente; devolve a resposta de erro, se houver."""
+    fault = FAULTS.get(agent_id)
+    if fault is None:
+        return None
+    if fault.delay_ms:
+        await asyncio.sleep(fault.delay_ms / 1000)
+    if fault.error_rate and random.random() < fault.error_rate:
+        return JSONResponse(status_code=fault.status_code, content={"detail": f"Falha injetada em {agent_id}"})
+    return None
+
+
+class JobConfig(BaseModel):
+    delay_ms: float = 3000.0    # tempo até o job terminar
+
+
+JOB_AGENTS: dict[str, JobConfig] = {
+    agent_id: JobConfig(delay_ms=delay_ms)
+    for agent_id, delay_ms in json.loads(os.getenv("MOCK_JOB_AGENTS", "{}")).items()
+}
+
+# job_id → estado/resultado do job
+JOBS: dict[str, dict] = {}
+_job_tasks: set[asyncio.Task] = set()
+
+# Transporte do POST de callback (benchmarks/testes apontam para o orquestrador em processo)
+CALLBACK_TRANSPORT: Optional[httpx.AsyncBaseTransport] = None
+
+
+async def _finish_job(job_id: str, agent_id: str, request: ExecuteRequest, delay_ms: float) -> None:
+    await asyncio.sleep(delay_ms / 1000)
+    JOBS[job_id] = {"job_id": job_id, **_execute(agent_id, request).model_dump()}
+    if not request.callback_url:
+        return
+    try:
+        async with httpx.AsyncClient(transport=CALLBACK_TRANSPORT, timeout=10.0) as client:
+            await client.post(request.callback_url, json=JOBS[job_id])
+    except httpx.HTTPError as e:
+        print(f"Callback do job {job_id} falhou: {e!r}")
+
+
 # ── Handlers por intent ────────────────────────────────────────────────
 
 def handle_happy_birthday(slots: dict) -> dict:
@@ -94,6 +189,22 @@ HANDLERS = {
 
 @app.post("/agents/{agent_id}/execute", response_model=ExecuteResponse)
 async def execute_agent(agent_id: str, request: ExecuteRequest):
+    await inject_latency()
+    if (failure := await inject_fault(agent_id)) is not None:
+        return failure
+
+    if (job_config := JOB_AGENTS.get(agent_id)) is not None:
+        job_id = uuid.uuid4().hex
+        JOBS[job_id] = {"job_id": job_id, "agent_id": agent_id, "status": "pending"}
+        task = asyncio.create_task(_finish_job(job_id, agent_id, request, job_config.delay_ms))
+        _job_tasks.add(task)
+        task.add_done_callback(_job_tasks.discard)
+        return JSONResponse(status_code=202, content={"agent_id": agent_id, "job_id": job_id, "status": "accepted"})
+
+    return _execute(agent_id, request)
+
+
+def _execute(agent_id: str, request: ExecuteRequest) -> ExecuteResponse:
     handler = HANDLERS.get(request.intent)
 
     if handler:
@@ -116,6 +227,14 @@ async def execute_agent(agent_id: str, request: ExecuteRequest):
     )
 
 
+@app.get("/agents/{agent_id}/jobs/{job_id}")
+async def get_job(agent_id: str, job_id: str):
+    job = JOBS.get(job_id)
+    if job is None or job["agent_id"] != agent_id:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' não encontrado")
+    return job
+
+
 @app.get("/agents/registry")
 async def list_agents():
     return {
@@ -128,6 +247,52 @@ async def list_agents():
     }
 
 
+@app.get("/admin/latency", response_model=LatencyConfig)
+async def get_latency():
+    return LATENCY
+
+
+@app.put("/admin/latency", response_model=LatencyConfig)
+async def set_latency(config: LatencyConfig):
+    global LATENCY
+    LATENCY = config
+    return LATENCY
+
+
+@app.get("/admin/faults")
+async def get_faults() -> dict[str, FaultConfig]:
+    return FAULTS
+
+
+@app.put("/admin/faults/{agent_id}", response_model=FaultConfig)
+async def set_fault(agent_id: str, config: FaultConfig):
+    FAULTS[agent_id] = config
+    return config
+
+
+@app.delete("/admin/faults/{agent_id}")
+async def clear_fault(agent_id: str):
+    FAULTS.pop(agent_id, None)
+    return {"status": "cleared", "agent_id": agent_id}
+
+
+@app.get("/admin/jobs")
+async def get_job_agents() -> dict[str, JobConfig]:
+    return JOB_AGENTS
+
+
+@app.put("/admin/jobs/{agent_id}", response_model=JobConfig)
+async def set_job_agent(agent_id: str, config: JobConfig):
+    JOB_AGENTS[agent_id] = config
+    return config
+
+
+@app.delete("/admin/jobs/{agent_id}")
+async def clear_job_agent(agent_id: str):
+    JOB_AGENTS.pop(agent_id, None)
+    return {"status": "cleared", "agent_id": agent_id}
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "service": "mock-agents-api", "version": "0.2.0"}
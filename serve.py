@@ -0,0 +1,48 @@
+"""Entrypoint de produção: python serve.py [--workers N] [--affinity]
+
+Sobe N workers uvicorn sem reload (main.py continua sendo o de
+desenvolvimento). Sem afinidade, o próprio uvicorn distribui as conexões
+entre os workers; com --affinity (ou SESSION_AFFINITY=true), cada worker
+escuta num unix socket e o processo principal roda o roteador de
+app/affinity.py, que mantém cada sessão no mesmo worker.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.config import SESSION_AFFINITY, SESSION_BACKEND, WORKER_SOCKET_DIR, WORKERS  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Orquestrador com vários workers")
+    parser.add_argument("--workers", type=int, default=WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--affinity", action=argparse.BooleanOptionalAction, default=SESSION_AFFINITY)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--app", default="app.server:app", help="App ASGI dos workers (module:attr)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers > 1 and SESSION_BACKEND == "memory":
+        sys.exit("SESSION_BACKEND=memory é por processo: use SESSION_BACKEND=sqlite com mais de um worker")
+
+    if not args.affinity:
+        uvicorn.run(args.app, host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+        return
+
+    from app.affinity import AffinityRouter, WorkerPool
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    pool = WorkerPool(args.app, args.workers, WORKER_SOCKET_DIR or None, log_level=args.log_level)
+    uvicorn.run(AffinityRouter(pool), host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()